@@ -180,6 +180,41 @@ ACCOUNT_LOGOUT_ON_GET = True
 
 ACCOUNT_LOGOUT_REDIRECT_URL = "/login"
 
+# shared between gunicorn workers (python manage.py createcachetable)
+# https://docs.djangoproject.com/en/3.0/topics/cache/#database-caching
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'todo_cache',
+    }
+}
+
+# To-do app settings
+# store new repeating to-dos once and expand their occurrences on the fly
+TODO_LAZY_RECURRENCES = False
+# how many days of lazily expanded occurrences the main to-do list shows
+TODO_LAZY_LIST_DAYS = 14
+# series adding more occurrences than this are generated by the worker process
+# (python manage.py run_recurrence_jobs) instead of inside the request
+TODO_SYNC_RECURRENCE_LIMIT = 500
+# todo.jobs.DatabaseJobQueue leaves jobs for the worker, todo.jobs.InProcessJobQueue runs them right away
+TODO_JOB_QUEUE = 'todo.jobs.DatabaseJobQueue'
+# repeating to-dos are stored this many days ahead (None stores every occurrence); the worker
+# moves the horizon forward, or run python manage.py extend_recurrences from a scheduler
+TODO_RECURRENCE_HORIZON_DAYS = 56
+# also store raised priorities when to-dos cross their due-date thresholds (in the worker, or
+# python manage.py escalate_priorities from a scheduler); lists raise them when read either way
+TODO_STORED_PRIORITY_ESCALATION = False
+# quote of the day: fetched at most once a day into the cache, with a hard timeout; use
+# todo.quotes.FileQuoteProvider with {'path': ...} to work offline
+TODO_QUOTE_PROVIDER = 'todo.quotes.QuotesRestProvider'
+TODO_QUOTE_PROVIDER_OPTIONS = {'url': 'https://quotes.rest/qod', 'timeout': 2.0}
+# cache holding each user's note text; point it at a memory cache (memcached, redis) shared by
+# the workers to take the note off the database
+TODO_NOTES_CACHE = 'default'
+# cache holding the version of each user's calendar counts, which the calendar feed's ETag is
+TODO_CALENDAR_CACHE = 'default'
+
 try:
     # Configure Django App for Heroku.
     import django_heroku
@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import ToDoItem, Course, Extracurricular, Note, SubTask
+from .models import ToDoItem, Course, Extracurricular, Note, SubTask, RecurrenceSeries, RecurrenceJob, SkipCalendar
+from .forms import SkipCalendarForm
 
 
 class SubTaskInLine(admin.TabularInline):
@@ -21,12 +22,25 @@ class ToDoAdmin(admin.ModelAdmin):
     search_fields = ['title']
 
 
+class RecurrenceSeriesAdmin(admin.ModelAdmin):
+    fieldsets = [
+        (None,               {'fields': ['title']}),
+
+        ('Details', {'fields': ['description', 'location', 'priority', 'category']}),
+        ('Rule', {'fields': ['recur_freq', 'start_date', 'end_recur_date', 'lazy']}),
+    ]
+
+    list_display = ('title', 'recur_freq', 'start_date', 'end_recur_date', 'lazy')
+    list_filter = ['recur_freq']
+    search_fields = ['title']
+
+
 class CourseAdmin(admin.ModelAdmin):
     fieldsets = [
         (None, {'fields': ['course_name']}),
 
         ('Details',
-         {'fields': ['course_abbrev', 'course_prof']}),
+         {'fields': ['course_abbrev', 'course_prof', 'skip_calendar']}),
     ]
 
     list_display = ('course_name', 'course_abbrev', 'course_prof')
@@ -34,6 +48,15 @@ class CourseAdmin(admin.ModelAdmin):
     search_fields = ['course_name']
 
 
+class SkipCalendarAdmin(admin.ModelAdmin):
+    form = SkipCalendarForm
+    fieldsets = [
+        (None, {'fields': ['user', 'name', 'breaks']}),
+    ]
+    list_display = ('name', 'user', 'first_day')
+    search_fields = ['name']
+
+
 class ECAdmin(admin.ModelAdmin):
     fieldsets = [
         (None, {'fields': ['name']}),
@@ -59,3 +82,6 @@ admin.site.register(Course, CourseAdmin)
 admin.site.register(Extracurricular, ECAdmin)
 admin.site.register(Note, NoteAdmin)
 admin.site.register(SubTask)
+admin.site.register(RecurrenceSeries, RecurrenceSeriesAdmin)
+admin.site.register(RecurrenceJob)
+admin.site.register(SkipCalendar, SkipCalendarAdmin)
@@ -0,0 +1,46 @@
+import calendar
+import datetime
+from functools import lru_cache
+from .rollups import density
+
+
+# weeks of a month as tuples of day numbers, 0 for the days of the neighbouring months. Each grid
+# gets its own calendar.Calendar, since calendar.setfirstweekday changes the first weekday for
+# every thread of the process; the grids never change, so they are built once per process
+@lru_cache(maxsize=512)
+def month_grid(year, month, firstweekday=calendar.SUNDAY):
+    return tuple(tuple(week) for week in calendar.Calendar(firstweekday).monthdayscalendar(year, month))
+
+
+# a day of a calendar grid with the number of to-dos due on it
+class CalendarDay:
+    __slots__ = ('date', 'open_count', 'completed_count', 'blank', 'size', 'density')
+
+    def __init__(self, date, open_count=0, completed_count=0, blank=False):
+        self.date = date
+        self.open_count = open_count
+        self.completed_count = completed_count
+        self.blank = blank
+        # the month view draws a bigger circle for every 4 open to-dos, none for a day without any
+        self.size = 0 if blank else (open_count // 4 if open_count else -1)
+        self.density = density(open_count, completed_count)
+
+    def __repr__(self):
+        return str(self)
+
+    def __str__(self):
+        return "Calendar Day: " + str(self.date) + "\tOpen: " + str(self.open_count) + "\tCompleted: " + str(self.completed_count) + "\tBlank: " + str(self.blank) + "\tSize: " + str(self.size)
+
+
+# weeks of CalendarDay for a month, from counts ({date: (open, completed)})
+def calendar_days(year, month, counts, firstweekday=calendar.SUNDAY):
+    weeks = []
+    for week in month_grid(year, month, firstweekday):
+        days = []
+        for day in week:
+            if day == 0:
+                days.append(CalendarDay(0, blank=True))
+            else:
+                days.append(CalendarDay(day, *counts.get(datetime.date(year, month, day), (0, 0))))
+        weeks.append(days)
+    return weeks
@@ -1,4 +1,4 @@
-from .models import ToDoItem, Course, Extracurricular, SubTask
+from .models import ToDoItem, Course, Extracurricular, SubTask, SkipCalendar
 from django.template.defaultfilters import mark_safe
 from django.utils import timezone
 from django import forms
@@ -10,12 +10,19 @@ from django.forms import modelformset_factory
 
 
 class ToDoForm(forms.ModelForm):
+    recur_weekdays = forms.TypedMultipleChoiceField(
+        choices=ToDoItem.WEEKDAY_CHOICES, coerce=int, required=False, label='On',
+        widget=forms.CheckboxSelectMultiple)
+
     class Meta:
         model = ToDoItem
-        fields = ['title', 'description', 'duedate', 'location', 'recur_freq',
-                  'end_recur_date', 'priority', 'category', 'course', 'ec', 'progress']
+        fields = ['title', 'description', 'duedate', 'location', 'recur_freq', 'recur_interval',
+                  'recur_weekdays', 'recur_count', 'end_recur_date', 'priority', 'category',
+                  'course', 'ec', 'progress']
         labels = {'recur_freq': mark_safe('Repeat'), 'end_recur_date': mark_safe(
             'End repeat'), 'duedate': mark_safe('Due Date'), }  # label and bold it
+        help_texts = {'recur_interval': 'days, weeks, months or years',
+                      'recur_count': 'occurrences'}
         widgets = {'description': forms.Textarea(attrs={'cols': 35, 'rows': 5}),
                    'duedate': DateTimePicker(attrs={'placeholder': 'yyyy-mm-dd HH:MM',
                                                     'append': 'fa fa-calendar',
@@ -31,6 +38,18 @@ class ToDoForm(forms.ModelForm):
                                                     ),
                    }
 
+    # an empty interval means every day/week/month/year
+    def clean_recur_interval(self):
+        return self.cleaned_data['recur_interval'] or 1
+
+    # weekdays only make sense for daily and weekly repeats
+    def clean(self):
+        cleaned_data = super().clean()
+        if (cleaned_data.get('recur_weekdays') and
+                cleaned_data.get('recur_freq') not in (ToDoItem.DAILY, ToDoItem.WEEKLY)):
+            self.add_error('recur_weekdays', 'Weekdays can only be picked for daily or weekly repeats.')
+        return cleaned_data
+
     def filter_course_and_ec(self, user=None):
         if user:
             self.fields['course'].queryset = Course.objects.filter(
@@ -64,7 +83,53 @@ SubTaskModelFormSet = modelformset_factory(
 class CourseForm(forms.ModelForm):
     class Meta:
         model = Course
-        fields = ['course_name', 'course_abbrev', 'course_prof']
+        fields = ['course_name', 'course_abbrev', 'course_prof', 'skip_calendar']
+
+    def filter_skip_calendar(self, user):
+        self.fields['skip_calendar'].queryset = SkipCalendar.objects.filter(user=user)
+        self.fields['skip_calendar'].required = False
+
+
+class SkipCalendarForm(forms.ModelForm):
+    # one day or range per line: 2020-03-09 or 2020-03-09 to 2020-03-13
+    breaks = forms.CharField(widget=forms.Textarea(attrs={'cols': 35, 'rows': 6}), required=False,
+                             help_text='One day (yyyy-mm-dd) or range (yyyy-mm-dd to yyyy-mm-dd) per line')
+
+    class Meta:
+        model = SkipCalendar
+        fields = ['user', 'name']
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if (self.instance.pk is not None):
+            self.initial['breaks'] = '\n'.join(
+                day.isoformat() for day in self.instance.skipped_days())
+
+    def clean_breaks(self):
+        ranges = []
+        for line in self.cleaned_data['breaks'].splitlines():
+            if not line.strip():
+                continue
+            parts = [part.strip() for part in line.split(' to ')]
+            try:
+                days = [datetime.datetime.strptime(part, '%Y-%m-%d').date() for part in parts]
+            except ValueError:
+                raise forms.ValidationError('"%s" is not a day or a range of days.' % line.strip())
+            if (len(days) > 2 or days[-1] < days[0]):
+                raise forms.ValidationError('"%s" is not a day or a range of days.' % line.strip())
+            ranges.append((days[0], days[-1]))
+        return ranges
+
+    # the listed days replace the skipped days
+    def save(self, commit=True):
+        calendar = super().save(commit=False)
+        calendar.first_day = None
+        calendar.days = b''
+        for start, end in self.cleaned_data['breaks']:
+            calendar.skip(start, end)
+        if commit:
+            calendar.save()
+        return calendar
 
 
 class ECForm(forms.ModelForm):
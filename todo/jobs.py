@@ -0,0 +1,81 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+import datetime
+from .models import RecurrenceJob
+
+# a job left RUNNING this long is assumed to belong to a worker that died and is picked up again
+STALE_JOB_AFTER = datetime.timedelta(minutes=10)
+
+
+# writes the missing occurrences of the job's series and records how it went
+def run_job(job):
+    # recurrences enqueues jobs, so it is imported here
+    from .recurrences import materialize_series
+    try:
+        with transaction.atomic():
+            job.rows_written = len(materialize_series(job.series, job.user))
+        job.status = RecurrenceJob.DONE
+    except Exception as e:
+        job.status = RecurrenceJob.FAILED
+        job.error = str(e)
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'rows_written', 'error', 'finished_at'])
+    return job
+
+
+# the RecurrenceJob row is the queue entry; the run_recurrence_jobs worker picks it up
+class DatabaseJobQueue:
+    def enqueue(self, job):
+        pass
+
+
+# runs jobs right away in the web process; stands in for the worker in tests
+class InProcessJobQueue:
+    def enqueue(self, job):
+        job.status = RecurrenceJob.RUNNING
+        job.started_at = timezone.now()
+        run_job(job)
+
+
+def get_job_queue():
+    return import_string(getattr(settings, 'TODO_JOB_QUEUE', 'todo.jobs.DatabaseJobQueue'))()
+
+
+# queues generation of series' occurrences and returns the job the UI can poll
+def enqueue_series(series, user=None):
+    job = RecurrenceJob.objects.create(series=series, user=user or series.user)
+    get_job_queue().enqueue(job)
+    return job
+
+
+# claims the oldest pending job; locked rows are skipped so several workers can run side by side
+# https://www.postgresql.org/docs/current/sql-select.html#SQL-FOR-UPDATE-SHARE
+def claim_next_job():
+    with transaction.atomic():
+        stale = timezone.now() - STALE_JOB_AFTER
+        job = (RecurrenceJob.objects.select_for_update(skip_locked=True, of=('self',))
+               .filter(Q(status=RecurrenceJob.PENDING) |
+                       Q(status=RecurrenceJob.RUNNING, started_at__lt=stale))
+               .select_related('series')
+               .order_by('created_at').first())
+        if job is None:
+            return None
+        job.status = RecurrenceJob.RUNNING
+        job.started_at = timezone.now()
+        job.save(update_fields=['status', 'started_at'])
+    return job
+
+
+# runs queued jobs until there are none left (or limit were run); returns how many ran
+def run_pending_jobs(limit=None):
+    count = 0
+    while (limit is None or count < limit):
+        job = claim_next_job()
+        if job is None:
+            break
+        run_job(job)
+        count += 1
+    return count
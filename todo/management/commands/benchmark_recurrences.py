@@ -0,0 +1,108 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from dateutil.relativedelta import relativedelta
+import datetime
+import json
+import time
+from todo.models import ToDoItem
+from todo.recurrences import start_series, change_series
+
+FREQUENCIES = ['DAILY', 'WEEKLY', 'MONTHLY', 'YEARLY']
+# 1 month to 5 years
+HORIZON_MONTHS = [1, 3, 12, 60]
+
+
+# rows of table inserted, updated and deleted so far in the current transaction (postgres only)
+# https://www.postgresql.org/docs/current/monitoring-stats.html#MONITORING-PG-STAT-ALL-TABLES-VIEW
+def rows_written(table):
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT n_tup_ins + n_tup_upd + n_tup_del FROM pg_stat_xact_user_tables '
+                       'WHERE relname = %s', [table])
+        row = cursor.fetchone()
+    return row[0] if row else 0
+
+
+# runs operation and returns its wall time, query count and to-do rows written
+def measure(operation):
+    table = ToDoItem._meta.db_table
+    rows_before = rows_written(table)
+    with CaptureQueriesContext(connection) as queries:
+        started = time.perf_counter()
+        operation()
+        seconds = time.perf_counter() - started
+    return {
+        'seconds': round(seconds, 6),
+        'queries': len(queries),
+        'rows_written': rows_written(table) - rows_before,
+    }
+
+
+# times creating a repeating to-do, changing all of its occurrences and editing its rule
+# (which regenerates every later occurrence) for each frequency and horizon; everything runs
+# in a transaction that is rolled back, and the results are printed as JSON so runs can be diffed
+class Command(BaseCommand):
+    help = 'Benchmarks creating and editing repeating to-dos and prints the results as JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--freq', action='append', choices=FREQUENCIES, dest='frequencies',
+                            help='frequency to benchmark (repeatable, default: all)')
+        parser.add_argument('--months', action='append', type=int, dest='horizons',
+                            help='series length in months (repeatable, default: 1, 3, 12 and 60)')
+        parser.add_argument('--repeat', type=int, default=1,
+                            help='run every case this many times')
+        parser.add_argument('--output', help='write the results to this file instead of stdout')
+
+    def handle(self, *args, **options):
+        frequencies = options['frequencies'] or FREQUENCIES
+        horizons = options['horizons'] or HORIZON_MONTHS
+        results = []
+        with transaction.atomic():
+            user = User.objects.create(username='recurrence-benchmark-%d' % time.time_ns())
+            for freq in frequencies:
+                for months in horizons:
+                    for run in range(options['repeat']):
+                        results.extend(self.run_case(user, freq, months, run))
+            transaction.set_rollback(True)
+
+        output = json.dumps({
+            'started': timezone.now().isoformat(),
+            'results': results,
+        }, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+        else:
+            self.stdout.write(output)
+
+    def run_case(self, user, freq, months, run):
+        start = timezone.make_aware(datetime.datetime(2020, 1, 6, 9, 0))
+        todo_item = ToDoItem(title='Benchmark %s %d' % (freq, months), user=user,
+                             duedate=start, recur_freq=freq,
+                             end_recur_date=start + relativedelta(months=+months))
+
+        # every occurrence is written in the call, as without a horizon or worker
+        def create():
+            todo_item.save()
+            start_series(todo_item, user, lazy=False, materialize_all=True)
+
+        def change_all():
+            todo_item.title += ' changed'
+            todo_item.save()
+            change_series(todo_item, ['title'], user, materialize_all=True)
+
+        def edit_recurrences():
+            todo_item.duedate += datetime.timedelta(hours=1)
+            todo_item.save()
+            change_series(todo_item, ['duedate'], user, materialize_all=True)
+
+        results = []
+        for name, operation in [('create', create), ('change_all', change_all),
+                                ('edit_recurrences', edit_recurrences)]:
+            result = {'operation': name, 'freq': freq, 'months': months, 'run': run}
+            result.update(measure(operation))
+            result['occurrences'] = todo_item.series.occurrences.count()
+            results.append(result)
+        return results
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from todo.scheduled import run_scheduled, escalate_priorities
+
+
+# stores the raised priority of open to-dos whose due date is close, for every user;
+# meant for a scheduler; the worker escalates through threshold timers instead (todo/timers.py)
+class Command(BaseCommand):
+    help = 'Raises the stored priority of open to-dos due within one or two days'
+
+    def handle(self, *args, **options):
+        count = run_scheduled('escalate_priorities', escalate_priorities)
+        self.stdout.write('Escalated %d to-do(s)' % count)
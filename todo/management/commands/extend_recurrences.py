@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+import datetime
+from todo.recurrences import extend_recurrences
+
+
+# stores the occurrences of repeating to-dos that moved inside the horizon since the last run;
+# safe to run as often as a scheduler likes, rows that already exist are skipped
+class Command(BaseCommand):
+    help = 'Stores the occurrences of repeating to-dos up to the recurrence horizon'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int,
+                            help='store occurrences this many days ahead instead of TODO_RECURRENCE_HORIZON_DAYS')
+
+    def handle(self, *args, **options):
+        until = None
+        if options['days'] is not None:
+            until = timezone.now() + datetime.timedelta(days=options['days'])
+        count = extend_recurrences(until)
+        self.stdout.write('Stored %d occurrence(s)' % count)
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from todo.rollups import recount
+
+
+# rebuilds the per-day counts of the calendar from the to-dos, e.g. after rows were deleted in bulk
+# from the admin, which does not go through ToDoItem.delete
+class Command(BaseCommand):
+    help = 'Recounts the open and completed to-dos of every user per day'
+
+    def handle(self, *args, **options):
+        count = recount()
+        self.stdout.write('Counted %d day(s)' % count)
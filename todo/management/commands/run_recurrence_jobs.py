@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+import time
+from todo.jobs import run_pending_jobs
+from todo.scheduled import periodic_tasks, run_scheduled
+
+
+# worker process that generates the occurrences of long series queued by the web process
+# https://docs.djangoproject.com/en/3.0/howto/custom-management-commands/
+class Command(BaseCommand):
+    help = 'Generates the occurrences of queued recurrence jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='run the queued jobs and exit instead of polling')
+        parser.add_argument('--poll-interval', type=float, default=2.0,
+                            help='seconds to wait before looking for new jobs')
+
+    def handle(self, *args, **options):
+        while True:
+            count = run_pending_jobs()
+            if count:
+                self.stdout.write('Ran %d recurrence job(s)' % count)
+            # moving the recurrence horizon, escalating priorities; each task keeps its own schedule
+            for name, every, task in periodic_tasks():
+                count = run_scheduled(name, task, every)
+                if count:
+                    self.stdout.write('%s: %d row(s)' % (name, count))
+            if options['once']:
+                break
+            time.sleep(options['poll_interval'])
@@ -0,0 +1,35 @@
+# Generated by Django 3.0.3 on 2026-10-18 19:25
+
+import django.contrib.postgres.fields
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todo', '0055_todoitem_number_of_subtasks'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='todoitem',
+            name='lazy_recurrence',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='todoitem',
+            name='occurrence_date',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='todoitem',
+            name='recurrence_exdates',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.DateTimeField(), blank=True, default=list, size=None),
+        ),
+        migrations.AddField(
+            model_name='todoitem',
+            name='series_root',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='materialized_occurrences', to='todo.ToDoItem'),
+        ),
+    ]
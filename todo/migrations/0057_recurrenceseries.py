@@ -0,0 +1,91 @@
+# Generated by Django 3.0.3 on 2026-10-18 19:27
+
+from django.conf import settings
+import django.contrib.postgres.fields
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+# gives every existing repeating to-do a series: lazy roots keep their rule and exdates, and
+# materialized occurrences are grouped the way EditToDo used to find them (title, recur_freq,
+# end_recur_date, category and user)
+def link_series(apps, schema_editor):
+    ToDoItem = apps.get_model('todo', 'ToDoItem')
+    RecurrenceSeries = apps.get_model('todo', 'RecurrenceSeries')
+
+    def new_series(first, lazy=False, exdates=None):
+        return RecurrenceSeries.objects.create(
+            user_id=first.user_id, recur_freq=first.recur_freq, start_date=first.duedate,
+            end_recur_date=first.end_recur_date, lazy=lazy, exdates=exdates or [],
+            course_id=first.course_id, ec_id=first.ec_id, title=first.title,
+            description=first.description, location=first.location,
+            priority=first.priority, category=first.category)
+
+    for root in ToDoItem.objects.filter(lazy_recurrence=True):
+        series = new_series(root, lazy=True, exdates=root.recurrence_exdates)
+        ToDoItem.objects.filter(pk=root.pk).update(series=series, occurrence_date=root.duedate)
+        ToDoItem.objects.filter(series_root=root).update(series=series)
+
+    groups = {}
+    items = ToDoItem.objects.filter(series__isnull=True).exclude(
+        recur_freq='NEVER').order_by('duedate')
+    for item in items:
+        key = (item.user_id, item.title, item.recur_freq, item.end_recur_date, item.category)
+        groups.setdefault(key, []).append(item)
+    for group in groups.values():
+        series = new_series(group[0])
+        ToDoItem.objects.filter(pk__in=[item.pk for item in group]).update(
+            series=series, occurrence_date=models.F('duedate'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('todo', '0056_auto_20261018_1525'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecurrenceSeries',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recur_freq', models.CharField(choices=[('NEVER', 'Never'), ('DAILY', 'Daily'), ('WEEKLY', 'Weekly'), ('MONTHLY', 'Monthly'), ('YEARLY', 'Yearly')], default='NEVER', max_length=7)),
+                ('start_date', models.DateTimeField(default=django.utils.timezone.now)),
+                ('end_recur_date', models.DateTimeField(default=django.utils.timezone.now)),
+                ('lazy', models.BooleanField(default=False)),
+                ('exdates', django.contrib.postgres.fields.ArrayField(base_field=models.DateTimeField(), blank=True, default=list, size=None)),
+                ('title', models.CharField(max_length=100)),
+                ('description', models.CharField(blank=True, default='', max_length=600)),
+                ('location', models.CharField(blank=True, max_length=50)),
+                ('priority', models.CharField(choices=[('LO', 'Low'), ('MD', 'Medium'), ('HI', 'High')], default='LO', max_length=2)),
+                ('category', models.CharField(choices=[('NN', 'None'), ('AC', 'Academics'), ('EC', 'Extracurriculars'), ('JB', 'Job'), ('SC', 'Social'), ('PS', 'Personal'), ('OT', 'Other')], default='NN', max_length=2)),
+                ('course', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to='todo.Course')),
+                ('ec', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to='todo.Extracurricular')),
+                ('user', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='todoitem',
+            name='series',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='occurrences', to='todo.RecurrenceSeries'),
+        ),
+        migrations.RunPython(link_series, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='todoitem',
+            name='future_events',
+        ),
+        migrations.RemoveField(
+            model_name='todoitem',
+            name='lazy_recurrence',
+        ),
+        migrations.RemoveField(
+            model_name='todoitem',
+            name='recurrence_exdates',
+        ),
+        migrations.RemoveField(
+            model_name='todoitem',
+            name='series_root',
+        ),
+    ]
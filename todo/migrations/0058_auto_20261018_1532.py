@@ -0,0 +1,45 @@
+# Generated by Django 3.0.3 on 2026-10-18 19:32
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todo', '0057_recurrenceseries'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='todoitem',
+            name='has_category_changed',
+        ),
+        migrations.RemoveField(
+            model_name='todoitem',
+            name='has_description_changed',
+        ),
+        migrations.RemoveField(
+            model_name='todoitem',
+            name='has_duedate_changed',
+        ),
+        migrations.RemoveField(
+            model_name='todoitem',
+            name='has_end_recur_date_changed',
+        ),
+        migrations.RemoveField(
+            model_name='todoitem',
+            name='has_location_changed',
+        ),
+        migrations.RemoveField(
+            model_name='todoitem',
+            name='has_priority_changed',
+        ),
+        migrations.RemoveField(
+            model_name='todoitem',
+            name='has_recur_freq_changed',
+        ),
+        migrations.RemoveField(
+            model_name='todoitem',
+            name='has_title_changed',
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 3.0.3 on 2026-10-18 19:39
+
+import django.contrib.postgres.fields
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todo', '0058_auto_20261018_1532'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recurrenceseries',
+            name='recur_count',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='recurrenceseries',
+            name='recur_interval',
+            field=models.PositiveSmallIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='recurrenceseries',
+            name='recur_weekdays',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.PositiveSmallIntegerField(choices=[(0, 'Mon'), (1, 'Tue'), (2, 'Wed'), (3, 'Thu'), (4, 'Fri'), (5, 'Sat'), (6, 'Sun')]), blank=True, default=list, size=None),
+        ),
+        migrations.AddField(
+            model_name='todoitem',
+            name='recur_count',
+            field=models.PositiveIntegerField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(1)], verbose_name='End after'),
+        ),
+        migrations.AddField(
+            model_name='todoitem',
+            name='recur_interval',
+            field=models.PositiveSmallIntegerField(blank=True, default=1, validators=[django.core.validators.MinValueValidator(1)], verbose_name='Every'),
+        ),
+        migrations.AddField(
+            model_name='todoitem',
+            name='recur_weekdays',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.PositiveSmallIntegerField(choices=[(0, 'Mon'), (1, 'Tue'), (2, 'Wed'), (3, 'Thu'), (4, 'Fri'), (5, 'Sat'), (6, 'Sun')]), blank=True, default=list, size=None, verbose_name='On'),
+        ),
+    ]
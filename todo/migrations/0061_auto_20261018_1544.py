@@ -0,0 +1,38 @@
+# Generated by Django 3.0.3 on 2026-10-18 19:44
+
+from django.db import migrations, models
+
+
+# rows that share a series and occurrence date (e.g. created twice by a retried request)
+# keep their first row in the series; the others become standalone to-dos
+def detach_duplicate_occurrences(apps, schema_editor):
+    ToDoItem = apps.get_model('todo', 'ToDoItem')
+    seen = set()
+    duplicates = []
+    items = ToDoItem.objects.filter(series__isnull=False).order_by('id').values_list(
+        'id', 'series_id', 'occurrence_date')
+    for pk, series_id, occurrence_date in items:
+        if ((series_id, occurrence_date) in seen):
+            duplicates.append(pk)
+        seen.add((series_id, occurrence_date))
+    ToDoItem.objects.filter(pk__in=duplicates).update(series=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todo', '0060_auto_20261018_1541'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recurrenceseries',
+            name='materialized_until',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(detach_duplicate_occurrences, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='todoitem',
+            constraint=models.UniqueConstraint(fields=('series', 'occurrence_date'), name='unique_series_occurrence'),
+        ),
+    ]
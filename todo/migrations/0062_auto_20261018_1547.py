@@ -0,0 +1,31 @@
+# Generated by Django 3.0.3 on 2026-10-18 19:47
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('todo', '0061_auto_20261018_1544'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SkipCalendar',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, verbose_name='Name')),
+                ('first_day', models.DateField(blank=True, null=True)),
+                ('days', models.BinaryField(blank=True, default=bytes)),
+                ('user', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='skip_calendar',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='todo.SkipCalendar', verbose_name='Skip Calendar'),
+        ),
+    ]
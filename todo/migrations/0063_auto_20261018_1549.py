@@ -0,0 +1,26 @@
+# Generated by Django 3.0.3 on 2026-10-18 19:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todo', '0062_auto_20261018_1547'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScheduledTaskRun',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('last_run_at', models.DateTimeField(blank=True, null=True)),
+                ('rows_changed', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='todoitem',
+            index=models.Index(fields=['completed', 'duedate'], name='todo_todoit_complet_88852b_idx'),
+        ),
+    ]
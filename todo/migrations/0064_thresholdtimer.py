@@ -0,0 +1,42 @@
+# Generated by Django 3.0.3 on 2026-10-18 19:51
+
+import datetime
+from django.db import migrations, models
+import django.db.models.deletion
+from django.utils import timezone
+
+
+# gives every open to-do that still has a threshold ahead of it its timer (see todo/timers.py)
+def schedule_open_todos(apps, schema_editor):
+    ToDoItem = apps.get_model('todo', 'ToDoItem')
+    ThresholdTimer = apps.get_model('todo', 'ThresholdTimer')
+    thresholds = [('MD', datetime.timedelta(days=2)), ('HI', datetime.timedelta(days=1))]
+    now = timezone.now()
+    timers = []
+    items = ToDoItem.objects.filter(completed=False, duedate__gt=now + thresholds[-1][1])
+    for pk, duedate in items.values_list('id', 'duedate').iterator():
+        for threshold, before in thresholds:
+            if (duedate - before > now):
+                timers.append(ThresholdTimer(todo_id=pk, threshold=threshold, fires_at=duedate - before))
+                break
+    ThresholdTimer.objects.bulk_create(timers, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todo', '0063_auto_20261018_1549'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ThresholdTimer',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('threshold', models.CharField(choices=[('LO', 'Low'), ('MD', 'Medium'), ('HI', 'High')], max_length=2)),
+                ('fires_at', models.DateTimeField(db_index=True)),
+                ('todo', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='threshold_timer', to='todo.ToDoItem')),
+            ],
+        ),
+        migrations.RunPython(schedule_open_todos, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 3.0.3 on 2026-10-18 19:59
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+
+# counts the existing to-dos per user and local day (see todo/rollups.py)
+def count_todos(apps, schema_editor):
+    ToDoItem = apps.get_model('todo', 'ToDoItem')
+    DailyTodoCount = apps.get_model('todo', 'DailyTodoCount')
+    counts = {}
+    rows = (ToDoItem.objects.filter(user__isnull=False).annotate(date=TruncDate('duedate'))
+            .values('user_id', 'date', 'completed').annotate(n=Count('id')).order_by())
+    for row in rows:
+        count = counts.setdefault((row['user_id'], row['date']), DailyTodoCount(
+            user_id=row['user_id'], date=row['date']))
+        if row['completed']:
+            count.completed_count = row['n']
+        else:
+            count.open_count = row['n']
+    DailyTodoCount.objects.bulk_create(counts.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('todo', '0065_note_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyTodoCount',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('open_count', models.IntegerField(default=0)),
+                ('completed_count', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='dailytodocount',
+            constraint=models.UniqueConstraint(fields=('user', 'date'), name='unique_user_date_count'),
+        ),
+        migrations.RunPython(count_todos, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 3.0.3 on 2026-10-18 20:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todo', '0066_dailytodocount'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='todoitem',
+            index=models.Index(fields=['user', 'completed', 'duedate'], name='todo_user_completed_due'),
+        ),
+        migrations.AddIndex(
+            model_name='todoitem',
+            index=models.Index(condition=models.Q(completed=False), fields=['user', 'category', 'duedate'], name='todo_open_user_category_due'),
+        ),
+        migrations.AddIndex(
+            model_name='todoitem',
+            index=models.Index(condition=models.Q(completed=False), fields=['course', 'duedate'], name='todo_open_course_due'),
+        ),
+        migrations.AddIndex(
+            model_name='todoitem',
+            index=models.Index(condition=models.Q(completed=False), fields=['ec', 'duedate'], name='todo_open_ec_due'),
+        ),
+    ]
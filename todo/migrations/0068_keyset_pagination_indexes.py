@@ -0,0 +1,29 @@
+# Generated by Django 3.0.3 on 2026-10-18 20:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todo', '0067_todoitem_access_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='todoitem',
+            name='todo_user_completed_due',
+        ),
+        migrations.RemoveIndex(
+            model_name='todoitem',
+            name='todo_open_user_category_due',
+        ),
+        migrations.AddIndex(
+            model_name='todoitem',
+            index=models.Index(fields=['user', 'completed', 'duedate', 'id'], name='todo_user_completed_due'),
+        ),
+        migrations.AddIndex(
+            model_name='todoitem',
+            index=models.Index(condition=models.Q(completed=False), fields=['user', 'category', 'duedate', 'id'], name='todo_open_user_category_due'),
+        ),
+    ]
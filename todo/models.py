@@ -7,10 +7,78 @@ import datetime
 from django.core.validators import MaxValueValidator, MinValueValidator
 # https://docs.djangoproject.com/en/3.0/ref/contrib/postgres/fields/#arrayfield
 from django.contrib.postgres.fields import ArrayField
+from .priority import effective_priority
 
 # Create your models here.
 
 
+# named set of days (term breaks, holidays) that repeating to-dos of a course skip;
+# bit i of days is set when first_day + i days is skipped, so a whole term is a few dozen bytes
+# and a range of days is tested with one shift and mask of a python int
+class SkipCalendar(models.Model):
+    user = models.ForeignKey(User, null=True, on_delete=models.CASCADE)
+    name = models.CharField(max_length=50, verbose_name='Name')
+    first_day = models.DateField(null=True, blank=True)
+    days = models.BinaryField(default=bytes, blank=True)
+
+    def __str__(self):
+        return self.name
+
+    # the calendar counts of lazy series depend on it (calendar_version, todo/rollups.py)
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        from .rollups import calendar_changed
+        calendar_changed([self.user_id])
+
+    def delete(self, *args, **kwargs):
+        from .rollups import calendar_changed
+        calendar_changed([self.user_id])
+        return super().delete(*args, **kwargs)
+
+    def _bits(self):
+        return int.from_bytes(bytes(self.days), 'little')
+
+    # marks the days from start through end (dates) as skipped
+    def skip(self, start, end=None):
+        end = end or start
+        bits = self._bits()
+        first_day = self.first_day or start
+        if (start < first_day):
+            bits <<= (first_day - start).days
+            first_day = start
+        bits |= ((1 << ((end - start).days + 1)) - 1) << (start - first_day).days
+        self.first_day = first_day
+        self.days = bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+
+    # bits of the days in [start, end), bit k standing for start + k days
+    def mask_between(self, start, end):
+        if (self.first_day is None or end <= start):
+            return 0
+        bits = self._bits()
+        shift = (start - self.first_day).days
+        bits = bits >> shift if shift >= 0 else bits << -shift
+        return bits & ((1 << (end - start).days) - 1)
+
+    def skipped_days(self):
+        bits = self._bits()
+        return [self.first_day + datetime.timedelta(days=k)
+                for k in range(bits.bit_length()) if (bits >> k) & 1]
+
+    # keeps the (index, duedate) pairs whose local date is not skipped; the window the pairs
+    # span is cut out of the bitmap once instead of looking every date up
+    def exclude_skipped(self, occurrences):
+        occurrences = list(occurrences)
+        if (self.first_day is None or not occurrences):
+            return occurrences
+        days = [django.utils.timezone.localdate(duedate) for i, duedate in occurrences]
+        first = min(days)
+        mask = self.mask_between(first, max(days) + datetime.timedelta(days=1))
+        if not mask:
+            return occurrences
+        return [occurrence for occurrence, day in zip(occurrences, days)
+                if not (mask >> (day - first).days) & 1]
+
+
 class Course(models.Model):
     course_name = models.CharField(max_length=50, verbose_name='Course Name')
     course_abbrev = models.CharField(
@@ -18,10 +86,24 @@ class Course(models.Model):
     course_prof = models.CharField(
         max_length=20, verbose_name='Course Professor')
     user = models.ForeignKey(User, null=True, on_delete=models.CASCADE)
+    # repeating to-dos of this course leave out the days of this calendar
+    skip_calendar = models.ForeignKey(SkipCalendar, null=True, blank=True, on_delete=models.SET_NULL,
+                                      verbose_name='Skip Calendar')
 
     def __str__(self):
         return self.course_name
 
+    # the calendar counts of lazy series depend on it (calendar_version, todo/rollups.py)
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        from .rollups import calendar_changed
+        calendar_changed([self.user_id])
+
+    def delete(self, *args, **kwargs):
+        from .rollups import calendar_changed
+        calendar_changed([self.user_id])
+        return super().delete(*args, **kwargs)
+
 
 class Extracurricular(models.Model):
     name = models.CharField(max_length=20, verbose_name="Name")
@@ -68,9 +150,24 @@ class ToDoItem(models.Model):
         choices=FREQ_CHOICES,
         default=NEVER,
     )
-    # customize day of week
-    # every other day
-    # every other week
+    # every other day / every other week
+    recur_interval = models.PositiveSmallIntegerField(
+        default=1, blank=True, validators=[MinValueValidator(1)], verbose_name='Every')
+    # customize day of week (daily and weekly repeats), Monday is 0 like datetime.weekday()
+    WEEKDAY_CHOICES = [
+        (0, 'Mon'),
+        (1, 'Tue'),
+        (2, 'Wed'),
+        (3, 'Thu'),
+        (4, 'Fri'),
+        (5, 'Sat'),
+        (6, 'Sun'),
+    ]
+    recur_weekdays = ArrayField(models.PositiveSmallIntegerField(
+        choices=WEEKDAY_CHOICES), default=list, blank=True, verbose_name='On')
+    # end after N occurrences
+    recur_count = models.PositiveIntegerField(
+        null=True, blank=True, validators=[MinValueValidator(1)], verbose_name='End after')
     end_recur_date = models.DateTimeField(
         default=django.utils.timezone.now, blank=True)
     # end repeat date and time
@@ -110,24 +207,39 @@ class ToDoItem(models.Model):
         verbose_name='Category',
     )
 
-    has_title_changed = models.BooleanField(default=False)
-    has_description_changed = models.BooleanField(default=False)
-    has_duedate_changed = models.BooleanField(default=False)
-    has_location_changed = models.BooleanField(default=False)
-    has_recur_freq_changed = models.BooleanField(default=False)
-    has_end_recur_date_changed = models.BooleanField(default=False)
-    has_category_changed = models.BooleanField(default=False)
-    has_priority_changed = models.BooleanField(default=False)
     user = models.ForeignKey(User, on_delete=models.CASCADE, null=True)
 
-    # array storing id of future events associated with current object
-    future_events = ArrayField(models.IntegerField(
-        default=0), default=list, null=True)
     number_of_subtasks = models.IntegerField( default=0 )
 
+    # series this occurrence belongs to and the rule date it stands in for
+    series = models.ForeignKey('RecurrenceSeries', on_delete=models.SET_NULL, null=True, blank=True,
+                               related_name='occurrences')
+    occurrence_date = models.DateTimeField(null=True, blank=True)
+
     # https://stackoverflow.com/questions/36617145/django-arrayfield-null-true-migration-with-postgresql
     tracker = FieldTracker()  # track changes to fields
 
+    class Meta:
+        # one stored row per rule date, so extend_recurrences can skip rows that already exist
+        constraints = [models.UniqueConstraint(fields=['series', 'occurrence_date'],
+                                               name='unique_series_occurrence')]
+        indexes = [
+            # open to-dos by due date, for scheduled priority escalation
+            models.Index(fields=['completed', 'duedate']),
+            # a user's open or completed to-dos by due date: the to-do list, the completed list, the
+            # calendars; id is the tie-breaker of their pages (todo/pagination.py)
+            models.Index(fields=['user', 'completed', 'duedate', 'id'], name='todo_user_completed_due'),
+            # the category lists and their Today views only ever show open to-dos
+            models.Index(fields=['user', 'category', 'duedate', 'id'], name='todo_open_user_category_due',
+                         condition=models.Q(completed=False)),
+            # a course's / extracurricular's open to-dos due today on the Academics and Extracurriculars
+            # Today views (the full pages read all of a course's to-dos from the foreign key index)
+            models.Index(fields=['course', 'duedate'], name='todo_open_course_due',
+                         condition=models.Q(completed=False)),
+            models.Index(fields=['ec', 'duedate'], name='todo_open_ec_due',
+                         condition=models.Q(completed=False)),
+        ]
+
     def __str__(self):
         return self.title + " " + self.duedate.strftime('%Y-%m-%d')
 
@@ -135,16 +247,175 @@ class ToDoItem(models.Model):
         now = django.utils.timezone.now()
         return now > self.duedate
 
+    # compared as days in the site's time zone, like the Today views
     def is_today_duedate(self):
-        now = django.utils.timezone.now()
         due = self.duedate
-        is_same = (now.day == due.day and now.month == due.month and now.year == due.year)
-        return is_same
+        if django.utils.timezone.is_naive(due):
+            due = django.utils.timezone.make_aware(due)
+        return django.utils.timezone.localtime(due).date() == django.utils.timezone.localdate()
+
+    # priority to show, raised as the duedate gets close; lists annotate it in the query
+    def current_priority(self):
+        if hasattr(self, 'effective_priority'):
+            return self.effective_priority
+        return effective_priority(self.priority, self.duedate, self.completed)
+
+    # keeps the per-day counts of the calendar (DailyTodoCount, todo/rollups.py) in step
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        counted = update_fields is None or {'user', 'user_id', 'duedate', 'completed'}.intersection(update_fields)
+        before = None
+        if not self._state.adding:
+            before = tuple(self.tracker.previous(field) for field in ('user_id', 'duedate', 'completed'))
+        super().save(*args, **kwargs)
+        if counted:
+            from .rollups import count_changed
+            count_changed(before, (self.user_id, self.duedate, self.completed))
+
+    # FieldTracker keeps the values from before a refresh, which would uncount the wrong day
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self.tracker.set_saved_fields(fields=kwargs.get('fields'))
+
+    def delete(self, *args, **kwargs):
+        from .rollups import count_removed
+        count_removed([self])
+        return super().delete(*args, **kwargs)
+
+
+# a repeating to-do: the rule plus the fields every occurrence is created from
+class RecurrenceSeries(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True)
+    recur_freq = models.CharField(
+        max_length=7,
+        choices=ToDoItem.FREQ_CHOICES,
+        default=ToDoItem.NEVER,
+    )
+    recur_interval = models.PositiveSmallIntegerField(default=1)
+    recur_weekdays = ArrayField(models.PositiveSmallIntegerField(
+        choices=ToDoItem.WEEKDAY_CHOICES), default=list, blank=True)
+    recur_count = models.PositiveIntegerField(null=True, blank=True)
+    # duedate of the first occurrence
+    start_date = models.DateTimeField(default=django.utils.timezone.now)
+    end_recur_date = models.DateTimeField(default=django.utils.timezone.now)
+    # lazy series are stored once and their occurrences are expanded on the fly
+    lazy = models.BooleanField(default=False)
+    # rule dates whose occurrence was deleted, so they are not expanded or created again
+    exdates = ArrayField(models.DateTimeField(), default=list, blank=True)
+    # occurrences are stored up to this date and expanded on the fly after it (None: all stored)
+    materialized_until = models.DateTimeField(null=True, blank=True)
+
+    course = models.ForeignKey(Course, on_delete=models.SET_NULL, null=True)
+    ec = models.ForeignKey(Extracurricular, on_delete=models.SET_NULL, null=True)
+    title = models.CharField(max_length=100)
+    description = models.CharField(max_length=600, blank=True, default="")
+    location = models.CharField(max_length=50, blank=True)
+    priority = models.CharField(
+        max_length=2,
+        choices=ToDoItem.PRIORITY_CHOICES,
+        default=ToDoItem.LOW,
+    )
+    category = models.CharField(
+        max_length=2,
+        choices=ToDoItem.CATEGORIES,
+        default='NN',
+    )
+
+    def __str__(self):
+        return self.title + " " + self.recur_freq
+
+    # the calendar counts of lazy series depend on it (calendar_version, todo/rollups.py)
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        from .rollups import calendar_changed
+        calendar_changed([self.user_id])
+
+    def delete(self, *args, **kwargs):
+        from .rollups import calendar_changed
+        calendar_changed([self.user_id])
+        return super().delete(*args, **kwargs)
+
+
+# deferred generation of a long series' occurrences, picked up by the run_recurrence_jobs worker
+class RecurrenceJob(models.Model):
+    PENDING = 'PENDING'
+    RUNNING = 'RUNNING'
+    DONE = 'DONE'
+    FAILED = 'FAILED'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+    series = models.ForeignKey(RecurrenceSeries, on_delete=models.CASCADE, related_name='jobs')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True)
+    status = models.CharField(max_length=7, choices=STATUS_CHOICES, default=PENDING)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    rows_written = models.IntegerField(default=0)
+    error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'created_at'])]
+
+    def __str__(self):
+        return str(self.series) + " " + self.status
+
+
+# next due-date threshold a to-do crosses (see todo/timers.py); the index on fires_at keeps the
+# timers ordered like a priority queue, so a tick reads only the ones that fired
+class ThresholdTimer(models.Model):
+    todo = models.OneToOneField(ToDoItem, on_delete=models.CASCADE, related_name='threshold_timer')
+    threshold = models.CharField(max_length=2, choices=ToDoItem.PRIORITY_CHOICES)
+    fires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return str(self.todo) + " " + self.threshold
+
+
+# when a periodic task (see todo/scheduled.py) last ran, so each run only handles what changed since
+class ScheduledTaskRun(models.Model):
+    name = models.CharField(max_length=50, unique=True)
+    last_run_at = models.DateTimeField(null=True, blank=True)
+    rows_changed = models.IntegerField(default=0)
+
+    def __str__(self):
+        return self.name
+
+
+# number of open and completed to-dos a user has due on a (local) day, kept up to date as to-dos
+# change so the calendar can be drawn without reading them (todo/rollups.py)
+class DailyTodoCount(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    date = models.DateField()
+    open_count = models.IntegerField(default=0)
+    completed_count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['user', 'date'], name='unique_user_date_count')]
+
+    def __str__(self):
+        return '%s %s: %d open, %d completed' % (self.user, self.date, self.open_count, self.completed_count)
 
 
 class Note(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, null=True)
     text = models.TextField()
+    # bumped on every save, so an autosave based on an older text is refused instead of lost
+    version = models.PositiveIntegerField(default=0)
+
+    # the notes panel reads the text from a per-user cache entry (todo/notes.py)
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        from .notes import forget_note
+        forget_note(self.user_id)
+
+    def delete(self, *args, **kwargs):
+        from .notes import forget_note
+        forget_note(self.user_id)
+        return super().delete(*args, **kwargs)
 
 
 class SubTask(models.Model):
@@ -0,0 +1,116 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db import transaction
+from .models import Note
+
+
+def note_cache():
+    return caches[getattr(settings, 'TODO_NOTES_CACHE', 'default')]
+
+
+def note_cache_key(user_id):
+    return 'todo:note:%d' % user_id
+
+
+def note_data(note):
+    return {'text': note.text, 'version': note.version}
+
+
+# {'text', 'version'} of user's notes panel, from the per-user cache entry when there is one;
+# users who never saved a note have no row and get an empty text at version 0
+def get_note(user):
+    if not user.is_authenticated:
+        return {'text': '', 'version': 0}
+    cache = note_cache()
+    data = cache.get(note_cache_key(user.id))
+    if data is None:
+        note = Note.objects.filter(user=user).first()
+        data = note_data(note) if note else {'text': '', 'version': 0}
+        cache.set(note_cache_key(user.id), data, None)
+    return data
+
+
+def get_note_text(user):
+    return get_note(user)['text']
+
+
+# note of request.user, loaded at most once per request
+def request_note(request):
+    if not hasattr(request, '_todo_note'):
+        request._todo_note = get_note(request.user)
+    return request._todo_note
+
+
+# the note row of user, locked until the transaction ends; created the first time anything is saved.
+# Note.user is not unique, so the user's row is locked first: two first saves at once (an autosave
+# and a Save click) wait for each other instead of both inserting a note
+def _locked_note(user):
+    User.objects.select_for_update().get(pk=user.pk)
+    note = Note.objects.select_for_update().filter(user=user).order_by('id').first()
+    if note is None:
+        note = Note.objects.create(user=user, text='')
+    return note
+
+
+def _store(note):
+    note.version += 1
+    note.save()
+    note_cache().set(note_cache_key(note.user_id), note_data(note), None)
+    return note
+
+
+# replaces the text of user's note
+def save_note(user, text):
+    with transaction.atomic():
+        note = _locked_note(user)
+        note.text = text
+        return _store(note)
+
+
+# raised when a patch was made against an older version of the note
+class NoteConflict(Exception):
+    def __init__(self, note):
+        super().__init__('note is at version %d' % note.version)
+        self.note = note
+
+
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+# raises ValueError unless version is a version number and patches a list of {'start', 'end', 'text'}
+# with 0 <= start <= end; checked before the note is read, so a malformed request is never a conflict
+def check_patches(version, patches):
+    if not (_is_int(version) and isinstance(patches, list)):
+        raise ValueError('version must be an integer and patches a list')
+    for patch in patches:
+        if not (isinstance(patch, dict) and _is_int(patch.get('start')) and _is_int(patch.get('end'))
+                and isinstance(patch.get('text'), str) and 0 <= patch['start'] <= patch['end']):
+            raise ValueError('invalid patch %r' % (patch,))
+
+
+# applies patches ({'start', 'end', 'text'}: replace text[start:end], each against the result of
+# the ones before it) to user's note if it is still at version; the whole list is applied or none
+# of it. Raises ValueError for a malformed request or a patch outside the text and NoteConflict if
+# the note moved on
+def patch_note(user, version, patches):
+    check_patches(version, patches)
+    with transaction.atomic():
+        note = _locked_note(user)
+        if (note.version != version):
+            raise NoteConflict(note)
+        text = note.text
+        for patch in patches:
+            start, end, insert = patch['start'], patch['end'], patch['text']
+            if (end > len(text)):
+                raise ValueError('patch %r does not fit a text of length %d' % (patch, len(text)))
+            text = text[:start] + insert + text[end:]
+        note.text = text
+        return _store(note)
+
+
+# drops the cached note after it was changed elsewhere (e.g. the admin)
+def forget_note(user_id):
+    if user_id is not None:
+        note_cache().delete(note_cache_key(user_id))
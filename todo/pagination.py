@@ -0,0 +1,53 @@
+from django.http import Http404
+from django.utils import timezone
+import datetime
+
+# to-dos per page of the lists
+PAGE_SIZE = 50
+
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+# "<duedate in microseconds since 1970>-<id>" of the last to-do of a page, which the next page starts after
+def encode_cursor(todo_item):
+    return '%d-%d' % ((todo_item.duedate - EPOCH) // datetime.timedelta(microseconds=1), todo_item.pk)
+
+
+# (duedate, id) of a cursor; raises ValueError (or OverflowError) for anything encode_cursor did not make
+def decode_cursor(cursor):
+    microseconds, pk = cursor.rsplit('-', 1)
+    return EPOCH + datetime.timedelta(microseconds=int(microseconds)), int(pk)
+
+
+# keyset ("seek") pagination on (duedate, id): the page is read from the index position of the
+# cursor on, so a deep page costs as much as the first one, unlike an OFFSET that reads every row
+# before it. Returns (to-dos, cursor of the next page or None)
+# https://use-the-index-luke.com/no-offset
+def keyset_page(queryset, cursor=None, size=PAGE_SIZE):
+    if cursor:
+        duedate, pk = decode_cursor(cursor)
+        # duedate__gte gives the index scan its start, the exclude drops the rows up to the cursor
+        queryset = queryset.filter(duedate__gte=duedate).exclude(duedate=duedate, pk__lte=pk)
+    todo_items = list(queryset.order_by('duedate', 'id')[:size + 1])
+    if (len(todo_items) > size):
+        return todo_items[:size], encode_cursor(todo_items[size - 1])
+    return todo_items, None
+
+
+# paginates a ListView of to-dos with keyset_page: ?after=<cursor> shows the page after the cursor
+# and the template gets next_cursor for its "Load more" link
+class KeysetPaginationMixin:
+    page_size = PAGE_SIZE
+
+    def get_context_data(self, **kwargs):
+        try:
+            todo_items, next_cursor = keyset_page(self.object_list, self.request.GET.get('after'), self.page_size)
+        except (ValueError, OverflowError):
+            raise Http404('Invalid cursor')
+        context = super().get_context_data(object_list=self.paginated(todo_items, next_cursor), **kwargs)
+        context['next_cursor'] = next_cursor
+        return context
+
+    # hook for views that add to the rows of a page
+    def paginated(self, todo_items, next_cursor):
+        return todo_items
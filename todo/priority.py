@@ -0,0 +1,52 @@
+from django.conf import settings
+from django.db.models import Case, CharField, IntegerField, Q, Value, When
+from django.utils import timezone
+import datetime
+
+# a to-do due within these is shown as high / at least medium priority
+HIGH_WITHIN = datetime.timedelta(days=1)
+MEDIUM_WITHIN = datetime.timedelta(days=2)
+
+# HI sorts first
+PRIORITY_RANK = {'HI': 0, 'MD': 1, 'LO': 2}
+
+
+# stored priorities are only escalated if the site asks for it; lists raise them when read anyway
+def stored_escalation_enabled():
+    return getattr(settings, 'TODO_STORED_PRIORITY_ESCALATION', False)
+
+
+# priority a to-do is shown with: the stored priority, raised as the duedate gets close;
+# computed when it is read so the stored priority only changes when the user changes it
+def effective_priority(priority, duedate, completed, now=None):
+    if completed:
+        return priority
+    now = now or timezone.now()
+    if (duedate - now <= HIGH_WITHIN):
+        return 'HI'
+    if (duedate - now <= MEDIUM_WITHIN and priority != 'HI'):
+        return 'MD'
+    return priority
+
+
+# the same rule as a conditional expression, so lists can be filtered and sorted by it in the query
+# https://docs.djangoproject.com/en/3.0/ref/models/conditional-expressions/
+def effective_priority_expression(now=None):
+    now = now or timezone.now()
+    not_done = Q(completed=False)
+    return Case(
+        When(not_done & Q(duedate__lte=now + HIGH_WITHIN), then=Value('HI')),
+        When(not_done & Q(duedate__lte=now + MEDIUM_WITHIN) & ~Q(priority='HI'), then=Value('MD')),
+        default='priority',
+        output_field=CharField(),
+    )
+
+
+# annotates effective_priority and priority_rank (0 for HI) on a ToDoItem queryset
+def with_effective_priority(queryset, now=None):
+    queryset = queryset.annotate(effective_priority=effective_priority_expression(now))
+    return queryset.annotate(priority_rank=Case(
+        *[When(effective_priority=priority, then=Value(rank))
+          for priority, rank in PRIORITY_RANK.items()],
+        output_field=IntegerField(),
+    ))
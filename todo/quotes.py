@@ -0,0 +1,117 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection
+from django.utils import timezone
+from django.utils.module_loading import import_string
+import datetime
+import json
+import threading
+import requests
+
+# shown when no quote could be fetched yet
+DEFAULT_QUOTE = "Let's get things done today"
+
+QUOTE_KEY = 'todo:quote'
+REFRESH_LOCK_KEY = 'todo:quote:refreshing'
+BREAKER_KEY = 'todo:quote:breaker'
+
+# a cached quote is refreshed once it is this old, and kept (stale) for a week in case refreshes fail
+FRESH_FOR = datetime.timedelta(hours=24)
+KEEP_FOR = 7 * 24 * 60 * 60
+# consecutive failures that open the circuit breaker, and how long it stays open
+BREAKER_FAILURES = 3
+BREAKER_OPEN_FOR = datetime.timedelta(minutes=5)
+
+
+# quote of the day from the quotes.rest API (https://quotes.rest/), with a hard timeout
+class QuotesRestProvider:
+    def __init__(self, url='https://quotes.rest/qod', timeout=2.0):
+        self.url = url
+        self.timeout = timeout
+
+    def get_quote(self):
+        resp = requests.get(self.url, timeout=self.timeout)
+        resp.raise_for_status()
+        return parse_quote(resp.json())
+
+
+# quote read from a JSON file in the quotes.rest format, for tests and offline development
+class FileQuoteProvider:
+    def __init__(self, path):
+        self.path = path
+
+    def get_quote(self):
+        with open(self.path) as f:
+            return parse_quote(json.load(f))
+
+
+# "quote - author" from a quotes.rest response; raises ValueError on an error response
+def parse_quote(resp):
+    if ('error' in resp):
+        raise ValueError(resp['error'])
+    quote = resp['contents']['quotes'][0]
+    return quote['quote'] + ' - ' + quote['author']
+
+
+def quote_cache():
+    return caches[getattr(settings, 'TODO_QUOTE_CACHE', 'default')]
+
+
+def get_provider():
+    provider = getattr(settings, 'TODO_QUOTE_PROVIDER', 'todo.quotes.QuotesRestProvider')
+    return import_string(provider)(**getattr(settings, 'TODO_QUOTE_PROVIDER_OPTIONS', {}))
+
+
+def breaker_open(cache):
+    breaker = cache.get(BREAKER_KEY)
+    return (breaker is not None and breaker.get('open_until') is not None and
+            breaker['open_until'] > timezone.now())
+
+
+# fetches a new quote into the cache; after BREAKER_FAILURES failures in a row the provider is
+# left alone for BREAKER_OPEN_FOR. Returns the quote, None if it could not be fetched
+def refresh_quote():
+    cache = quote_cache()
+    if breaker_open(cache):
+        return None
+    try:
+        quote = get_provider().get_quote()
+    except Exception:
+        breaker = cache.get(BREAKER_KEY) or {'failures': 0, 'open_until': None}
+        breaker['failures'] += 1
+        if (breaker['failures'] >= BREAKER_FAILURES):
+            breaker = {'failures': 0, 'open_until': timezone.now() + BREAKER_OPEN_FOR}
+        cache.set(BREAKER_KEY, breaker, KEEP_FOR)
+        return None
+    cache.set(QUOTE_KEY, {'quote': quote, 'fetched_at': timezone.now()}, KEEP_FOR)
+    cache.delete(BREAKER_KEY)
+    return quote
+
+
+def _refresh_in_background():
+    try:
+        refresh_quote()
+    finally:
+        quote_cache().delete(REFRESH_LOCK_KEY)
+        # the thread opened its own connection for the database cache
+        connection.close()
+
+
+# quote of the day; a stale quote is served while one request refreshes it in the background,
+# and only the very first request (nothing cached) waits for the provider
+def get_quote():
+    cache = quote_cache()
+    cached = cache.get(QUOTE_KEY)
+    if cached is None:
+        return refresh_quote() or DEFAULT_QUOTE
+    if (timezone.now() - cached['fetched_at'] >= FRESH_FOR and not breaker_open(cache)):
+        # cache.add only succeeds for one request, which does the refresh
+        if cache.add(REFRESH_LOCK_KEY, True, 60):
+            if getattr(settings, 'TODO_QUOTE_REFRESH_IN_BACKGROUND', True):
+                threading.Thread(target=_refresh_in_background, daemon=True).start()
+            else:
+                try:
+                    refresh_quote()
+                finally:
+                    cache.delete(REFRESH_LOCK_KEY)
+    return cached['quote']
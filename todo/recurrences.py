@@ -0,0 +1,365 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+import datetime
+from .models import ToDoItem, RecurrenceSeries
+from .priority import effective_priority
+from .rrule import RecurrenceRule
+from .timers import schedule, schedule_new
+from .jobs import enqueue_series
+from .rollups import calendar_changed, count_added, delete_todos, local_date, recount
+
+# number of rows sent per INSERT when materializing a series
+BULK_CREATE_BATCH_SIZE = 500
+
+# fields a series copies from the to-do it is started from and hands to every occurrence
+SERIES_FIELDS = ['course_id', 'ec_id', 'title', 'description', 'location', 'priority', 'category']
+# fields of a to-do that make up the rule, besides its duedate
+RULE_FIELDS = ['recur_freq', 'recur_interval', 'recur_weekdays', 'recur_count', 'end_recur_date']
+
+
+# compiled recurrence rule of series
+def series_rule(series):
+    return RecurrenceRule.from_series(series)
+
+
+# (index, duedate) pairs of series without the days its course's skip calendar leaves out
+def without_skipped(series, occurrences):
+    if (series.course_id is None or series.course.skip_calendar_id is None):
+        return list(occurrences)
+    return series.course.skip_calendar.exclude_skipped(occurrences)
+
+
+# duedates of every occurrence after the first one
+def recurrence_duedates(series):
+    rule = series_rule(series)
+    return [duedate for i, duedate in without_skipped(
+        series, ((i, rule.at(i)) for i in range(1, len(rule))))]
+
+
+# unsaved occurrence of series due at duedate
+def build_occurrence(series, duedate, user=None):
+    return ToDoItem(
+        course_id=series.course_id,
+        ec_id=series.ec_id,
+        title=series.title,
+        description=series.description,
+        location=series.location,
+        duedate=duedate,
+        recur_freq=series.recur_freq,
+        recur_interval=series.recur_interval,
+        recur_weekdays=series.recur_weekdays,
+        recur_count=series.recur_count,
+        end_recur_date=series.end_recur_date,
+        priority=series.priority,
+        category=series.category,
+        user_id=user.id if user else series.user_id,
+        series=series,
+        occurrence_date=duedate,
+        # progress default 0
+        # completed = default False
+    )
+
+
+# occurrences are only stored up to this point; later ones are shown from the rule
+# and extend_recurrences stores them as the horizon moves forward (None stores everything)
+def recurrence_horizon():
+    days = getattr(settings, 'TODO_RECURRENCE_HORIZON_DAYS', None)
+    if days is None:
+        return None
+    return timezone.now() + datetime.timedelta(days=days)
+
+
+# true if an occurrence of series due at duedate is stored rather than expanded on the fly
+def is_materialized(series, duedate):
+    return (not series.lazy and
+            (series.materialized_until is None or duedate <= series.materialized_until))
+
+
+# inserts the occurrences of series up to its horizon that are neither stored nor deleted, with
+# chunked bulk inserts; running it again writes nothing, so a retried job is harmless
+def materialize_series(series, user=None):
+    stored = set(series.occurrences.values_list('occurrence_date', flat=True))
+    stored.update(series.exdates)
+    occurrences = [build_occurrence(series, duedate, user)
+                   for duedate in recurrence_duedates(series)
+                   if duedate not in stored and is_materialized(series, duedate)]
+    with transaction.atomic():
+        ToDoItem.objects.bulk_create(
+            occurrences, batch_size=BULK_CREATE_BATCH_SIZE)
+        schedule_new(occurrences)
+        count_added(occurrences)
+    return occurrences
+
+
+# series adding more rows than this are generated by the worker instead of inside the request
+def sync_recurrence_limit():
+    return getattr(settings, 'TODO_SYNC_RECURRENCE_LIMIT', 500)
+
+
+# true when newly added recurring items should be stored once and expanded on the fly
+def lazy_recurrences_enabled():
+    return getattr(settings, 'TODO_LAZY_RECURRENCES', False)
+
+
+# (re)starts a series with todo_item as its first occurrence and the rule and fields todo_item has now;
+# if todo_item is not the first occurrence of its series, the earlier occurrences keep the old series.
+# Occurrences already stored from todo_item on are diffed against the new rule: rows on dates the
+# rule keeps are left alone (with their progress, completion and subtasks), rows on dates it drops
+# are deleted and only the dates that are new get inserted. materialize_all stores every occurrence
+# in the call, past the horizon and however many there are, instead of leaving them to the worker
+def start_series(todo_item, user=None, lazy=None, materialize_all=False):
+    series = todo_item.series
+    if lazy is None:
+        lazy = series.lazy if series else lazy_recurrences_enabled()
+    with transaction.atomic():
+        existing = {}
+        exdates = []
+        if (series is not None):
+            # moving todo_item earlier also takes in the occurrences it moved in front of
+            since = min(todo_item.duedate, todo_item.occurrence_date or todo_item.duedate)
+            stored = series.occurrences.filter(occurrence_date__gte=since).exclude(pk=todo_item.pk)
+            existing = dict(stored.values_list('occurrence_date', 'id'))
+            exdates = series.exdates
+            if (series.occurrences.filter(occurrence_date__lt=since).exists()):
+                series.end_recur_date = since - datetime.timedelta(microseconds=1)
+                series.save(update_fields=['end_recur_date'])
+                series = None
+        if series is None:
+            series = RecurrenceSeries()
+        series.user = user or todo_item.user
+        series.start_date = todo_item.duedate
+        for field in RULE_FIELDS:
+            setattr(series, field, getattr(todo_item, field))
+        series.lazy = lazy
+        for field in SERIES_FIELDS:
+            setattr(series, field, getattr(todo_item, field))
+        new_dates = set(recurrence_duedates(series))
+        series.exdates = [exdate for exdate in exdates if exdate in new_dates]
+        series.materialized_until = None if (lazy or materialize_all) else recurrence_horizon()
+        series.save()
+
+        # includes the row todo_item moves onto, which it replaces
+        dropped = [pk for occurrence_date, pk in existing.items() if occurrence_date not in new_dates]
+        if dropped:
+            delete_todos(ToDoItem.objects.filter(pk__in=dropped))
+
+        todo_item.series = series
+        todo_item.occurrence_date = todo_item.duedate
+        todo_item.save(update_fields=['series', 'occurrence_date'])
+        if (len(dropped) < len(existing)):
+            stored.update(series=series, **{field: getattr(series, field) for field in RULE_FIELDS})
+        if not lazy:
+            missing = sorted(duedate for duedate in new_dates.difference(existing).difference(series.exdates)
+                             if is_materialized(series, duedate))
+            if (not materialize_all and len(missing) > sync_recurrence_limit()):
+                enqueue_series(series, user)
+            else:
+                created = ToDoItem.objects.bulk_create(
+                    [build_occurrence(series, duedate, user) for duedate in missing],
+                    batch_size=BULK_CREATE_BATCH_SIZE)
+                schedule_new(created)
+                count_added(created)
+    return series
+
+
+# cuts the series of todo_item off right before todo_item and takes todo_item out of it
+def end_series(todo_item):
+    series = todo_item.series
+    if series is None:
+        return
+    series.end_recur_date = todo_item.occurrence_date - datetime.timedelta(microseconds=1)
+    series.save(update_fields=['end_recur_date'])
+    todo_item.series = None
+    todo_item.save(update_fields=['series'])
+
+
+# applies an edit of todo_item to every later occurrence of its series in one transaction:
+# one UPDATE for changed fields, or a diff against the new rule when the rule changed
+# (materialize_all is passed on to start_series)
+def change_series(todo_item, changed_fields, user=None, materialize_all=False):
+    changed_fields = set(changed_fields)
+    with transaction.atomic():
+        if (todo_item.series_id is not None):
+            # course and ec always follow the edited occurrence
+            fields = [field for field in SERIES_FIELDS
+                      if field in changed_fields or field in ('course_id', 'ec_id')]
+            future_occurrences(todo_item).update(
+                **{field: getattr(todo_item, field) for field in fields})
+        # changing the rule or the duedate it starts from regenerates the later occurrences
+        if not changed_fields.intersection(RULE_FIELDS + ['duedate']):
+            if (todo_item.series_id is not None):
+                RecurrenceSeries.objects.filter(pk=todo_item.series_id).update(
+                    **{field: getattr(todo_item, field) for field in SERIES_FIELDS})
+                calendar_changed([todo_item.user_id])
+            return
+
+        # the later occurrences are diffed against the new rule
+        if (todo_item.recur_freq != 'NEVER'):
+            start_series(todo_item, user, materialize_all=materialize_all)
+        # no longer repeating: the series stops before todo_item
+        elif (todo_item.series_id is not None):
+            delete_todos(future_occurrences(todo_item))
+            end_series(todo_item)
+
+
+# occurrences of todo_item's series that come after it
+def future_occurrences(todo_item):
+    if todo_item.series_id is None:
+        return ToDoItem.objects.none()
+    return ToDoItem.objects.filter(series_id=todo_item.series_id,
+                                   occurrence_date__gt=todo_item.occurrence_date)
+
+
+############## lazy series ##############
+
+# stand-in for an occurrence of a lazy series that has no row in the database yet
+class VirtualOccurrence:
+    is_virtual = True
+    completed = False
+    progress = 0
+    number_of_subtasks = 0
+
+    def __init__(self, series, index, duedate):
+        self.series = series
+        self.index = index
+        self.duedate = duedate
+        self.title = series.title
+        self.description = series.description
+        self.location = series.location
+        self.course = series.course
+        self.ec = series.ec
+        self.priority = series.priority
+        self.category = series.category
+        self.recur_freq = series.recur_freq
+        self.end_recur_date = series.end_recur_date
+        self.user_id = series.user_id
+
+    @property
+    def series_id(self):
+        return self.series.id
+
+    def get_category_display(self):
+        return self.series.get_category_display()
+
+    def __str__(self):
+        return self.title + " " + self.duedate.strftime('%Y-%m-%d')
+
+    def is_past_due(self):
+        return timezone.now() > self.duedate
+
+    def is_today_duedate(self):
+        return timezone.localdate() == timezone.localdate(self.duedate)
+
+    def current_priority(self):
+        return effective_priority(self.priority, self.duedate, self.completed)
+
+
+# series of user that may have occurrences in [start, end) that are not stored:
+# lazy series, and series whose stored occurrences stop before end
+def lazy_series_in_window(user, start, end, **filters):
+    return RecurrenceSeries.objects.filter(Q(lazy=True) | Q(materialized_until__lt=end),
+                                           user=user, start_date__lt=end, end_recur_date__gte=start,
+                                           **filters).select_related('course__skip_calendar', 'ec')
+
+
+# virtual occurrences of the given lazy series that fall in [start, end),
+# leaving out occurrences that were materialized or deleted
+def expand_recurrences(series_list, start, end):
+    series_list = list(series_list)
+    if not series_list:
+        return []
+    materialized = set(ToDoItem.objects.filter(series__in=series_list,
+                                               occurrence_date__gte=start,
+                                               occurrence_date__lt=end,
+                                               ).values_list('series_id', 'occurrence_date'))
+    occurrences = []
+    for series in series_list:
+        exdates = set(series.exdates)
+        for i, duedate in without_skipped(series, series_rule(series).between(start, end)):
+            if is_materialized(series, duedate):
+                continue
+            if ((series.id, duedate) not in materialized and duedate not in exdates):
+                occurrences.append(VirtualOccurrence(series, i, duedate))
+    return occurrences
+
+
+# virtual occurrences of every lazy series of user in [start, end)
+def virtual_occurrences(user, start, end, **filters):
+    if not user.is_authenticated:
+        return []
+    return expand_recurrences(lazy_series_in_window(user, start, end, **filters), start, end)
+
+
+# rule date of the index-th occurrence of a series if it is expanded on the fly rather than stored,
+# otherwise None
+def lazy_occurrence_date(series, index):
+    duedate = series_rule(series).at(index)
+    if (duedate is None or is_materialized(series, duedate) or duedate in series.exdates or
+            not without_skipped(series, [(index, duedate)])):
+        return None
+    return duedate
+
+
+# gives the index-th occurrence of a lazy series, or one past a series' horizon, a row of its own
+# so it can be completed, edited or get subtasks; returns the existing row if it was already materialized
+def materialize_occurrence(series, index):
+    occurrence_date = lazy_occurrence_date(series, index)
+    if occurrence_date is None:
+        return None
+    todo_item = series.occurrences.filter(occurrence_date=occurrence_date).first()
+    if todo_item is None:
+        todo_item = build_occurrence(series, occurrence_date)
+        todo_item.save()
+        schedule(todo_item)
+    return todo_item
+
+
+# removes a single rule date from a series so it is no longer expanded or created again
+def exclude_occurrence(series, occurrence_date):
+    if (occurrence_date not in series.exdates):
+        series.exdates.append(occurrence_date)
+        series.save(update_fields=['exdates'])
+
+
+# stores the occurrences of every stored series up to until (the horizon by default) with chunked
+# inserts that skip rows already there (upsert on series + occurrence date), and moves
+# each series' materialized_until forward; returns how many occurrences were inserted or already stored
+def extend_recurrences(until=None):
+    until = until or recurrence_horizon()
+    if until is None:
+        return 0
+    due = (RecurrenceSeries.objects.filter(lazy=False, materialized_until__lt=until)
+           .exclude(end_recur_date__lte=F('materialized_until'))
+           .select_related('course__skip_calendar').order_by('id'))
+    written = 0
+    occurrences = []
+    series_ids = []
+
+    def flush():
+        with transaction.atomic():
+            created = ToDoItem.objects.bulk_create(
+                occurrences, batch_size=BULK_CREATE_BATCH_SIZE, ignore_conflicts=True)
+            RecurrenceSeries.objects.filter(pk__in=series_ids).update(materialized_until=until)
+            # rows skipped as conflicts come back without a pk, so the new ones are read back
+            schedule_new(ToDoItem.objects.filter(series_id__in=series_ids, threshold_timer__isnull=True,
+                                                 completed=False, duedate__gt=timezone.now()))
+            if occurrences:
+                days = [local_date(occurrence.duedate) for occurrence in occurrences]
+                recount({occurrence.user_id for occurrence in occurrences}, min(days), max(days))
+        return len(created)
+
+    for series in due.iterator():
+        exdates = set(series.exdates)
+        after = series.materialized_until + datetime.timedelta(microseconds=1)
+        occurrences.extend(build_occurrence(series, duedate) for i, duedate in without_skipped(
+            series, series_rule(series).between(after, until)) if duedate not in exdates)
+        series_ids.append(series.id)
+        if (len(occurrences) >= BULK_CREATE_BATCH_SIZE):
+            written += flush()
+            occurrences = []
+            series_ids = []
+    if series_ids:
+        written += flush()
+    return written
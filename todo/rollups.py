@@ -0,0 +1,175 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+import datetime
+import uuid
+from .models import ToDoItem, DailyTodoCount
+
+
+# day a duedate falls on in the site's time zone, which is the day the calendar shows it on
+def local_date(duedate):
+    return timezone.localtime(duedate).date()
+
+
+# [start, end) duedates of the local days first_day..last_day (today if not given), so a day is
+# filtered as a duedate range the (completed, duedate) index can serve instead of per-row
+# EXTRACTs of the year, month and day
+def day_window(first_day=None, last_day=None):
+    first_day = first_day or timezone.localdate()
+    last_day = last_day or first_day
+    start = timezone.make_aware(datetime.datetime.combine(first_day, datetime.time()))
+    end = timezone.make_aware(datetime.datetime.combine(last_day + datetime.timedelta(days=1), datetime.time()))
+    return start, end
+
+
+CALENDAR_VERSION_KEY = 'todo:calendar:version'
+
+
+def calendar_cache():
+    return caches[getattr(settings, 'TODO_CALENDAR_CACHE', 'default')]
+
+
+def calendar_version_key(user_id):
+    return '%s:%d' % (CALENDAR_VERSION_KEY, user_id)
+
+
+# opaque version of everything the calendar counts of user_id are built from (the stored counts,
+# the lazy series and the skip calendars), so the calendar feed can answer a revalidation without
+# counting anything. A version lost from the cache is simply replaced by a new one
+def calendar_version(user_id):
+    cache = calendar_cache()
+    keys = [CALENDAR_VERSION_KEY, calendar_version_key(user_id)]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            versions[key] = uuid.uuid4().hex
+            cache.set(key, versions[key], None)
+    return '-'.join(versions[key] for key in keys)
+
+
+# starts new calendar versions for user_ids (for every user if None); again once the transaction
+# commits, so a version read in between is not kept for the data committed after it
+def calendar_changed(user_ids=None):
+    if user_ids is None:
+        keys = [CALENDAR_VERSION_KEY]
+    else:
+        keys = [calendar_version_key(user_id) for user_id in set(user_ids) if user_id is not None]
+    if not keys:
+        return
+    calendar_cache().delete_many(keys)
+    if connection.in_atomic_block:
+        transaction.on_commit(lambda: calendar_cache().delete_many(keys))
+
+
+# adds deltas ({(user_id, date): (open, completed)}) to the stored counts with a single upsert,
+# however many days changed
+# https://www.postgresql.org/docs/current/sql-insert.html#SQL-ON-CONFLICT
+def apply_deltas(deltas):
+    rows = [(user_id, date, open_delta, completed_delta)
+            for (user_id, date), (open_delta, completed_delta) in deltas.items()
+            if user_id is not None and (open_delta, completed_delta) != (0, 0)]
+    if not rows:
+        return
+    table = DailyTodoCount._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'INSERT INTO {0} (user_id, date, open_count, completed_count) VALUES {1} '
+            'ON CONFLICT (user_id, date) DO UPDATE SET '
+            'open_count = {0}.open_count + EXCLUDED.open_count, '
+            'completed_count = {0}.completed_count + EXCLUDED.completed_count'.format(
+                table, ', '.join(['(%s, %s, %s, %s)'] * len(rows))),
+            [value for row in rows for value in row])
+    calendar_changed(row[0] for row in rows)
+
+
+def _add(deltas, user_id, duedate, completed, n):
+    key = (user_id, local_date(duedate))
+    open_delta, completed_delta = deltas.get(key, (0, 0))
+    if completed:
+        deltas[key] = (open_delta, completed_delta + n)
+    else:
+        deltas[key] = (open_delta + n, completed_delta)
+
+
+def _deltas(todo_items, n):
+    deltas = {}
+    for todo_item in todo_items:
+        _add(deltas, todo_item.user_id, todo_item.duedate, todo_item.completed, n)
+    return deltas
+
+
+# counts to-dos that were just inserted (also with bulk_create)
+def count_added(todo_items):
+    apply_deltas(_deltas(todo_items, 1))
+
+
+# uncounts to-dos that are about to be deleted
+def count_removed(todo_items):
+    apply_deltas(_deltas(todo_items, -1))
+
+
+# moves a saved to-do from its old (user_id, duedate, completed) to the new one; before is None
+# if it was just added
+def count_changed(before, after):
+    if (before == after):
+        return
+    deltas = {}
+    if before is not None:
+        _add(deltas, *before, -1)
+    _add(deltas, *after, 1)
+    apply_deltas(deltas)
+
+
+# deletes the to-dos of a queryset and uncounts them; only the counted fields are read
+def delete_todos(queryset):
+    with transaction.atomic():
+        count_removed(queryset.only('user_id', 'duedate', 'completed'))
+        return queryset.delete()
+
+
+# recounts the days first_day..last_day of users from the to-dos themselves, for inserts that
+# cannot tell which rows they added (bulk_create with ignore_conflicts); None recounts everything
+def recount(user_ids=None, first_day=None, last_day=None):
+    todo_items = ToDoItem.objects.filter(user__isnull=False)
+    counts = DailyTodoCount.objects.all()
+    if user_ids is not None:
+        todo_items = todo_items.filter(user_id__in=user_ids)
+        counts = counts.filter(user_id__in=user_ids)
+    if first_day is not None:
+        todo_items = todo_items.filter(duedate__gte=day_window(first_day)[0])
+        counts = counts.filter(date__gte=first_day)
+    if last_day is not None:
+        todo_items = todo_items.filter(duedate__lt=day_window(last_day)[1])
+        counts = counts.filter(date__lte=last_day)
+    # TruncDate groups by the day in the current time zone, like local_date
+    rows = {}
+    for row in (todo_items.annotate(date=TruncDate('duedate'))
+                .values('user_id', 'date', 'completed').annotate(n=Count('id')).order_by()):
+        count = rows.setdefault((row['user_id'], row['date']), DailyTodoCount(
+            user_id=row['user_id'], date=row['date']))
+        if row['completed']:
+            count.completed_count = row['n']
+        else:
+            count.open_count = row['n']
+    with transaction.atomic():
+        counts.delete()
+        DailyTodoCount.objects.bulk_create(rows.values(), batch_size=1000)
+    calendar_changed(user_ids)
+    return len(rows)
+
+
+# shade of a day in the calendars' density overlay: 0 (nothing due) to 4 (16 or more to-dos)
+def density(open_count, completed_count):
+    return min(4, (open_count + completed_count + 3) // 4)
+
+
+# {date: (open, completed)} of user's days first_day..last_day that have to-dos
+def day_counts(user, first_day, last_day):
+    if not user.is_authenticated:
+        return {}
+    counts = DailyTodoCount.objects.filter(user=user, date__gte=first_day, date__lte=last_day)
+    return {date: (open_count, completed_count) for date, open_count, completed_count
+            in counts.values_list('date', 'open_count', 'completed_count')}
@@ -0,0 +1,162 @@
+import datetime
+import math
+from dateutil.relativedelta import relativedelta
+from django.utils import timezone
+
+
+# a recurrence rule (FREQ, INTERVAL, BYDAY, COUNT, UNTIL) compiled once so the i-th occurrence and the
+# first occurrence inside a window are found with arithmetic instead of walking from dtstart
+# https://tools.ietf.org/html/rfc5545#section-3.3.10
+# dtstart is always the first occurrence, like DTSTART in an iCalendar event; BYDAY applies to
+# DAILY and WEEKLY rules, and weeks start on Monday (WKST=MO)
+# Weekdays and day offsets are counted on the wall clock of the site's time zone, so a rule built
+# from the UTC duedates stored in the database gives the same dates as one built from the form's
+# local ones, and a 9:00 to-do stays at 9:00 across a daylight saving change
+class RecurrenceRule:
+    def __init__(self, freq, dtstart, until=None, interval=1, byweekday=None, count=None):
+        self.freq = freq
+        self.dtstart = dtstart
+        self.tz = timezone.get_current_timezone() if timezone.is_aware(dtstart) else None
+        self.start = self._wall(dtstart)
+        self.until = until
+        self.interval = max(interval or 1, 1)
+        self.count = count
+        byweekday = sorted(set(byweekday or []))
+
+        if (freq == 'DAILY' or freq == 'WEEKLY'):
+            self._compile_days(byweekday)
+        # dtstart is the first occurrence even if the rule itself would not produce it
+        self._prefix = 0 if (self._rule_length() != 0 and self._rule_at(0) == dtstart) else 1
+        self.length = self._length()
+
+    # compiled rule of a RecurrenceSeries
+    @classmethod
+    def from_series(cls, series):
+        return cls(series.recur_freq, series.start_date,
+                   until=series.end_recur_date, interval=series.recur_interval,
+                   byweekday=series.recur_weekdays, count=series.recur_count)
+
+    # naive local time of t
+    def _wall(self, t):
+        if self.tz is None:
+            return t
+        return timezone.localtime(t, self.tz).replace(tzinfo=None)
+
+    # aware datetime of a naive local time; a time skipped by a daylight saving change is moved past it
+    def _aware(self, wall):
+        if self.tz is None:
+            return wall
+        if hasattr(self.tz, 'normalize'):
+            return self.tz.normalize(timezone.make_aware(wall, self.tz, is_dst=False))
+        return timezone.make_aware(wall, self.tz)
+
+    # DAILY and WEEKLY rules repeat the same day offsets every period days, counted from anchor
+    def _compile_days(self, byweekday):
+        if (self.freq == 'WEEKLY'):
+            # monday of the week dtstart is in
+            self.anchor = self.start - datetime.timedelta(days=self.start.weekday())
+            self.period = 7 * self.interval
+            self.offsets = byweekday or [self.start.weekday()]
+        else:
+            self.anchor = self.start
+            if byweekday:
+                self.period = self.interval * 7 // math.gcd(self.interval, 7)
+                self.offsets = [offset for offset in range(0, self.period, self.interval)
+                                if (self.start.weekday() + offset) % 7 in byweekday]
+            else:
+                self.period = self.interval
+                self.offsets = [0]
+        # days of the first period that come before dtstart are not part of the rule
+        self.skipped = len([offset for offset in self.offsets
+                            if offset < (self.start - self.anchor).days])
+
+    # number of dates the rule itself produces, None if it never runs out
+    def _rule_length(self):
+        if (self.freq == 'NEVER'):
+            return 0
+        if (self.freq in ('DAILY', 'WEEKLY') and not self.offsets):
+            return 0
+        return None
+
+    # j-th date produced by the rule itself
+    def _rule_at(self, j):
+        if (self.freq == 'MONTHLY'):
+            return self._aware(self.start + relativedelta(months=+j * self.interval))
+        elif (self.freq == 'YEARLY'):
+            return self._aware(self.start + relativedelta(years=+j * self.interval))
+        j += self.skipped
+        periods, k = divmod(j, len(self.offsets))
+        return self._aware(self.anchor + datetime.timedelta(days=periods * self.period + self.offsets[k]))
+
+    # index of the first date produced by the rule itself that is at or after t
+    def _rule_index(self, t):
+        if (t <= self._rule_at(0)):
+            return 0
+        wall = self._wall(t)
+        if (self.freq in ('MONTHLY', 'YEARLY')):
+            months = (wall.year - self.start.year) * 12 + wall.month - self.start.month
+            if (self.freq == 'YEARLY'):
+                months = months // 12
+            j = max(months // self.interval - 1, 0)
+        else:
+            periods = (wall - self.anchor) // datetime.timedelta(days=self.period)
+            j = max(periods * len(self.offsets) - self.skipped, 0)
+        # the estimate is at most one period short
+        while (self._rule_at(j) < t):
+            j += 1
+        return j
+
+    # index of the first occurrence at or after t, ignoring COUNT and UNTIL
+    def _index(self, t):
+        if (self._prefix and t <= self.dtstart):
+            return 0
+        if (self._rule_length() == 0):
+            return self._prefix
+        return self._prefix + self._rule_index(t)
+
+    def _length(self):
+        if (self._rule_length() == 0):
+            length = self._prefix
+        elif (self.until is None):
+            length = None
+        else:
+            length = self._index(self.until + datetime.timedelta(microseconds=1))
+        if (self.until is not None and self.until < self.dtstart):
+            length = 1
+        if (self.count is not None):
+            length = self.count if length is None else min(length, self.count)
+        return length
+
+    def __len__(self):
+        return self.length
+
+    # i-th occurrence; dtstart is occurrence 0
+    def at(self, i):
+        if (i < 0 or (self.length is not None and i >= self.length)):
+            return None
+        if (i < self._prefix):
+            return self.dtstart
+        return self._rule_at(i - self._prefix)
+
+    # index of the first occurrence at or after t (len(self) if there is none)
+    def index(self, t):
+        i = self._index(t)
+        if (self.length is not None):
+            return min(i, self.length)
+        return i
+
+    # (index, date) of every occurrence in [start, end), jumping straight to the first one
+    def between(self, start, end):
+        i = self.index(start)
+        while (self.length is None or i < self.length):
+            date = self.at(i)
+            if (date >= end):
+                return
+            yield i, date
+            i += 1
+
+    def __iter__(self):
+        i = 0
+        while (self.length is None or i < self.length):
+            yield self.at(i)
+            i += 1
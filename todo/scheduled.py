@@ -0,0 +1,43 @@
+from django.db import transaction
+from django.utils import timezone
+import datetime
+from .models import ToDoItem, ScheduledTaskRun
+from .priority import HIGH_WITHIN, MEDIUM_WITHIN
+from .recurrences import extend_recurrences
+from .timers import tick
+
+
+# runs task(now) if it has not run in the last `every` (a timedelta, None to always run); concurrent
+# callers wait on the row lock, so a task never runs twice for the same window. Returns what task
+# returned, None if skipped
+def run_scheduled(name, task, every=None):
+    with transaction.atomic():
+        ScheduledTaskRun.objects.get_or_create(name=name)
+        run = ScheduledTaskRun.objects.select_for_update().get(name=name)
+        now = timezone.now()
+        if (every is not None and run.last_run_at is not None and now - run.last_run_at < every):
+            return None
+        result = task(now)
+        run.last_run_at = now
+        run.rows_changed = result or 0
+        run.save()
+    return result
+
+
+# stores the raised priority of every open to-do, for all users, due within a day (HI) or two
+# days (MD) of now, including ones added or moved into the window since the last run; two UPDATEs
+# on the (completed, duedate) index that leave rows already raised alone, so a rerun changes
+# nothing. Returns the number of rows changed
+def escalate_priorities(now):
+    high = ToDoItem.objects.filter(completed=False, duedate__lte=now + HIGH_WITHIN).exclude(priority='HI')
+    medium = ToDoItem.objects.filter(completed=False, duedate__lte=now + MEDIUM_WITHIN, priority='LO')
+    return high.update(priority='HI') + medium.update(priority='MD')
+
+
+# periodic tasks the run_recurrence_jobs worker runs: (name, how often, task(now))
+def periodic_tasks():
+    return [
+        ('extend_recurrences', datetime.timedelta(hours=1), lambda now: extend_recurrences()),
+        # only the to-dos whose due-date thresholds fired, instead of escalate_priorities' range scans
+        ('threshold_timers', datetime.timedelta(minutes=1), lambda now: tick(now)),
+    ]
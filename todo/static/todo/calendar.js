@@ -0,0 +1,132 @@
+// switches the month calendar to the previous / next month from the calendar feed instead of
+// reloading the page; the neighbouring months are fetched ahead, so the switch needs no round trip
+// and a month that did not change is revalidated with a 304
+document.addEventListener("DOMContentLoaded", function () {
+  var grid = document.getElementById("calendar-grid");
+  if (!grid || !grid.dataset.feedUrl || !window.history.pushState) {
+    return;
+  }
+  var MONTHS = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"];
+  var MONTH_NAMES = ["January", "February", "March", "April", "May", "June", "July", "August",
+                     "September", "October", "November", "December"];
+  // circle of a day with open to-dos: [diameter, color] by open to-dos / 4, like calendar_month.html
+  var CIRCLES = [[65, "#B5EAD7"], [90, "#FFFD96"], [120, "#FF6961"]];
+  var feeds = {};
+  var current = {year: parseInt(grid.dataset.year, 10), month: parseInt(grid.dataset.month, 10)};
+
+  function shift(month, by) {
+    var date = new Date(month.year, month.month - 1 + by, 1);
+    return {year: date.getFullYear(), month: date.getMonth() + 1};
+  }
+
+  function daysIn(month) {
+    return new Date(month.year, month.month, 0).getDate();
+  }
+
+  function isoDate(month, day) {
+    return month.year + "-" + ("0" + month.month).slice(-2) + "-" + ("0" + day).slice(-2);
+  }
+
+  // per-day counts of a month, fetched once per page
+  function feed(month) {
+    var key = month.year + "-" + month.month;
+    if (!feeds[key]) {
+      var url = grid.dataset.feedUrl + "?start=" + isoDate(month, 1) + "&end=" + isoDate(month, daysIn(month));
+      feeds[key] = fetch(url, {credentials: "same-origin"}).then(function (resp) {
+        if (!resp.ok) {
+          throw new Error("calendar feed answered " + resp.status);
+        }
+        return resp.json();
+      });
+      feeds[key].catch(function () { delete feeds[key]; });
+    }
+    return feeds[key];
+  }
+
+  function dayCell(month, day, counts) {
+    var open = counts ? counts[0] : 0;
+    var completed = counts ? counts[1] : 0;
+    var cell = document.createElement("div");
+    cell.className = "d-flex justify-content-center align-items-center day-density-" +
+      Math.min(4, Math.floor((open + completed + 3) / 4));
+    cell.style.width = cell.style.height = "125px";
+    cell.title = open + " open, " + completed + " completed";
+    var circle = document.createElement("div");
+    circle.className = "d-flex m-2 p-2 justify-content-center align-items-center";
+    if (open > 0) {
+      var size = CIRCLES[Math.min(2, Math.floor(open / 4))];
+      circle.style.width = circle.style.height = size[0] + "px";
+      circle.style.backgroundColor = size[1];
+      circle.style.borderRadius = "50%";
+    }
+    var heading = document.createElement("h3");
+    heading.className = "mb-1";
+    heading.style.textAlign = "center";
+    var link = document.createElement("a");
+    link.href = "/day/" + month.year + "/" + MONTHS[month.month - 1] + "/" + day + "/";
+    link.style.textDecoration = "none";
+    link.style.color = "black";
+    link.textContent = day;
+    heading.appendChild(link);
+    circle.appendChild(heading);
+    cell.appendChild(circle);
+    return cell;
+  }
+
+  function render(month, data) {
+    var rows = document.createDocumentFragment();
+    var last = daysIn(month);
+    // weeks start on Sunday, like calendar.monthcalendar in the view
+    for (var day = 1 - new Date(month.year, month.month - 1, 1).getDay(); day <= last;) {
+      var row = document.createElement("div");
+      row.className = "d-flex flex-row justify-content-around w-100";
+      for (var i = 0; i < 7; i++, day++) {
+        if (day < 1 || day > last) {
+          var blank = document.createElement("div");
+          blank.style.width = blank.style.height = "125px";
+          row.appendChild(blank);
+        } else {
+          row.appendChild(dayCell(month, day, data.days[isoDate(month, day)]));
+        }
+      }
+      rows.appendChild(row);
+    }
+    grid.innerHTML = "";
+    grid.appendChild(rows);
+    document.getElementById("calendar-month-name").textContent = MONTH_NAMES[month.month - 1];
+    var year = document.getElementById("calendar-year");
+    year.textContent = month.year;
+    year.href = "/year/" + month.year + "/";
+    document.getElementById("prev-month").href = "/prev_month/" + month.year + "/" + MONTHS[month.month - 1] + "/";
+    document.getElementById("next-month").href = "/next_month/" + month.year + "/" + MONTHS[month.month - 1] + "/";
+    current = month;
+    feed(shift(month, -1));
+    feed(shift(month, 1));
+  }
+
+  function go(link, by) {
+    link.addEventListener("click", function (event) {
+      event.preventDefault();
+      var month = shift(current, by);
+      feed(month).then(function (data) {
+        render(month, data);
+        history.pushState(month, "", "/month/" + month.year + "/" + MONTHS[month.month - 1] + "/");
+      }).catch(function () {
+        window.location.href = link.href;
+      });
+    });
+  }
+
+  go(document.getElementById("prev-month"), -1);
+  go(document.getElementById("next-month"), 1);
+  window.addEventListener("popstate", function (event) {
+    var month = event.state;
+    if (month && month.year) {
+      feed(month).then(function (data) { render(month, data); });
+    }
+  });
+  history.replaceState(current, "");
+  feed(current);
+  feed(shift(current, -1));
+  feed(shift(current, 1));
+});
@@ -0,0 +1,159 @@
+// fills in the parts of a page that are loaded after it renders (quote of the day, notes panel)
+// from their fragment endpoints; the browser cache answers repeat visits
+document.addEventListener("DOMContentLoaded", function () {
+  function loadFragment(el, fill) {
+    fetch(el.dataset.fragmentUrl, {credentials: "same-origin"})
+      .then(function (resp) { return resp.json(); })
+      .then(fill);
+  }
+
+  var quote = document.getElementById("quote");
+  if (quote) {
+    loadFragment(quote, function (data) { quote.textContent = data.quote; });
+  }
+
+  var notes = document.getElementById("notes-text");
+  if (notes && notes.dataset.fragmentUrl) {
+    loadFragment(notes, function (data) {
+      notes.value = data.text;
+      notes.placeholder = "";
+      notes.disabled = false;
+      // the Save button stays disabled until the textarea holds the note, so it can never post an empty one
+      var save = document.getElementById("notes-save");
+      if (save) {
+        save.disabled = false;
+      }
+      if (notes.dataset.autosaveUrl) {
+        autosave(notes, data);
+      }
+    });
+  }
+});
+
+// the part of `before` that was replaced to get `after`, as one {start, end, text} patch
+function diffPatch(before, after) {
+  var start = 0;
+  while (start < before.length && start < after.length && before[start] === after[start]) {
+    start++;
+  }
+  var end = 0;
+  while (end < before.length - start && end < after.length - start &&
+         before[before.length - 1 - end] === after[after.length - 1 - end]) {
+    end++;
+  }
+  return {start: start, end: before.length - end, text: after.slice(start, after.length - end)};
+}
+
+// `text` and `current` are both `saved` with one edit, made here and elsewhere; returns `current`
+// with the edit made here applied too, or null if the two edits touch the same part of the text
+function rebase(saved, text, current) {
+  var mine = diffPatch(saved, text);
+  var theirs = diffPatch(saved, current);
+  if (theirs.end <= mine.start) {
+    var shift = theirs.text.length - (theirs.end - theirs.start);
+    return current.slice(0, mine.start + shift) + mine.text + current.slice(mine.end + shift);
+  }
+  if (mine.end <= theirs.start) {
+    return current.slice(0, mine.start) + mine.text + current.slice(mine.end);
+  }
+  return null;
+}
+
+// shows (or hides) a note under the notes panel that the text was also changed elsewhere
+function conflictNotice(notes, show) {
+  var notice = document.getElementById("notes-conflict");
+  if (!notice && show) {
+    notice = document.createElement("div");
+    notice.id = "notes-conflict";
+    notice.className = "text-danger small";
+    notice.textContent = "These notes were also changed in another window; your text was kept.";
+    notes.parentNode.insertBefore(notice, notes.nextSibling);
+  }
+  if (notice) {
+    notice.hidden = !show;
+  }
+}
+
+// saves the notes panel a moment after typing stops, sending only what changed since the last
+// save; the Save button keeps working as before
+function autosave(notes, note) {
+  var saved = note.text;
+  var version = note.version;
+  var timer = null;
+  var saving = false;
+  var csrf = notes.form.querySelector("input[name=csrfmiddlewaretoken]").value;
+
+  function save() {
+    if (saving) {
+      timer = setTimeout(save, 800);
+      return;
+    }
+    var text = notes.value;
+    if (text === saved) {
+      return;
+    }
+    saving = true;
+    fetch(notes.dataset.autosaveUrl, {
+      method: "POST",
+      credentials: "same-origin",
+      headers: {"Content-Type": "application/json", "X-CSRFToken": csrf},
+      body: JSON.stringify({version: version, patches: [diffPatch(saved, text)]}),
+    }).then(function (resp) {
+      if (resp.status === 204) {
+        saved = text;
+        version = parseInt(resp.headers.get("X-Note-Version"), 10);
+      } else if (resp.status === 409) {
+        // changed in another tab: carry on from that version with what was typed here on top
+        return resp.json().then(function (current) {
+          var merged = rebase(saved, notes.value, current.text);
+          if (merged === null) {
+            // both changed the same part: keep what is typed here, it replaces the other version
+            conflictNotice(notes, true);
+          } else if (merged !== notes.value) {
+            notes.value = merged;
+          }
+          saved = current.text;
+          version = current.version;
+          clearTimeout(timer);
+          timer = setTimeout(save, 0);
+        });
+      }
+    }).finally(function () { saving = false; });
+  }
+
+  notes.addEventListener("input", function () {
+    conflictNotice(notes, false);
+    clearTimeout(timer);
+    timer = setTimeout(save, 800);
+  });
+}
+
+// "Load more" under the lists appends the next page in place; without JavaScript it opens it
+document.addEventListener("DOMContentLoaded", function () {
+  var accordion = document.getElementById("accordion");
+  function bind(link) {
+    if (!link || !accordion) {
+      return;
+    }
+    link.addEventListener("click", function (event) {
+      event.preventDefault();
+      fetch(link.href, {credentials: "same-origin"})
+        .then(function (resp) { return resp.text(); })
+        .then(function (html) {
+          var page = new DOMParser().parseFromString(html, "text/html");
+          var cards = page.getElementById("accordion");
+          while (cards && cards.firstChild) {
+            accordion.appendChild(cards.firstChild);
+          }
+          var next = page.getElementById("load-more");
+          if (next) {
+            link.href = next.href;
+          } else {
+            link.remove();
+          }
+        })
+        .catch(function () { window.location.href = link.href; });
+    });
+  }
+  bind(document.getElementById("load-more"));
+});
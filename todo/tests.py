@@ -1,9 +1,29 @@
-from django.test import TestCase, Client
-from .models import ToDoItem, Course, Extracurricular, Note
-from .forms import ToDoForm
+from django.test import TestCase, Client, override_settings
+from .models import ToDoItem, Course, Extracurricular, Note, RecurrenceSeries, SubTask, RecurrenceJob, SkipCalendar, ScheduledTaskRun, ThresholdTimer, DailyTodoCount
+from .forms import ToDoForm, SkipCalendarForm
+from .priority import with_effective_priority
+from .scheduled import escalate_priorities, run_scheduled
+from .timers import tick
+from .rollups import recount
+from .calendar_grid import CalendarDay, month_grid
+from .pagination import PAGE_SIZE, encode_cursor
+from .quotes import get_quote, quote_cache, QUOTE_KEY, DEFAULT_QUOTE
+from .notes import get_note_text, save_note
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import threading
+import calendar
+import tempfile
+import time
+import os
+from .rrule import RecurrenceRule
 from django.utils import timezone
 from django.urls import reverse
 from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.core.management import call_command
+from io import StringIO
+import json
 import datetime
 from dateutil.relativedelta import relativedelta
 import pytz
@@ -42,9 +62,31 @@ def create_todo(new_title,  # only need to provide title if everything else is u
 # if there is a dictionary of fields already available, use this function with the dictionary as parameter
 
 
-def create_from_data_dict(form_data):
+def create_from_data_dict(form_data, user=None):
     form = ToDoForm(data=form_data)
-    return form.save()
+    todo_item = form.save(commit=False)
+    todo_item.user = user
+    todo_item.save()
+    return todo_item
+
+
+# posts the edit form of todo_item with "Change for all future events", changing only the given fields
+def post_change_all(client, todo_item, **changes):
+    form_data = {'title': todo_item.title,
+                 'description': todo_item.description,
+                 'location': todo_item.location,
+                 'duedate': timezone.localtime(todo_item.duedate).strftime('%Y-%m-%d %H:%M'),
+                 'priority': todo_item.priority,
+                 'recur_freq': todo_item.recur_freq,
+                 'end_recur_date': timezone.localtime(todo_item.end_recur_date).strftime('%Y-%m-%d %H:%M'),
+                 'category': todo_item.category,
+                 'course': todo_item.course_id or '',
+                 'ec': todo_item.ec_id or '',
+                 'progress': todo_item.progress,
+                 'change-all': 'Submit',
+                 }
+    form_data.update(changes)
+    return client.post(reverse('todo_list:detail', kwargs={'pk': todo_item.id}), form_data)
 
 
 def create_course(
@@ -99,8 +141,8 @@ class ToDoItemModelTests(TestCase):
 class PriorityTest(TestCase):
     def setUp(self):
         # Forces a login to occur, creates a test user if one does not exist
-        self.client.force_login(
-            User.objects.get_or_create(username='testuser')[0])
+        self.user = User.objects.get_or_create(username='testuser')[0]
+        self.client.force_login(self.user)
 
         self.my_course = create_course(
             new_course_name="Tester"
@@ -124,6 +166,219 @@ class PriorityTest(TestCase):
         self.assertEqual(todo.priority, "HI")
 
 
+class EffectivePriorityTest(TestCase):
+    def setUp(self):
+        self.now = timezone.now()
+        for title, hours, priority, completed in [('soon', 12, 'LO', False),
+                                                  ('tomorrow', 36, 'LO', False),
+                                                  ('tomorrow high', 36, 'HI', False),
+                                                  ('later', 120, 'MD', False),
+                                                  ('done', 12, 'LO', True)]:
+            ToDoItem.objects.create(title=title, priority=priority, completed=completed,
+                                    duedate=self.now + datetime.timedelta(hours=hours))
+
+    def test_priority_is_raised_in_query(self):
+        items = with_effective_priority(ToDoItem.objects.all(), self.now)
+        priorities = {item.title: item.effective_priority for item in items}
+        self.assertEqual({'soon': 'HI', 'tomorrow': 'MD', 'tomorrow high': 'HI',
+                          'later': 'MD', 'done': 'LO'}, priorities)
+        # the stored priority is left alone
+        self.assertEqual('LO', ToDoItem.objects.get(title='soon').priority)
+
+    def test_sorted_by_effective_priority(self):
+        items = with_effective_priority(ToDoItem.objects.filter(completed=False), self.now)
+        titles = [item.title for item in items.order_by('priority_rank', 'duedate')]
+        self.assertEqual(['soon', 'tomorrow high', 'tomorrow', 'later'], titles)
+
+    def test_current_priority_matches_query(self):
+        for item in with_effective_priority(ToDoItem.objects.all()):
+            stored = ToDoItem.objects.get(pk=item.pk)
+            self.assertEqual(item.current_priority(), stored.current_priority())
+
+
+class EscalatePrioritiesTest(TestCase):
+    def setUp(self):
+        self.now = timezone.now()
+        self.users = [User.objects.create(username='user%d' % i) for i in range(2)]
+        for user in self.users:
+            for hours in [12, 36, 120]:
+                ToDoItem.objects.create(title='due in %d hours' % hours, user=user, priority='LO',
+                                        duedate=self.now + datetime.timedelta(hours=hours))
+
+    def test_escalates_every_user_once(self):
+        out = StringIO()
+        call_command('escalate_priorities', stdout=out)
+        self.assertIn('Escalated 4', out.getvalue())
+        self.assertEqual(2, ToDoItem.objects.filter(priority='HI').count())
+        self.assertEqual(2, ToDoItem.objects.filter(priority='MD').count())
+
+        # nothing crossed a threshold since the last run
+        out = StringIO()
+        call_command('escalate_priorities', stdout=out)
+        self.assertIn('Escalated 0', out.getvalue())
+
+    def test_escalates_items_added_inside_window(self):
+        self.assertEqual(4, escalate_priorities(self.now))
+        # added (or moved) to within a day after the last run, with no threshold passing since
+        todo = ToDoItem.objects.create(title='added late', priority='LO',
+                                       duedate=self.now + datetime.timedelta(hours=3))
+        self.assertEqual(1, escalate_priorities(self.now + datetime.timedelta(minutes=1)))
+        todo.refresh_from_db()
+        self.assertEqual('HI', todo.priority)
+        self.assertEqual(0, escalate_priorities(self.now + datetime.timedelta(minutes=2)))
+
+    def test_periodic_task_waits_for_its_interval(self):
+        self.assertEqual(4, run_scheduled('escalate_priorities', escalate_priorities,
+                                          datetime.timedelta(minutes=15)))
+        self.assertIsNone(run_scheduled('escalate_priorities', escalate_priorities,
+                                        datetime.timedelta(minutes=15)))
+        self.assertEqual(4, ScheduledTaskRun.objects.get(name='escalate_priorities').rows_changed)
+
+
+@override_settings(TODO_STORED_PRIORITY_ESCALATION=True)
+class ThresholdTimerTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.get_or_create(username='testuser')[0]
+        self.client.force_login(self.user)
+        self.duedate = timezone.localtime().replace(second=0, microsecond=0) + datetime.timedelta(days=5)
+        self.client.post(reverse('todo_list:add_todo_item'), {
+            'title': "Essay",
+            'description': '',
+            'duedate': self.duedate.strftime('%Y-%m-%d %H:%M'),
+            'location': '',
+            'recur_freq': 'NEVER',
+            'end_recur_date': self.duedate.strftime('%Y-%m-%d %H:%M'),
+            'priority': 'LO',
+            'category': 'NN',
+            'progress': 0,
+        })
+        self.todo = ToDoItem.objects.get(title="Essay")
+
+    def test_new_todo_is_scheduled(self):
+        timer = self.todo.threshold_timer
+        self.assertEqual('MD', timer.threshold)
+        self.assertEqual(self.duedate - datetime.timedelta(days=2), timer.fires_at)
+
+    def test_tick_handles_fired_timers(self):
+        # nothing fired yet
+        self.assertEqual(0, tick())
+        self.assertEqual(1, tick(self.duedate - datetime.timedelta(hours=47)))
+        self.todo.refresh_from_db()
+        self.assertEqual('MD', self.todo.priority)
+        self.assertEqual('HI', self.todo.threshold_timer.threshold)
+
+        self.assertEqual(1, tick(self.duedate - datetime.timedelta(hours=23)))
+        self.todo.refresh_from_db()
+        self.assertEqual('HI', self.todo.priority)
+        self.assertFalse(ThresholdTimer.objects.exists())
+
+    def test_late_tick_applies_latest_threshold(self):
+        self.assertEqual(1, tick(self.duedate - datetime.timedelta(hours=1)))
+        self.todo.refresh_from_db()
+        self.assertEqual('HI', self.todo.priority)
+        self.assertFalse(ThresholdTimer.objects.exists())
+
+    def test_edit_reschedules(self):
+        post_change_all(self.client, self.todo,
+                        duedate=(self.duedate + datetime.timedelta(days=3)).strftime('%Y-%m-%d %H:%M'))
+        timer = ThresholdTimer.objects.get(todo=self.todo)
+        self.assertEqual(self.duedate + datetime.timedelta(days=1), timer.fires_at)
+        self.assertEqual(1, ThresholdTimer.objects.count())
+
+    def test_completing_cancels_timer(self):
+        self.client.get(reverse('todo_list:complete_todo', kwargs={'todo_item_id': self.todo.id}))
+        self.assertFalse(ThresholdTimer.objects.exists())
+
+    def test_recurrences_are_scheduled(self):
+        start = timezone.localtime().replace(second=0, microsecond=0) + datetime.timedelta(days=3)
+        self.client.post(reverse('todo_list:add_todo_item'), {
+            'title': "Reading",
+            'description': '',
+            'duedate': start.strftime('%Y-%m-%d %H:%M'),
+            'location': '',
+            'recur_freq': 'WEEKLY',
+            'end_recur_date': (start + datetime.timedelta(weeks=3)).strftime('%Y-%m-%d %H:%M'),
+            'priority': 'LO',
+            'category': 'NN',
+            'progress': 0,
+        })
+        self.assertEqual(4, ThresholdTimer.objects.filter(todo__title="Reading").count())
+
+
+QOD = {'contents': {'quotes': [{'quote': 'Well begun is half done.', 'author': 'Aristotle'}]}}
+
+
+# stand-in for quotes.rest on a local port; delay makes it slower than the provider's timeout
+class StubQuoteHandler(BaseHTTPRequestHandler):
+    delay = 0
+    requests = 0
+
+    def do_GET(self):
+        StubQuoteHandler.requests += 1
+        time.sleep(self.delay)
+        body = json.dumps(QOD).encode()
+        try:
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.end_headers()
+            self.wfile.write(body)
+        except BrokenPipeError:
+            # the provider timed out and hung up
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+@override_settings(TODO_QUOTE_REFRESH_IN_BACKGROUND=False)
+class QuoteTest(TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StubQuoteHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = 'http://127.0.0.1:%d/qod' % self.server.server_port
+        StubQuoteHandler.delay = 0
+        StubQuoteHandler.requests = 0
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def stub_settings(self, timeout=2.0):
+        return override_settings(TODO_QUOTE_PROVIDER='todo.quotes.QuotesRestProvider',
+                                 TODO_QUOTE_PROVIDER_OPTIONS={'url': self.url, 'timeout': timeout})
+
+    def test_fetched_once_per_day(self):
+        with self.stub_settings():
+            self.assertEqual('Well begun is half done. - Aristotle', get_quote())
+            get_quote()
+        self.assertEqual(1, StubQuoteHandler.requests)
+
+    def test_stale_quote_is_served_and_refreshed(self):
+        quote_cache().set(QUOTE_KEY, {'quote': 'Yesterday - Someone',
+                                      'fetched_at': timezone.now() - datetime.timedelta(hours=25)})
+        with self.stub_settings():
+            self.assertEqual('Yesterday - Someone', get_quote())
+            self.assertEqual('Well begun is half done. - Aristotle', get_quote())
+
+    def test_timeout_and_circuit_breaker(self):
+        StubQuoteHandler.delay = 0.5
+        with self.stub_settings(timeout=0.1):
+            for i in range(3):
+                self.assertEqual(DEFAULT_QUOTE, get_quote())
+            # the breaker is open, the provider is left alone even though it answers again
+            StubQuoteHandler.delay = 0
+            self.assertEqual(DEFAULT_QUOTE, get_quote())
+            self.assertIsNone(quote_cache().get(QUOTE_KEY))
+
+    def test_file_provider(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as f:
+            json.dump(QOD, f)
+        self.addCleanup(os.remove, f.name)
+        with override_settings(TODO_QUOTE_PROVIDER='todo.quotes.FileQuoteProvider',
+                               TODO_QUOTE_PROVIDER_OPTIONS={'path': f.name}):
+            self.assertEqual('Well begun is half done. - Aristotle', get_quote())
+
+
 """
 class SpecificDayViewTest(TestCase):
     def setUp(self):
@@ -237,8 +492,8 @@ class TodayViewTest(TestCase):
 class MonthViewTest(TestCase):
     def setUp(self):
         self.client = Client()
-        self.client.force_login(
-            User.objects.get_or_create(username='testuser')[0])
+        self.user = User.objects.get_or_create(username='testuser')[0]
+        self.client.force_login(self.user)
 
         self.course = create_course(new_course_name="Tester")
         self.ec = create_ec(new_name="ec")
@@ -279,6 +534,172 @@ class MonthViewTest(TestCase):
 """
 
 
+class QueryPlanTest(TestCase):
+    """
+    The queries of the busy views are served by the index meant for them on a few thousand seeded
+    (and ANALYZEd) to-dos, with the planner free to pick a sequential scan instead
+    """
+    # index of every to-do query a view runs, in order
+    plans = {
+        'todo_list': ['todo_user_completed_due'],
+        'completed': ['todo_user_completed_due'],
+        'job_list': ['todo_open_user_category_due'],
+        'job_today_todo_list': ['todo_open_user_category_due'],
+        'social_list': ['todo_open_user_category_due'],
+        'social_today_todo_list': ['todo_open_user_category_due'],
+        'personal_list': ['todo_open_user_category_due'],
+        'personal_today_todo_list': ['todo_open_user_category_due'],
+        'other_list': ['todo_open_user_category_due'],
+        'other_today_todo_list': ['todo_open_user_category_due'],
+        # the course's / extracurricular's to-dos, then the ones without a course / extracurricular
+        'academics_list': ['todo_todoitem_course_id', 'todo_open_user_category_due'],
+        'academics_today_todo_list': ['todo_open_course_due', 'todo_open_user_category_due'],
+        'ec_todo_list': ['todo_todoitem_ec_id', 'todo_open_user_category_due'],
+        'ec_today_todo_list': ['todo_open_ec_due', 'todo_open_user_category_due'],
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='planner')
+        other = User.objects.create(username='other')
+        course = Course.objects.create(course_name='Algorithms', user=cls.user)
+        ec = Extracurricular.objects.create(name='Band', user=cls.user)
+        start = timezone.now() - datetime.timedelta(days=100)
+        categories = ['NN', 'AC', 'EC', 'JB', 'SC', 'PS', 'OT']
+        ToDoItem.objects.bulk_create([
+            ToDoItem(title='todo %d' % i, duedate=start + datetime.timedelta(hours=i), user=(cls.user if i % 2 else other),
+                     category=categories[i % 7], completed=(i % 3 == 0),
+                     course=(course if i % 7 == 1 else None), ec=(ec if i % 7 == 2 else None))
+            for i in range(4000)])
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE todo_todoitem')
+
+    def plan(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN ' + sql)
+            return '\n'.join(row[0] for row in cursor.fetchall())
+
+    def todo_plans(self, view):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(200, self.client.get(reverse('todo_list:' + view)).status_code)
+        return [(query['sql'], self.plan(query['sql'])) for query in queries.captured_queries
+                if (query['sql'].startswith('SELECT') and '"todo_todoitem"' in query['sql'])]
+
+    def test_views_use_their_indexes(self):
+        self.client.force_login(self.user)
+        for view, indexes in self.plans.items():
+            plans = self.todo_plans(view)
+            self.assertEqual(len(indexes), len(plans), view)
+            for index, (sql, plan) in zip(indexes, plans):
+                self.assertNotIn('Seq Scan on todo_todoitem', plan, '%s:\n%s\n%s' % (view, sql, plan))
+                self.assertIn(index, plan, '%s:\n%s\n%s' % (view, sql, plan))
+
+
+class KeysetPaginationTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.get_or_create(username='testuser')[0]
+        self.client.force_login(self.user)
+        start = timezone.make_aware(datetime.datetime(2020, 4, 1, 9))
+        # pairs of to-dos due at the same time, so pages also break between rows with one duedate
+        ToDoItem.objects.bulk_create([
+            ToDoItem(title='job %d' % i, duedate=start + datetime.timedelta(hours=i // 2), category='JB',
+                     user=self.user, completed=(i >= 120)) for i in range(150)])
+
+    def pages(self, view):
+        ids = []
+        path = reverse('todo_list:' + view)
+        while path:
+            response = self.client.get(path)
+            ids.extend(('virtual', todo.index) if getattr(todo, 'is_virtual', False) else todo.id
+                       for todo in response.context['todo_list'])
+            cursor = response.context['next_cursor']
+            path = cursor and reverse('todo_list:' + view) + '?after=' + cursor
+        return ids
+
+    def test_pages_cover_every_todo_once_in_order(self):
+        expected = list(ToDoItem.objects.filter(completed=False).order_by('duedate', 'id').values_list('id', flat=True))
+        self.assertEqual(expected, self.pages('job_list'))
+        self.assertEqual(expected, self.pages('todo_list'))
+        completed = list(ToDoItem.objects.filter(completed=True).order_by('duedate', 'id').values_list('id', flat=True))
+        self.assertEqual(completed, self.pages('completed'))
+
+    @override_settings(TODO_LAZY_RECURRENCES=True)
+    def test_virtual_occurrences_are_shown_on_one_page(self):
+        ToDoItem.objects.all().delete()
+        now = timezone.localtime().replace(minute=0, second=0, microsecond=0)
+        ToDoItem.objects.bulk_create([
+            ToDoItem(title='job %d' % i, duedate=now + datetime.timedelta(hours=i), user=self.user)
+            for i in range(120)])
+        self.client.post(reverse('todo_list:add_todo_item'), {
+            'title': 'Lazy daily', 'description': '', 'location': '', 'priority': 'LO', 'category': 'NN',
+            'progress': 0, 'recur_freq': 'DAILY', 'duedate': (now + datetime.timedelta(minutes=30)).strftime('%Y-%m-%d %H:%M'),
+            'end_recur_date': (now + datetime.timedelta(days=30)).strftime('%Y-%m-%d %H:%M')})
+        ids = self.pages('todo_list')
+        virtual = [index for index in ids if isinstance(index, tuple)]
+        # the stored first occurrence plus the lazy ones of the two weeks the list expands
+        self.assertEqual(121, len(ids) - len(virtual))
+        self.assertEqual(sorted(set(virtual)), sorted(virtual))
+        self.assertGreaterEqual(len(virtual), 12)
+
+    def test_page_shows_load_more_link(self):
+        response = self.client.get(reverse('todo_list:job_list'))
+        self.assertEqual(PAGE_SIZE, len(response.context['todo_list']))
+        self.assertContains(response, '?after=' + response.context['next_cursor'])
+        self.assertEqual(404, self.client.get(reverse('todo_list:job_list') + '?after=nonsense').status_code)
+
+    def test_deep_page_seeks_instead_of_offset(self):
+        last = ToDoItem.objects.filter(completed=False).order_by('duedate', 'id')[99]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('todo_list:job_list') + '?after=' + encode_cursor(last))
+        self.assertEqual(20, len(response.context['todo_list']))
+        self.assertIsNone(response.context['next_cursor'])
+        todo_queries = [query['sql'] for query in queries.captured_queries if 'FROM "todo_todoitem"' in query['sql']]
+        self.assertEqual(1, len(todo_queries))
+        self.assertNotIn('OFFSET', todo_queries[0])
+
+
+class TodayCategoryViewsTest(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.get_or_create(username='testuser')[0])
+
+    def test_category_today_views_use_local_day_range(self):
+        user = User.objects.get(username='testuser')
+        today = timezone.localdate()
+        late = timezone.make_aware(datetime.datetime.combine(today, datetime.time(23, 30)))
+        for category, url in [('JB', 'job_today_todo_list'), ('SC', 'social_today_todo_list'),
+                              ('PS', 'personal_today_todo_list'), ('OT', 'other_today_todo_list')]:
+            ToDoItem.objects.create(title='late tonight', duedate=late, category=category, user=user)
+            ToDoItem.objects.create(title='after midnight', duedate=late + datetime.timedelta(hours=1),
+                                    category=category, user=user)
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(reverse('todo_list:' + url))
+            self.assertEqual(['late tonight'], [todo.title for todo in response.context['todo_list']])
+            self.assertFalse(any('EXTRACT' in query['sql'] for query in queries.captured_queries))
+
+    def test_course_today_view_prefetches_todays_todos(self):
+        user = User.objects.get(username='testuser')
+        course = Course.objects.create(course_name='Algorithms', user=user)
+        now = timezone.localtime()
+        ToDoItem.objects.create(title='due today', duedate=now.replace(hour=23, minute=30), category='AC',
+                                course=course, user=user)
+        ToDoItem.objects.create(title='due tomorrow', duedate=now + datetime.timedelta(days=1), category='AC',
+                                course=course, user=user)
+        response = self.client.get(reverse('todo_list:academics_today_todo_list'))
+        self.assertContains(response, 'due today')
+        self.assertNotContains(response, 'due tomorrow')
+        self.assertEqual(['due today'], [todo.title for todo in response.context['course_list'][0].todoitem_set.all()])
+
+    def test_ec_today_view_lists_todos_without_an_ec(self):
+        user = User.objects.get(username='testuser')
+        ec = Extracurricular.objects.create(name='Band', detail='', user=user)
+        duedate = timezone.localtime().replace(hour=23, minute=30)
+        ToDoItem.objects.create(title='rehearsal', duedate=duedate, category='EC', ec=ec, user=user)
+        ToDoItem.objects.create(title='club fair', duedate=duedate, category='EC', user=user)
+        response = self.client.get(reverse('todo_list:ec_today_todo_list'))
+        self.assertEqual(['club fair'], [todo.title for todo in response.context['no_ec_todo_list']])
+        self.assertEqual(['rehearsal'], [todo.title for todo in response.context['ec_list'][0].todoitem_set.all()])
+
+
 class CalendarMonthViewTest(TestCase):
     def setUp(self):
         self.client = Client()
@@ -290,13 +711,189 @@ class CalendarMonthViewTest(TestCase):
         response = self.client.get("/month/2020/Apr/")
         self.assertContains(response, "April")
 
+    def test_month_grid_is_cached_and_leaves_calendar_module_alone(self):
+        calendar.setfirstweekday(calendar.MONDAY)
+        try:
+            grid = month_grid(2020, 4)
+            self.assertEqual((0, 0, 0, 1, 2, 3, 4), grid[0])
+            self.assertIs(grid, month_grid(2020, 4))
+            self.assertEqual((30, 31, 0, 0, 0, 0, 0), month_grid(2020, 3, calendar.MONDAY)[-1])
+            self.client.get("/month/2020/Apr/")
+            self.assertEqual(calendar.MONDAY, calendar.firstweekday())
+        finally:
+            calendar.setfirstweekday(calendar.MONDAY)
+        with self.assertRaises(AttributeError):
+            CalendarDay(1).note = 'no __dict__'
+
+    def test_month_is_fetched_in_one_query(self):
+        user = User.objects.get(username="test_user")
+        with CaptureQueriesContext(connection) as empty_month:
+            self.client.get("/month/2020/Apr/")
+        for day in range(1, 31):
+            duedate = timezone.make_aware(datetime.datetime(2020, 4, day, 9))
+            for i in range(day % 5):
+                ToDoItem.objects.create(title='todo %d' % i, duedate=duedate, user=user)
+        # the last evening of March and the first minute of May are not April
+        ToDoItem.objects.create(title='march', duedate=timezone.make_aware(datetime.datetime(2020, 3, 31, 23)), user=user)
+        ToDoItem.objects.create(title='may', duedate=timezone.make_aware(datetime.datetime(2020, 5, 1)), user=user)
+        with CaptureQueriesContext(connection) as full_month:
+            response = self.client.get("/month/2020/Apr/")
+        self.assertEqual(len(empty_month), len(full_month))
+        days = [day for week in response.context['calendar_day_list'] for day in week if not day.blank]
+        self.assertEqual([day % 5 for day in range(1, 31)], [day.open_count for day in days])
+        self.assertEqual(-1, days[4].size)
+        self.assertEqual(1, days[3].size)
+
+
+class DailyTodoCountTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.get_or_create(username='testuser')[0]
+        self.client.force_login(self.user)
+        self.day = datetime.date(2020, 4, 14)
+        self.duedate = timezone.make_aware(datetime.datetime(2020, 4, 14, 23, 30))
+
+    def counts(self):
+        return {count.date: (count.open_count, count.completed_count)
+                for count in DailyTodoCount.objects.filter(user=self.user)
+                if (count.open_count, count.completed_count) != (0, 0)}
+
+    def stored_counts(self):
+        before = self.counts()
+        recount([self.user.id])
+        self.assertEqual(before, self.counts())
+        return before
+
+    def test_counts_follow_todo_changes(self):
+        todo = ToDoItem.objects.create(title='todo', duedate=self.duedate, user=self.user)
+        ToDoItem.objects.create(title='other', duedate=self.duedate, user=self.user)
+        # 23:30 in New York is the next day in UTC; the count goes on the local day
+        self.assertEqual({self.day: (2, 0)}, self.stored_counts())
+        self.client.get(reverse('todo_list:complete_todo', kwargs={'todo_item_id': todo.id}))
+        self.assertEqual({self.day: (1, 1)}, self.stored_counts())
+        todo.refresh_from_db()
+        todo.duedate += datetime.timedelta(days=1)
+        todo.save()
+        self.assertEqual({self.day: (1, 0), self.day + datetime.timedelta(days=1): (0, 1)}, self.stored_counts())
+        todo.delete()
+        self.assertEqual({self.day: (1, 0)}, self.stored_counts())
+        self.client.get(reverse('todo_list:delete_all_incompleted'))
+        self.assertEqual({}, self.stored_counts())
+
+    def test_recount_days_command(self):
+        ToDoItem.objects.create(title='todo', duedate=self.duedate, user=self.user)
+        DailyTodoCount.objects.all().delete()
+        out = StringIO()
+        call_command('recount_days', stdout=out)
+        self.assertIn('Counted 1 day(s)', out.getvalue())
+        self.assertEqual({self.day: (1, 0)}, self.counts())
+
+    def test_series_are_counted(self):
+        self.client.post(reverse('todo_list:add_todo_item'), {
+            'title': 'Daily', 'description': '', 'location': '', 'priority': 'LO', 'category': 'NN',
+            'progress': 0, 'recur_freq': 'DAILY', 'duedate': '2020-04-01 09:00',
+            'end_recur_date': '2020-04-30 09:00'})
+        counts = self.stored_counts()
+        self.assertEqual(30, len(counts))
+        self.assertTrue(all(count == (1, 0) for count in counts.values()))
+        todo = ToDoItem.objects.get(duedate=timezone.make_aware(datetime.datetime(2020, 4, 20, 9)))
+        post_change_all(self.client, todo, end_recur_date='2020-04-25 09:00')
+        self.assertEqual(25, len(self.stored_counts()))
+
+    def test_month_view_reads_counts_only(self):
+        for day in range(1, 8):
+            ToDoItem.objects.create(title='todo', user=self.user, duedate=self.duedate.replace(day=day))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/month/2020/Apr/')
+        self.assertFalse(any('FROM "todo_todoitem"' in query['sql'] for query in queries.captured_queries))
+        days = [day for week in response.context['calendar_day_list'] for day in week if not day.blank]
+        self.assertEqual([1] * 7 + [0] * 23, [day.open_count for day in days])
+        self.assertContains(response, 'day-density-1')
+
+
+class CalendarYearViewTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.get_or_create(username='testuser')[0]
+        self.client.force_login(self.user)
+
+    def test_year_view_shades_days_by_count(self):
+        with CaptureQueriesContext(connection) as empty_year:
+            self.client.get(reverse('todo_list:specific_year', kwargs={'year': 2020}))
+        for month in range(1, 13):
+            duedate = timezone.make_aware(datetime.datetime(2020, month, 10, 9))
+            for i in range(month):
+                ToDoItem.objects.create(title='todo', duedate=duedate, user=self.user, completed=(i % 2 == 1))
+        with CaptureQueriesContext(connection) as full_year:
+            response = self.client.get(reverse('todo_list:specific_year', kwargs={'year': 2020}))
+        self.assertEqual(len(empty_year), len(full_year))
+        self.assertFalse(any('FROM "todo_todoitem"' in query['sql'] for query in full_year.captured_queries))
+        days = [day for month in response.context['months'] for week in month['weeks']
+                for day in week if not day.blank]
+        self.assertEqual(366, len(days))
+        december_10 = [day for day in days if day.date == 10][-1]
+        self.assertEqual((6, 6, 3), (december_10.open_count, december_10.completed_count, december_10.density))
+        self.assertContains(response, 'day-density-3')
+        self.assertContains(response, reverse('todo_list:specific_year', kwargs={'year': 2021}))
+
+
+class CalendarFeedTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.get_or_create(username='testuser')[0]
+        self.client.force_login(self.user)
+        ToDoItem.objects.create(title='todo', user=self.user,
+                                duedate=timezone.make_aware(datetime.datetime(2020, 4, 14, 9)))
+
+    def feed(self, start='2020-04-01', end='2020-04-30', **headers):
+        return self.client.get(reverse('todo_list:calendar_feed'), {'start': start, 'end': end}, **headers)
+
+    def test_feed_summarizes_days(self):
+        response = self.feed()
+        self.assertEqual({'start': '2020-04-01', 'end': '2020-04-30', 'days': {'2020-04-14': [1, 0]}},
+                         response.json())
+        self.assertIn('private', response['Cache-Control'])
+        self.assertContains(self.client.get('/month/2020/Apr/'), reverse('todo_list:calendar_feed'))
+
+    def test_unchanged_month_is_not_modified(self):
+        etag = self.feed()['ETag']
+        # the revalidation only reads the calendar version, it counts nothing
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(304, self.feed(HTTP_IF_NONE_MATCH=etag).status_code)
+        self.assertFalse([query for query in queries.captured_queries
+                          if 'todo_dailytodocount' in query['sql'] or 'todo_recurrenceseries' in query['sql']])
+        # any change of the user's to-dos starts a new version
+        ToDoItem.objects.create(title='may', user=self.user,
+                                duedate=timezone.make_aware(datetime.datetime(2020, 5, 1, 9)))
+        response = self.feed(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(200, response.status_code)
+        etag = response['ETag']
+        self.assertEqual(304, self.feed(HTTP_IF_NONE_MATCH=etag).status_code)
+        # and so does a change of a series
+        series = RecurrenceSeries.objects.create(user=self.user, title='series')
+        self.assertEqual(200, self.feed(HTTP_IF_NONE_MATCH=etag).status_code)
+        series.delete()
+        etag = self.feed()['ETag']
+        # other users do not change this one's version
+        ToDoItem.objects.create(title='theirs', user=User.objects.create(username='other'),
+                                duedate=timezone.make_aware(datetime.datetime(2020, 4, 14, 9)))
+        self.assertEqual(304, self.feed(HTTP_IF_NONE_MATCH=etag).status_code)
+        self.client.get(reverse('todo_list:complete_todo', kwargs={'todo_item_id': ToDoItem.objects.get(title='todo').id}))
+        response = self.feed(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(200, response.status_code)
+        self.assertEqual({'2020-04-14': [0, 1]}, response.json()['days'])
+
+    def test_feed_rejects_bad_ranges(self):
+        self.assertEqual(400, self.feed(start='April').status_code)
+        self.assertEqual(400, self.feed(start='2020-05-01').status_code)
+        self.assertEqual(400, self.feed(end='2022-01-01').status_code)
+        self.client.logout()
+        self.assertEqual(403, self.feed().status_code)
+
 
 class TodoListViewsTest(TestCase):
     def setUp(self):
         self.client = Client()
         # Forces a login to occur, creates a test user if one does not exist
-        self.client.force_login(
-            User.objects.get_or_create(username='testuser')[0])
+        self.user = User.objects.get_or_create(username='testuser')[0]
+        self.client.force_login(self.user)
 
     def test_todo_list_view(self):
         response = self.client.get(reverse('todo_list:todo_list'))
@@ -366,8 +963,8 @@ class CreateDailyRecurrencesTest(TestCase):
         self.my_ec = create_ec(new_name='fun')
 
         # Forces a login to occur, creates a test user if one does not exist
-        self.client.force_login(
-            User.objects.get_or_create(username='testuser')[0])
+        self.user = User.objects.get_or_create(username='testuser')[0]
+        self.client.force_login(self.user)
 
         self.data_form = {
             'title': "TBD",
@@ -393,7 +990,7 @@ class CreateDailyRecurrencesTest(TestCase):
             2020, 3, 19, 5, 0, 0, tzinfo=pytz.utc)
 
         daily_occurrence = create_from_data_dict(
-            self.data_form)  # create first instance
+            self.data_form, self.user)  # create first instance
 
         # should create 4 instances
         self.client.post(reverse('todo_list:create_recurrences', kwargs={
@@ -417,6 +1014,15 @@ class CreateDailyRecurrencesTest(TestCase):
         # count_true has to be 3 because 3 comparisons if test works
         self.assertEqual(3, count_true)
 
+    def test_create_recurrences_only_for_own_todos(self):
+        daily_occurrence = create_from_data_dict(self.data_form, User.objects.create(username='someone else'))
+        url = reverse('todo_list:create_recurrences', kwargs={'todo_item_id': daily_occurrence.id})
+        self.assertEqual(404, self.client.post(url).status_code)
+        daily_occurrence.user = self.user
+        daily_occurrence.save()
+        self.assertEqual(405, self.client.get(url).status_code)
+        self.assertIsNone(ToDoItem.objects.get(pk=daily_occurrence.id).series_id)
+
     def test_redirect_from_create_recurrences_to_todo_list(self):
         """
         Test that after a successful create_recurrences, it redirects to todo_list
@@ -425,7 +1031,7 @@ class CreateDailyRecurrencesTest(TestCase):
         self.data_form['recur_freq'] = 'DAILY'
         self.data_form['end_recur_date'] = datetime.datetime(
             2020, 3, 31, 5, 0, 0, tzinfo=pytz.utc)
-        daily_occurrence = create_from_data_dict(self.data_form)
+        daily_occurrence = create_from_data_dict(self.data_form, self.user)
 
         response = self.client.post(
             reverse('todo_list:create_recurrences', kwargs={'todo_item_id': daily_occurrence.id}), self.data_form)
@@ -441,7 +1047,7 @@ class CreateDailyRecurrencesTest(TestCase):
             2020, 3, 19, 4, 0, 0, tzinfo=pytz.utc)
 
         daily_occurrence = create_from_data_dict(
-            self.data_form)  # create first instance
+            self.data_form, self.user)  # create first instance
 
         # should create 3 instances
         self.client.post(reverse('todo_list:create_recurrences', kwargs={
@@ -475,7 +1081,7 @@ class CreateDailyRecurrencesTest(TestCase):
             2020, 3, 14, 4, 0, 0, tzinfo=pytz.utc)
 
         daily_occurrence = create_from_data_dict(
-            self.data_form)  # create first instance
+            self.data_form, self.user)  # create first instance
         # should create 1 instance
         self.client.post(reverse('todo_list:create_recurrences', kwargs={
                          'todo_item_id': daily_occurrence.id}), self.data_form)
@@ -500,6 +1106,407 @@ class CreateDailyRecurrencesTest(TestCase):
         del self.my_ec
 
 
+class AddRecurringToDoTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.get_or_create(username='testuser')[0]
+        self.client.force_login(self.user)
+
+        self.data_form = {
+            'title': "Year of daily todos",
+            'description': '',
+            'duedate': '2020-01-01 09:00',
+            'location': '',
+            'recur_freq': 'DAILY',
+            'end_recur_date': '2020-12-31 09:00',
+            'priority': 'LO',
+            'category': 'NN',
+            'progress': 0,
+        }
+
+    def test_add_creates_recurrences_in_same_request(self):
+        """
+        Posting the add form creates every occurrence and redirects straight to todo_list
+        """
+        response = self.client.post(
+            reverse('todo_list:add_todo_item'), self.data_form)
+        self.assertRedirects(response, reverse('todo_list:todo_list'),
+                             fetch_redirect_response=False)
+        # 2020 is a leap year
+        self.assertEqual(366, ToDoItem.objects.filter(user=self.user).count())
+
+    def test_recurrences_use_bulk_insert(self):
+        """
+        A year-long daily series is written with a handful of queries, not one per occurrence
+        """
+        self.data_form['course'] = create_course(new_course_name="Tester").id
+        self.data_form['ec'] = create_ec(new_name='fun').id
+        todo = create_from_data_dict(self.data_form, self.user)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(reverse('todo_list:create_recurrences', kwargs={
+                             'todo_item_id': todo.id}))
+        self.assertEqual(366, ToDoItem.objects.count())
+        # the per-day counts of the calendar are updated with one more upsert, and the calendar
+        # version is reset for the new counts and the new series
+        self.assertLess(len(queries), 13)
+
+
+class SkipCalendarTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.get_or_create(username='testuser')[0]
+        self.client.force_login(self.user)
+        self.calendar = SkipCalendar(user=self.user, name='Spring 2020')
+        # spring break and a holiday before it
+        self.calendar.skip(datetime.date(2020, 3, 9), datetime.date(2020, 3, 13))
+        self.calendar.skip(datetime.date(2020, 1, 20))
+        self.calendar.save()
+        self.course = create_course(new_course_name="Tester", user=self.user)
+        self.course.skip_calendar = self.calendar
+        self.course.save()
+
+        self.data_form = {
+            'title': "Daily reading",
+            'description': '',
+            'duedate': '2020-01-01 09:00',
+            'location': '',
+            'recur_freq': 'DAILY',
+            'end_recur_date': '2020-05-01 09:00',
+            'priority': 'LO',
+            'category': 'AC',
+            'progress': 0,
+            'course': self.course.id,
+        }
+
+    def test_bitmap(self):
+        calendar = SkipCalendar.objects.get(pk=self.calendar.pk)
+        self.assertEqual(datetime.date(2020, 1, 20), calendar.first_day)
+        self.assertEqual([datetime.date(2020, 1, 20)] +
+                         [datetime.date(2020, 3, day) for day in range(9, 14)],
+                         calendar.skipped_days())
+        # one bit per day from the first skipped day
+        self.assertEqual(7, len(bytes(calendar.days)))
+        self.assertEqual(0b0111110, calendar.mask_between(
+            datetime.date(2020, 3, 8), datetime.date(2020, 3, 15)))
+
+    def test_series_skips_calendar_days(self):
+        self.client.post(reverse('todo_list:add_todo_item'), self.data_form)
+        # 122 days without the 6 skipped ones
+        self.assertEqual(116, ToDoItem.objects.count())
+        self.assertFalse(ToDoItem.objects.filter(duedate__date=datetime.date(2020, 3, 10)).exists())
+
+    def test_series_without_course_keeps_every_day(self):
+        del self.data_form['course']
+        self.client.post(reverse('todo_list:add_todo_item'), self.data_form)
+        self.assertEqual(122, ToDoItem.objects.count())
+
+    @override_settings(TODO_LAZY_RECURRENCES=True)
+    def test_lazy_series_skips_calendar_days(self):
+        self.client.post(reverse('todo_list:add_todo_item'), self.data_form)
+        response = self.client.get('/day/2020/mar/10/')
+        self.assertEqual(0, len(response.context['object_list']))
+        response = self.client.get('/day/2020/mar/16/')
+        self.assertEqual(1, len(response.context['object_list']))
+
+    def test_form_parses_breaks(self):
+        form = SkipCalendarForm(data={'user': self.user.id, 'name': 'Fall 2020',
+                                      'breaks': '2020-11-25 to 2020-11-27\n2020-09-07\n'})
+        self.assertTrue(form.is_valid())
+        calendar = form.save()
+        self.assertEqual(4, len(calendar.skipped_days()))
+        form = SkipCalendarForm(data={'user': self.user.id, 'name': 'Fall 2020',
+                                      'breaks': '2020-11-27 to 2020-11-25'})
+        self.assertFalse(form.is_valid())
+
+
+@override_settings(TODO_SYNC_RECURRENCE_LIMIT=30)
+class RecurrenceJobTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.get_or_create(username='testuser')[0]
+        self.client.force_login(self.user)
+        self.data_form = {
+            'title': "Long daily todo",
+            'description': '',
+            'duedate': '2020-01-01 09:00',
+            'location': '',
+            'recur_freq': 'DAILY',
+            'end_recur_date': '2020-12-31 09:00',
+            'priority': 'LO',
+            'category': 'NN',
+            'progress': 0,
+        }
+
+    @override_settings(TODO_JOB_QUEUE='todo.jobs.DatabaseJobQueue')
+    def test_long_series_is_left_for_the_worker(self):
+        self.client.post(reverse('todo_list:add_todo_item'), self.data_form)
+        self.assertEqual(1, ToDoItem.objects.count())
+        job = RecurrenceJob.objects.get()
+        response = self.client.get(reverse('todo_list:recurrence_job', kwargs={'job_id': job.id}))
+        self.assertEqual('PENDING', response.json()['status'])
+
+        call_command('run_recurrence_jobs', '--once', stdout=StringIO())
+        self.assertEqual(366, ToDoItem.objects.count())
+        response = self.client.get(reverse('todo_list:recurrence_job', kwargs={'job_id': job.id}))
+        self.assertEqual('DONE', response.json()['status'])
+        self.assertEqual(365, response.json()['rows_written'])
+
+        # running the job again writes nothing
+        job.status = RecurrenceJob.PENDING
+        job.save()
+        call_command('run_recurrence_jobs', '--once', stdout=StringIO())
+        self.assertEqual(366, ToDoItem.objects.count())
+
+    @override_settings(TODO_JOB_QUEUE='todo.jobs.InProcessJobQueue')
+    def test_in_process_queue_runs_job_right_away(self):
+        self.client.post(reverse('todo_list:add_todo_item'), self.data_form)
+        self.assertEqual(366, ToDoItem.objects.count())
+        self.assertEqual(RecurrenceJob.DONE, RecurrenceJob.objects.get().status)
+
+    def test_short_series_is_written_in_request(self):
+        self.data_form['end_recur_date'] = '2020-01-10 09:00'
+        self.client.post(reverse('todo_list:add_todo_item'), self.data_form)
+        self.assertEqual(10, ToDoItem.objects.count())
+
+
+@override_settings(TODO_RECURRENCE_HORIZON_DAYS=30)
+class RecurrenceHorizonTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.get_or_create(username='testuser')[0]
+        self.client.force_login(self.user)
+        self.start = timezone.localtime().replace(hour=9, minute=0, second=0, microsecond=0)
+        self.data_form = {
+            'title': "Daily todo",
+            'description': '',
+            'duedate': self.start.strftime('%Y-%m-%d %H:%M'),
+            'location': '',
+            'recur_freq': 'DAILY',
+            'end_recur_date': (self.start + datetime.timedelta(days=99)).strftime('%Y-%m-%d %H:%M'),
+            'priority': 'LO',
+            'category': 'NN',
+            'progress': 0,
+        }
+        self.client.post(reverse('todo_list:add_todo_item'), self.data_form)
+        self.series = RecurrenceSeries.objects.get()
+
+    def test_only_horizon_is_stored(self):
+        self.assertLess(ToDoItem.objects.count(), 100)
+        latest = ToDoItem.objects.latest('occurrence_date').occurrence_date
+        self.assertLessEqual(latest, self.series.materialized_until)
+        self.assertGreater(latest + datetime.timedelta(days=1), self.series.materialized_until)
+
+    def test_extend_is_idempotent(self):
+        call_command('extend_recurrences', '--days', '200', stdout=StringIO())
+        self.assertEqual(100, ToDoItem.objects.count())
+        call_command('extend_recurrences', '--days', '200', stdout=StringIO())
+        self.assertEqual(100, ToDoItem.objects.count())
+        self.assertEqual(100, ToDoItem.objects.values('occurrence_date').distinct().count())
+
+    def test_extend_skips_deleted_and_materialized_dates(self):
+        # occurrences keep their 9:00 local time across a daylight saving change
+        day = timezone.make_aware(self.start.replace(tzinfo=None) + datetime.timedelta(days=60))
+        path = '/day/%d/%s/%d/' % (day.year, day.strftime('%b').lower(), day.day)
+        response = self.client.get(path)
+        occurrence = response.context['object_list'][0]
+        self.client.get(reverse('todo_list:occurrence_action', kwargs={
+            'series_id': self.series.id, 'index': occurrence.index, 'action': 'complete'}))
+        self.client.get(reverse('todo_list:occurrence_action', kwargs={
+            'series_id': self.series.id, 'index': occurrence.index + 1, 'action': 'delete'}))
+
+        call_command('extend_recurrences', '--days', '200', stdout=StringIO())
+        self.assertEqual(99, ToDoItem.objects.count())
+        self.assertTrue(ToDoItem.objects.get(occurrence_date=day).completed)
+
+    def test_occurrences_past_horizon_are_expanded(self):
+        day = self.start + datetime.timedelta(days=60)
+        response = self.client.get('/day/%d/%s/%d/' % (day.year, day.strftime('%b').lower(), day.day))
+        self.assertEqual(1, len(response.context['object_list']))
+        self.assertTrue(response.context['object_list'][0].is_virtual)
+
+
+class BenchmarkRecurrencesTest(TestCase):
+    # the benchmark writes every occurrence itself, whatever the site hands to the worker
+    @override_settings(TODO_SYNC_RECURRENCE_LIMIT=5)
+    def test_results_are_json_and_rolled_back(self):
+        out = StringIO()
+        call_command('benchmark_recurrences', '--freq', 'WEEKLY', '--months', '3', stdout=out)
+        results = json.loads(out.getvalue())['results']
+        self.assertEqual(['create', 'change_all', 'edit_recurrences'],
+                         [result['operation'] for result in results])
+        create = results[0]
+        self.assertEqual(14, create['occurrences'])
+        # the first occurrence is inserted and then linked to its series
+        self.assertEqual(15, create['rows_written'])
+        self.assertGreater(create['queries'], 0)
+        self.assertFalse(ToDoItem.objects.exists())
+        self.assertFalse(User.objects.filter(username__startswith='recurrence-benchmark').exists())
+
+
+@override_settings(TODO_LAZY_RECURRENCES=True)
+class LazyRecurrencesTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.get_or_create(username='testuser')[0]
+        self.client.force_login(self.user)
+
+        self.data_form = {
+            'title': "Lazy daily todo",
+            'description': '',
+            'duedate': '2020-03-01 09:00',
+            'location': '',
+            'recur_freq': 'DAILY',
+            'end_recur_date': '2021-03-01 09:00',
+            'priority': 'LO',
+            'category': 'NN',
+            'progress': 0,
+        }
+        self.client.post(reverse('todo_list:add_todo_item'), self.data_form)
+        self.root = ToDoItem.objects.get(title="Lazy daily todo")
+
+    def test_series_is_stored_once(self):
+        self.assertTrue(self.root.series.lazy)
+        self.assertEqual(1, ToDoItem.objects.count())
+        self.assertEqual(1, RecurrenceSeries.objects.count())
+
+    def test_day_view_expands_occurrence(self):
+        response = self.client.get('/day/2020/mar/5/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(1, len(response.context['object_list']))
+        occurrence = response.context['object_list'][0]
+        self.assertTrue(occurrence.is_virtual)
+        self.assertEqual(4, occurrence.index)
+        self.assertContains(response, "Lazy daily todo")
+
+    def test_week_view_expands_occurrences(self):
+        response = self.client.get('/2020/week/10/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(7, len(response.context['object_list']))
+
+    def test_complete_materializes_single_occurrence(self):
+        self.client.get(reverse('todo_list:occurrence_action', kwargs={
+            'series_id': self.root.series_id, 'index': 4, 'action': 'complete'}))
+        self.assertEqual(2, ToDoItem.objects.count())
+        occurrence = self.root.series.occurrences.exclude(pk=self.root.id).get()
+        self.assertTrue(occurrence.completed)
+        self.assertEqual(occurrence.duedate, self.root.duedate + datetime.timedelta(days=4))
+
+        # the completed row replaces the virtual occurrence
+        response = self.client.get('/day/2020/mar/5/')
+        self.assertEqual(0, len(response.context['object_list']))
+
+    def test_delete_single_occurrence(self):
+        self.client.get(reverse('todo_list:occurrence_action', kwargs={
+            'series_id': self.root.series_id, 'index': 4, 'action': 'delete'}))
+        self.assertEqual(1, ToDoItem.objects.count())
+        response = self.client.get('/day/2020/mar/5/')
+        self.assertEqual(0, len(response.context['object_list']))
+
+    def test_month_view_counts_occurrences(self):
+        response = self.client.get('/month/2020/Mar/')
+        days = [day for week in response.context['calendar_day_list']
+                for day in week if not day.blank]
+        self.assertEqual(31, len(days))
+        self.assertTrue(all(day.open_count == 1 for day in days))
+
+
+class RecurrenceRuleTest(TestCase):
+    def setUp(self):
+        # a Wednesday
+        self.start = datetime.datetime(2020, 3, 18, 13, 0, 0, tzinfo=pytz.utc)
+
+    def test_every_other_week_on_monday_and_wednesday(self):
+        rule = RecurrenceRule('WEEKLY', self.start, until=self.start + relativedelta(weeks=+4),
+                              interval=2, byweekday=[0, 2])
+        self.assertEqual([self.start,
+                          self.start + relativedelta(days=+12),
+                          self.start + relativedelta(days=+14),
+                          self.start + relativedelta(days=+26),
+                          self.start + relativedelta(days=+28)], list(rule))
+
+    def test_count_ends_series_before_until(self):
+        rule = RecurrenceRule('DAILY', self.start, until=self.start + relativedelta(years=+1), count=5)
+        self.assertEqual(5, len(rule))
+        self.assertEqual(self.start + relativedelta(days=+4), rule.at(4))
+        self.assertEqual(None, rule.at(5))
+
+    def test_weekdays_only(self):
+        rule = RecurrenceRule('DAILY', self.start, until=self.start + relativedelta(days=+6),
+                              byweekday=[0, 1, 2, 3, 4])
+        self.assertEqual(5, len(rule))
+        self.assertTrue(all(date.weekday() < 5 for date in rule))
+
+    def test_monthly_uses_calendar_months(self):
+        """
+        Months are not approximated as 30 days: 1/31 repeats on the last day of shorter months
+        """
+        start = datetime.datetime(2020, 1, 31, 13, 0, 0, tzinfo=pytz.utc)
+        rule = RecurrenceRule('MONTHLY', start, until=datetime.datetime(2020, 4, 30, 13, 0, 0, tzinfo=pytz.utc))
+        self.assertEqual([31, 29, 31, 30], [date.day for date in rule])
+
+    def test_window_jumps_to_first_occurrence(self):
+        """
+        between() starts at the first occurrence inside the window, with its index in the series
+        """
+        rule = RecurrenceRule('WEEKLY', self.start, until=self.start + relativedelta(years=+5),
+                              interval=3, byweekday=[2, 4])
+        window_start = self.start + relativedelta(years=+3)
+        window = list(rule.between(window_start, window_start + relativedelta(months=+1)))
+        expected = [(i, date) for i, date in enumerate(rule)
+                    if window_start <= date < window_start + relativedelta(months=+1)]
+        self.assertEqual(expected, window)
+
+    def test_add_form_creates_weekday_series(self):
+        """
+        Posting Mon/Wed/Fri weekly for two weeks creates six to-dos
+        """
+        self.client.force_login(User.objects.get_or_create(username='testuser')[0])
+        self.client.post(reverse('todo_list:add_todo_item'), {
+            'title': "MWF",
+            'description': '',
+            'duedate': '2020-03-16 09:00',
+            'location': '',
+            'recur_freq': 'WEEKLY',
+            'recur_interval': 1,
+            'recur_weekdays': [0, 2, 4],
+            'end_recur_date': '2020-03-28 09:00',
+            'priority': 'LO',
+            'category': 'NN',
+            'progress': 0,
+        })
+        self.assertEqual([16, 18, 20, 23, 25, 27],
+                         [timezone.localtime(todo.duedate).day for todo in ToDoItem.objects.order_by('duedate')])
+
+    def test_rule_from_stored_series_matches_form(self):
+        """
+        A weekly Wednesday 21:00 series is Thursday in UTC; the rule rebuilt from the stored series
+        still gives the Wednesdays the form created
+        """
+        self.client.force_login(User.objects.get_or_create(username='testuser')[0])
+        self.client.post(reverse('todo_list:add_todo_item'), {
+            'title': "Late",
+            'description': '',
+            'duedate': '2020-01-01 21:00',
+            'location': '',
+            'recur_freq': 'WEEKLY',
+            'recur_interval': 1,
+            'end_recur_date': '2020-01-29 21:00',
+            'priority': 'LO',
+            'category': 'NN',
+            'progress': 0,
+        })
+        stored = [todo.duedate for todo in ToDoItem.objects.order_by('duedate')]
+        self.assertEqual([1, 8, 15, 22, 29], [timezone.localtime(duedate).day for duedate in stored])
+        series = RecurrenceSeries.objects.get()
+        rule = RecurrenceRule.from_series(series)
+        self.assertEqual(stored, list(rule))
+        self.assertTrue(all(timezone.localtime(duedate).weekday() == 2 for duedate in rule))
+        self.assertEqual(3, rule.index(stored[3]))
+
+    def test_local_time_kept_across_daylight_saving(self):
+        """
+        A daily 9:00 rule is still at 9:00 after clocks move forward on 2020-03-08
+        """
+        start = timezone.make_aware(datetime.datetime(2020, 3, 6, 9, 0))
+        rule = RecurrenceRule('DAILY', start.astimezone(pytz.utc), count=5)
+        self.assertEqual([9] * 5, [timezone.localtime(date).hour for date in rule])
+
+
 class CreateWeeklyRecurrencesTests(TestCase):
     def setUp(self):
         self.my_course = create_course(
@@ -507,8 +1514,8 @@ class CreateWeeklyRecurrencesTests(TestCase):
         )
 
         # Forces a login to occur, creates a test user if one does not exist
-        self.client.force_login(
-            User.objects.get_or_create(username='testuser')[0])
+        self.user = User.objects.get_or_create(username='testuser')[0]
+        self.client.force_login(self.user)
 
         self.my_ec = create_ec(new_name='fun')
 
@@ -535,7 +1542,7 @@ class CreateWeeklyRecurrencesTests(TestCase):
                                                              tzinfo=pytz.utc)
 
         weekly_occurrence = create_from_data_dict(
-            self.data_form)  # create first instance
+            self.data_form, self.user)  # create first instance
 
         # should create 4 instances
         self.client.post(reverse('todo_list:create_recurrences', kwargs={'todo_item_id': weekly_occurrence.id}),
@@ -569,7 +1576,7 @@ class CreateWeeklyRecurrencesTests(TestCase):
             2020, 4, 5, 5, 0, 0, tzinfo=pytz.utc)
 
         weekly_occurrence = create_from_data_dict(
-            self.data_form)  # create first instance
+            self.data_form, self.user)  # create first instance
 
         # should create 3 instances
         self.client.post(reverse('todo_list:create_recurrences', kwargs={'todo_item_id': weekly_occurrence.id}),
@@ -605,7 +1612,7 @@ class CreateWeeklyRecurrencesTests(TestCase):
             2020, 4, 8, 5, 0, 0, tzinfo=pytz.utc)
 
         weekly_occurrence = create_from_data_dict(
-            self.data_form)  # create first instance
+            self.data_form, self.user)  # create first instance
 
         # should create 3 instances
         self.client.post(reverse('todo_list:create_recurrences', kwargs={'todo_item_id': weekly_occurrence.id}),
@@ -643,7 +1650,7 @@ class CreateWeeklyRecurrencesTests(TestCase):
             2020, 4, 5, 3, 0, 0, tzinfo=pytz.utc)
 
         weekly_occurrence = create_from_data_dict(
-            self.data_form)  # create first instance
+            self.data_form, self.user)  # create first instance
 
         # should create 3 instances
         self.client.post(reverse('todo_list:create_recurrences', kwargs={'todo_item_id': weekly_occurrence.id}),
@@ -678,7 +1685,7 @@ class CreateWeeklyRecurrencesTests(TestCase):
             2020, 3, 10, 4, 0, 0, tzinfo=pytz.utc)
 
         weekly_occurrence = create_from_data_dict(
-            self.data_form)  # create first instance
+            self.data_form, self.user)  # create first instance
         # print( daily_occurrence.id )
         # should create 1 instance
         self.client.post(reverse('todo_list:create_recurrences', kwargs={'todo_item_id': weekly_occurrence.id}),
@@ -711,8 +1718,8 @@ class CreateMonthlyRecurrencesTests(TestCase):
         )
 
         # Forces a login to occur, creates a test user if one does not exist
-        self.client.force_login(
-            User.objects.get_or_create(username='testuser')[0])
+        self.user = User.objects.get_or_create(username='testuser')[0]
+        self.client.force_login(self.user)
 
         self.my_ec = create_ec(new_name='fun')
 
@@ -736,7 +1743,7 @@ class CreateMonthlyRecurrencesTests(TestCase):
         Equivalence Tests for creating 4 monthly recurrences
         """
         monthly_occurrence = create_from_data_dict(
-            self.data_form)  # create first instance
+            self.data_form, self.user)  # create first instance
 
         # should create 4 instances
         self.client.post(reverse('todo_list:create_recurrences', kwargs={'todo_item_id': monthly_occurrence.id}),
@@ -770,7 +1777,7 @@ class CreateMonthlyRecurrencesTests(TestCase):
             2020, 5, 16, 5, 0, 0, tzinfo=pytz.utc)
 
         weekly_occurrence = create_from_data_dict(
-            self.data_form)  # create first instance
+            self.data_form, self.user)  # create first instance
 
         # should create 3 instances
         self.client.post(reverse('todo_list:create_recurrences', kwargs={'todo_item_id': weekly_occurrence.id}),
@@ -799,7 +1806,7 @@ class CreateMonthlyRecurrencesTests(TestCase):
 
     def test_create_less_than_a_full_month_time(self):
         """
-        end_recur_date is not a full 4 months by time --> should create only 3 instances
+        end_recur_date is an hour short of 5/16 --> should create only 2 instances (3/16, 4/16)
         """
         self.data_form['title'] = "Test creating monthly recurrences boundaries"
         self.data_form['description'] = "end_recur_date is not a full 4 months by time"
@@ -807,13 +1814,13 @@ class CreateMonthlyRecurrencesTests(TestCase):
             2020, 5, 16, 4, 0, 0, tzinfo=pytz.utc)
 
         monthly_occurrence = create_from_data_dict(
-            self.data_form)  # create first instance
+            self.data_form, self.user)  # create first instance
 
-        # should create 3 instances
+        # should create 2 instances
         self.client.post(reverse('todo_list:create_recurrences', kwargs={'todo_item_id': monthly_occurrence.id}),
                          self.data_form)
         current_query_set = ToDoItem.objects.all()
-        self.assertEqual(3, len(current_query_set))
+        self.assertEqual(2, len(current_query_set))
 
         # check crucial fields
         filtered = ToDoItem.objects.filter(title="Test creating monthly recurrences boundaries",
@@ -822,16 +1829,16 @@ class CreateMonthlyRecurrencesTests(TestCase):
                                            end_recur_date=datetime.datetime(
                                                2020, 5, 16, 4, 0, 0, tzinfo=pytz.utc)
                                            ).order_by('duedate')
-        self.assertEqual(3, len(filtered))
+        self.assertEqual(2, len(filtered))
 
-        # check duedates of all 3 objects
+        # check duedates of both objects
         count_true = 0
         for i in range(len(filtered) - 1):
             if filtered[i].duedate == filtered[i + 1].duedate - relativedelta(months=1):
                 count_true += 1
 
-        # count_true has to be 3 because 3 comparisons if test works
-        self.assertEqual(2, count_true)
+        # count_true has to be 1 because 1 comparison if test works
+        self.assertEqual(1, count_true)
 
     def test_create_more_than_a_full_month_dates(self):
         """
@@ -843,7 +1850,7 @@ class CreateMonthlyRecurrencesTests(TestCase):
             2020, 6, 30, 5, 0, 0, tzinfo=pytz.utc)
 
         monthly_occurrence = create_from_data_dict(
-            self.data_form)  # create first instance
+            self.data_form, self.user)  # create first instance
 
         # should create 4 instances
         self.client.post(reverse('todo_list:create_recurrences', kwargs={'todo_item_id': monthly_occurrence.id}),
@@ -881,7 +1888,7 @@ class CreateMonthlyRecurrencesTests(TestCase):
             2020, 6, 16, 5, 1, 0, tzinfo=pytz.utc)
 
         monthly_occurrence = create_from_data_dict(
-            self.data_form)  # create first instance
+            self.data_form, self.user)  # create first instance
 
         # should create 4 instances
         self.client.post(reverse('todo_list:create_recurrences', kwargs={'todo_item_id': monthly_occurrence.id}),
@@ -918,7 +1925,7 @@ class CreateMonthlyRecurrencesTests(TestCase):
             2020, 2, 10, 4, 0, 0, tzinfo=pytz.utc)
 
         yearly_occurrence = create_from_data_dict(
-            self.data_form)  # create first instance
+            self.data_form, self.user)  # create first instance
 
         # should create 1 instance
         self.client.post(reverse('todo_list:create_recurrences', kwargs={'todo_item_id': yearly_occurrence.id}),
@@ -947,8 +1954,8 @@ class CreateYearlyRecurrencesTests(TestCase):
         )
 
         # Forces a login to occur, creates a test user if one does not exist
-        self.client.force_login(
-            User.objects.get_or_create(username='testuser')[0])
+        self.user = User.objects.get_or_create(username='testuser')[0]
+        self.client.force_login(self.user)
 
         self.my_ec = create_ec(new_name='fun')
 
@@ -972,7 +1979,7 @@ class CreateYearlyRecurrencesTests(TestCase):
         Equivalence Tests for creating 4 yearly recurrences
         """
         yearly_occurrence = create_from_data_dict(
-            self.data_form)  # create first instance
+            self.data_form, self.user)  # create first instance
 
         # should create 4 instances
         self.client.post(reverse('todo_list:create_recurrences', kwargs={'todo_item_id': yearly_occurrence.id}),
@@ -1006,7 +2013,7 @@ class CreateYearlyRecurrencesTests(TestCase):
             2023, 2, 16, 5, 0, 0, tzinfo=pytz.utc)
 
         yearly_occurrence = create_from_data_dict(
-            self.data_form)  # create first instance
+            self.data_form, self.user)  # create first instance
 
         # should create 3 instances
         self.client.post(reverse('todo_list:create_recurrences', kwargs={'todo_item_id': yearly_occurrence.id}),
@@ -1044,7 +2051,7 @@ class CreateYearlyRecurrencesTests(TestCase):
             2023, 3, 16, 4, 0, 0, tzinfo=pytz.utc)
 
         yearly_occurrence = create_from_data_dict(
-            self.data_form)  # create first instance
+            self.data_form, self.user)  # create first instance
 
         # should create 3 instances
         self.client.post(reverse('todo_list:create_recurrences', kwargs={'todo_item_id': yearly_occurrence.id}),
@@ -1083,7 +2090,7 @@ class CreateYearlyRecurrencesTests(TestCase):
             2023, 4, 30, 5, 0, 0, tzinfo=pytz.utc)
 
         yearly_occurrence = create_from_data_dict(
-            self.data_form)  # create first instance
+            self.data_form, self.user)  # create first instance
 
         # should create 4 instances
         self.client.post(reverse('todo_list:create_recurrences', kwargs={'todo_item_id': yearly_occurrence.id}),
@@ -1122,7 +2129,7 @@ class CreateYearlyRecurrencesTests(TestCase):
             2023, 3, 16, 6, 0, 0, tzinfo=pytz.utc)
 
         yearly_occurrence = create_from_data_dict(
-            self.data_form)  # create first instance
+            self.data_form, self.user)  # create first instance
 
         # should create 4 instances
         self.client.post(reverse('todo_list:create_recurrences', kwargs={'todo_item_id': yearly_occurrence.id}),
@@ -1161,7 +2168,7 @@ class CreateYearlyRecurrencesTests(TestCase):
             2019, 2, 10, 4, 0, 0, tzinfo=pytz.utc)
 
         yearly_occurrence = create_from_data_dict(
-            self.data_form)  # create first instance
+            self.data_form, self.user)  # create first instance
 
         self.client.post(reverse('todo_list:create_recurrences', kwargs={'todo_item_id': yearly_occurrence.id}),
                          self.data_form)
@@ -1183,14 +2190,14 @@ class CreateYearlyRecurrencesTests(TestCase):
 
 class UpdateViewTest(TestCase):
     def setUp(self):
+        # Forces a login to occur, creates a test user if one does not exist
+        self.user = User.objects.get_or_create(username='testuser')[0]
+        self.client.force_login(self.user)
+
         self.my_course = create_course(
-            new_course_name="Tester"
+            new_course_name="Tester", user=self.user
         )
-        self.my_ec = create_ec(new_name='fun')
-
-        # Forces a login to occur, creates a test user if one does not exist
-        self.client.force_login(
-            User.objects.get_or_create(username='testuser')[0])
+        self.my_ec = create_ec(new_name='fun', user=self.user)
 
         self.data_form = {
             'title': "TBD",
@@ -1207,7 +2214,7 @@ class UpdateViewTest(TestCase):
         }
 
     def test_correct_template_for_updateview(self):
-        daily_occurrence = create_from_data_dict(self.data_form)
+        daily_occurrence = create_from_data_dict(self.data_form, self.user)
         response = self.client.post(reverse('todo_list:detail', kwargs={'pk': daily_occurrence.id}),
                                     self.data_form)
         self.assertTemplateUsed(response, 'todo/edit_todoitem_form.html')
@@ -1218,25 +2225,15 @@ class UpdateViewTest(TestCase):
         self.assertTrue(form.is_valid())
 
     def test_change_all_todo_titles_only(self):
-        daily_occurrence = create_from_data_dict(self.data_form)
+        daily_occurrence = create_from_data_dict(self.data_form, self.user)
 
         # create instances
         self.client.post(reverse('todo_list:create_recurrences', kwargs={'todo_item_id': daily_occurrence.id}),
                          self.data_form)
 
-        # Change fields: hard coded because not going through UpdateView first
-        first = ToDoItem.objects.get(pk=daily_occurrence.id)
-        first.title = "Changed titles successful"
-        first.has_title_changed = True
-
-        for todo in ToDoItem.objects.filter(duedate__gt=first.duedate):
-            first.future_events.append(todo.id)
-
-        first.save()
-
         # change all
-        self.client.post(reverse('todo_list:change_all', kwargs={'todo_item_id': first.id}),
-                         self.data_form)
+        first = ToDoItem.objects.get(pk=daily_occurrence.id)
+        post_change_all(self.client, first, title="Changed titles successful")
         current_query = ToDoItem.objects.filter(
             title="Changed titles successful")
         # there should be 4 instances
@@ -1244,48 +2241,30 @@ class UpdateViewTest(TestCase):
         self.assertEqual(4, len(current_query))
 
     def test_change_all_todo_descriptions_only(self):
-        daily_occurrence = create_from_data_dict(self.data_form)
+        daily_occurrence = create_from_data_dict(self.data_form, self.user)
         # create instances
         self.client.post(reverse('todo_list:create_recurrences', kwargs={'todo_item_id': daily_occurrence.id}),
                          self.data_form)
 
-        # Change fields: hard coded because not going through UpdateView first
-        second = ToDoItem.objects.get(pk=daily_occurrence.id+1)
-        second.description = "Changed description for 3/4 successfully"
-        second.has_description_changed = True
-
-        for todo in ToDoItem.objects.filter(duedate__gt=second.duedate):
-            second.future_events.append(todo.id)
-
-        second.save()
         # change all
-        self.client.post(reverse('todo_list:change_all', kwargs={'todo_item_id': second.id}),
-                         self.data_form)
+        second = ToDoItem.objects.get(pk=daily_occurrence.id+1)
+        post_change_all(self.client, second,
+                        description="Changed description for 3/4 successfully")
         current_query = ToDoItem.objects.filter(
             description="Changed description for 3/4 successfully")
         # there should be 3 instances
         self.assertEqual(3, len(current_query))
 
     def test_change_all_todo_titles_and_descr(self):
-        daily_occurrence = create_from_data_dict(self.data_form)
+        daily_occurrence = create_from_data_dict(self.data_form, self.user)
         # create instances
         self.client.post(reverse('todo_list:create_recurrences', kwargs={'todo_item_id': daily_occurrence.id}),
                          self.data_form)
 
-        # Change fields: hard coded because not going through UpdateView first
-        third = ToDoItem.objects.get(pk=daily_occurrence.id+2)
-        third.title = "Title changed"
-        third.description = "Changed description for 2 of the last ones in the list successfully"
-        third.has_title_changed = True
-        third.has_description_changed = True
-
-        for todo in ToDoItem.objects.filter(duedate__gt=third.duedate):
-            third.future_events.append(todo.id)
-        third.save()
-
         # change all
-        self.client.post(reverse('todo_list:change_all', kwargs={'todo_item_id': third.id}),
-                         self.data_form)
+        third = ToDoItem.objects.get(pk=daily_occurrence.id+2)
+        post_change_all(self.client, third, title="Title changed",
+                        description="Changed description for 2 of the last ones in the list successfully")
 
         current_query = ToDoItem.objects.filter(title="Title changed",
                                                 description="Changed description for 2 of the last ones in the list successfully")
@@ -1293,18 +2272,35 @@ class UpdateViewTest(TestCase):
         # there should be 2 instances
         self.assertEqual(2, len(current_query))
 
+    def test_change_all_is_set_based(self):
+        """
+        Changing all future events of a long series takes a handful of queries, not one per occurrence
+        """
+        self.data_form['end_recur_date'] = datetime.datetime(2020, 10, 1, 5, 0, 0, tzinfo=pytz.utc)
+        daily_occurrence = create_from_data_dict(self.data_form, self.user)
+        self.client.post(reverse('todo_list:create_recurrences', kwargs={'todo_item_id': daily_occurrence.id}))
+        first = ToDoItem.objects.get(pk=daily_occurrence.id)
+        self.assertEqual(200, len(first.series.occurrences.all()))
+
+        with CaptureQueriesContext(connection) as queries:
+            response = post_change_all(self.client, first, title="Renamed", end_recur_date='2020-09-01 01:00')
+        self.assertRedirects(response, reverse('todo_list:todo_list'), fetch_redirect_response=False)
+        self.assertEqual(170, ToDoItem.objects.filter(title="Renamed").count())
+        # the dropped occurrences are read once more to uncount them from the calendar, which also
+        # gets a new version
+        self.assertLess(len(queries), 33)
+
 
 class TestEditRecurrences(TestCase):
     def setUp(self):
-        self.my_course = create_course(
-            new_course_name="Tester"
-        )
-
         # Forces a login to occur, creates a test user if one does not exist
-        self.client.force_login(
-            User.objects.get_or_create(username='testuser')[0])
+        self.user = User.objects.get_or_create(username='testuser')[0]
+        self.client.force_login(self.user)
 
-        self.my_ec = create_ec(new_name='fun')
+        self.my_course = create_course(
+            new_course_name="Tester", user=self.user
+        )
+        self.my_ec = create_ec(new_name='fun', user=self.user)
         self.data_form = {
             'title': "Test edit recurrences",
             'description': '',
@@ -1322,7 +2318,7 @@ class TestEditRecurrences(TestCase):
     def test_changing_duedate_only_to_later(self):
         self.data_form['title'] = "Test redirect to edit_recurrences"
         self.data_form['recur_freq'] = 'DAILY'  # create 15 instances
-        daily_occurrence = create_from_data_dict(self.data_form)
+        daily_occurrence = create_from_data_dict(self.data_form, self.user)
         response = self.client.post(reverse('todo_list:create_recurrences', kwargs={
                                     'todo_item_id': daily_occurrence.id}), self.data_form)
         current_query_before_change = ToDoItem.objects.all()
@@ -1345,17 +2341,50 @@ class TestEditRecurrences(TestCase):
         self.assertEqual(14, count_true)
 
         first = ToDoItem.objects.get(pk=daily_occurrence.id)
-        # should create 15 instances because one of the instances is deleted
-        first.duedate = datetime.datetime(
-            2020, 3, 19, 5, 0, 0, tzinfo=pytz.utc)
-        first.has_duedate_changed = True
-        first.save()
-
-        self.client.post(reverse('todo_list:edit_recurrences', kwargs={
-                         'todo_item_id': first.id}), self.data_form)
+        # the series restarts on 3/19, so 3/19 through 3/30 are left
+        post_change_all(self.client, first, duedate='2020-03-19 01:00')
         current_query = ToDoItem.objects.all()
 
-        self.assertEqual(15, len(current_query))
+        self.assertEqual(12, len(current_query))
+        self.assertEqual(12, len(first.series.occurrences.all()))
+
+    def test_extending_end_date_keeps_existing_occurrences(self):
+        """
+        Extending end_recur_date only appends the new tail; completed occurrences and subtasks stay
+        """
+        self.data_form['recur_freq'] = 'DAILY'
+        daily_occurrence = create_from_data_dict(self.data_form, self.user)
+        self.client.post(reverse('todo_list:create_recurrences', kwargs={
+                         'todo_item_id': daily_occurrence.id}))
+        ids_before = set(ToDoItem.objects.values_list('id', flat=True))
+        done = ToDoItem.objects.get(duedate=datetime.datetime(2020, 3, 20, 5, 0, 0, tzinfo=pytz.utc))
+        done.completed = True
+        done.save()
+        SubTask.objects.create(todo=done, detail="kept")
+
+        first = ToDoItem.objects.get(pk=daily_occurrence.id)
+        post_change_all(self.client, first, end_recur_date='2020-04-04 01:00')
+
+        self.assertEqual(20, ToDoItem.objects.count())
+        self.assertTrue(ids_before.issubset(ToDoItem.objects.values_list('id', flat=True)))
+        self.assertTrue(ToDoItem.objects.get(pk=done.id).completed)
+        self.assertEqual(1, SubTask.objects.filter(todo=done).count())
+
+    def test_shortening_end_date_only_trims(self):
+        """
+        Shortening end_recur_date deletes the occurrences past the new end and nothing else
+        """
+        self.data_form['recur_freq'] = 'DAILY'
+        daily_occurrence = create_from_data_dict(self.data_form, self.user)
+        self.client.post(reverse('todo_list:create_recurrences', kwargs={
+                         'todo_item_id': daily_occurrence.id}))
+        ids_before = set(ToDoItem.objects.values_list('id', flat=True))
+
+        first = ToDoItem.objects.get(pk=daily_occurrence.id)
+        post_change_all(self.client, first, end_recur_date='2020-03-25 01:00')
+
+        self.assertEqual(10, ToDoItem.objects.count())
+        self.assertTrue(ids_before.issuperset(ToDoItem.objects.values_list('id', flat=True)))
 
     def tearDown(self):
         del self.data_form
@@ -1369,9 +2398,131 @@ class TestNotes(TestCase):
         self.client.force_login(self.user)
         self.note = Note.objects.create(user=self.user, text='test note')
 
-    def test_todolist_context(self):
+    def test_todolist_loads_note_after_render(self):
+        response = self.client.get(reverse('todo_list:todo_list'))
+        # the page does not read the note while it renders
+        self.assertFalse(hasattr(response.wsgi_request, '_todo_note'))
+        self.assertContains(response, reverse('todo_list:notes_fragment'))
+        response = self.client.get(reverse('todo_list:notes_fragment'))
+        self.assertEqual(self.note.text, response.json()['text'])
+
+    def test_unchanged_note_is_not_modified(self):
+        response = self.client.get(reverse('todo_list:notes_fragment'))
+        self.assertIn('private', response['Cache-Control'])
+        etag = response['ETag']
+        response = self.client.get(reverse('todo_list:notes_fragment'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(304, response.status_code)
+
+        self.client.post(reverse('todo_list:notes'), {'notes': 'changed'})
+        response = self.client.get(reverse('todo_list:notes_fragment'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(200, response.status_code)
+        self.assertEqual('changed', response.json()['text'])
+
+    def test_save_without_notes_keeps_note(self):
         response = self.client.get(reverse('todo_list:todo_list'))
-        self.assertEqual(response.context['note'], self.note.text)
+        self.assertContains(response, 'id="notes-save" value="Submit" disabled')
+        self.client.post(reverse('todo_list:notes'), {})
+        self.assertEqual('test note', Note.objects.get(user=self.user).text)
+
+    def test_save_locks_the_user_before_creating(self):
+        with CaptureQueriesContext(connection) as queries:
+            save_note(self.user, 'locked')
+        locks = [query['sql'] for query in queries.captured_queries if query['sql'].endswith('FOR UPDATE')]
+        self.assertIn('"auth_user"', locks[0])
+        # a second row left by an earlier race is not an error, the oldest one is the note
+        Note.objects.create(user=self.user, text='duplicate')
+        save_note(self.user, 'saved')
+        self.assertEqual('saved', Note.objects.get(pk=self.note.pk).text)
+        self.assertEqual('saved', get_note_text(self.user))
+
+    def test_note_is_created_on_first_save(self):
+        user = User.objects.create(username='newuser')
+        self.client.force_login(user)
+        self.client.get(reverse('todo_list:completed'))
+        self.assertEqual('', self.client.get(reverse('todo_list:notes_fragment')).json()['text'])
+        self.assertFalse(Note.objects.filter(user=user).exists())
+        self.client.post(reverse('todo_list:notes'), {'notes': 'first'})
+        self.assertEqual('first', Note.objects.get(user=user).text)
+
+    @override_settings(CACHES={
+        'default': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'todo_cache'},
+        'notes': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'notes-test'},
+    }, TODO_NOTES_CACHE='notes')
+    def test_note_is_cached_per_user(self):
+        self.assertEqual('test note', get_note_text(self.user))
+        with self.assertNumQueries(0):
+            self.assertEqual('test note', get_note_text(self.user))
+        # saving (here or in the admin) replaces the cached text
+        save_note(self.user, 'saved')
+        self.assertEqual('saved', get_note_text(self.user))
+        self.note.refresh_from_db()
+        self.note.text = 'from the admin'
+        self.note.save()
+        self.assertEqual('from the admin', get_note_text(self.user))
+
+    def autosave(self, version, patches):
+        return self.client.post(reverse('todo_list:autosave_notes'),
+                                json.dumps({'version': version, 'patches': patches}),
+                                content_type='application/json')
+
+    def test_autosave_applies_patches(self):
+        version = self.client.get(reverse('todo_list:notes_fragment')).json()['version']
+        # 'test note' -> 'my test notes'
+        response = self.autosave(version, [{'start': 0, 'end': 0, 'text': 'my '},
+                                           {'start': 12, 'end': 12, 'text': 's'}])
+        self.assertEqual(204, response.status_code)
+        self.assertEqual(str(version + 1), response['X-Note-Version'])
+        self.note.refresh_from_db()
+        self.assertEqual('my test notes', self.note.text)
+        self.assertEqual('my test notes', self.client.get(reverse('todo_list:notes_fragment')).json()['text'])
+
+    def test_autosave_of_stale_version_conflicts(self):
+        version = self.client.get(reverse('todo_list:notes_fragment')).json()['version']
+        self.client.post(reverse('todo_list:notes'), {'notes': 'from another tab'})
+        response = self.autosave(version, [{'start': 0, 'end': 4, 'text': 'best'}])
+        self.assertEqual(409, response.status_code)
+        self.assertEqual({'text': 'from another tab', 'version': version + 1}, response.json())
+        self.assertEqual('from another tab', Note.objects.get(user=self.user).text)
+
+    def test_autosave_rejects_bad_patches(self):
+        version = Note.objects.get(user=self.user).version
+        # the first patch is fine, the second does not fit: nothing is saved
+        response = self.autosave(version, [{'start': 0, 'end': 4, 'text': 'best'},
+                                           {'start': 5, 'end': 50, 'text': 'x'}])
+        self.assertEqual(400, response.status_code)
+        self.assertEqual('test note', Note.objects.get(user=self.user).text)
+        response = self.client.post(reverse('todo_list:autosave_notes'), 'not json',
+                                    content_type='application/json')
+        self.assertEqual(400, response.status_code)
+        self.assertEqual(405, self.client.get(reverse('todo_list:autosave_notes')).status_code)
+
+    def test_malformed_autosave_is_not_a_conflict(self):
+        version = Note.objects.get(user=self.user).version
+        for bad_version, patches in [(str(version), [{'start': 0, 'end': 0, 'text': 'x'}]),
+                                     (None, []),
+                                     (version, {'start': 0, 'end': 0, 'text': 'x'}),
+                                     (version, [{'start': 'a', 'end': 0, 'text': 'x'}]),
+                                     (version, [{'start': 3, 'end': 1, 'text': 'x'}]),
+                                     (version, [{'start': -1, 'end': 0, 'text': 'x'}]),
+                                     (version + 5, [{'start': 0, 'end': 0, 'text': 1}])]:
+            self.assertEqual(400, self.autosave(bad_version, patches).status_code, (bad_version, patches))
+        self.assertEqual('test note', Note.objects.get(user=self.user).text)
+        # a well-formed patch against an old version still is a conflict
+        self.assertEqual(409, self.autosave(version - 1, [{'start': 0, 'end': 0, 'text': 'x'}]).status_code)
+
+    def test_first_autosave_creates_note(self):
+        user = User.objects.create(username='newuser')
+        self.client.force_login(user)
+        response = self.autosave(0, [{'start': 0, 'end': 0, 'text': 'first'}])
+        self.assertEqual(204, response.status_code)
+        self.assertEqual('first', Note.objects.get(user=user).text)
+
+    @override_settings(TODO_QUOTE_PROVIDER='todo.quotes.FileQuoteProvider',
+                       TODO_QUOTE_PROVIDER_OPTIONS={'path': '/nonexistent/quote.json'})
+    def test_quote_fragment(self):
+        response = self.client.get(reverse('todo_list:quote_fragment'))
+        self.assertEqual(DEFAULT_QUOTE, response.json()['quote'])
+        self.assertIn('max-age=3600', response['Cache-Control'])
 
     def test_createnote_post(self):
         response = self.client.post(reverse('todo_list:notes'), {
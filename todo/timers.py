@@ -0,0 +1,95 @@
+from django.db import transaction
+from django.utils import timezone
+from .models import ToDoItem, ThresholdTimer
+from .priority import HIGH_WITHIN, MEDIUM_WITHIN, stored_escalation_enabled
+
+# thresholds a to-do crosses before it is due, latest last: (threshold, how long before the duedate)
+THRESHOLDS = [('MD', MEDIUM_WITHIN), ('HI', HIGH_WITHIN)]
+
+# timers handled per tick, so a backlog is worked off in bounded transactions
+TICK_BATCH_SIZE = 1000
+
+
+# (threshold, fires_at) of the first threshold todo_item crosses after now, None if there is none left
+def next_threshold(todo_item, now=None):
+    if todo_item.completed:
+        return None
+    now = now or timezone.now()
+    for threshold, before in THRESHOLDS:
+        if (todo_item.duedate - before > now):
+            return threshold, todo_item.duedate - before
+    return None
+
+
+# latest threshold todo_item has crossed by now, None if it has crossed none
+def crossed_threshold(todo_item, now):
+    crossed = None
+    for threshold, before in THRESHOLDS:
+        if (todo_item.duedate - before <= now):
+            crossed = threshold
+    return crossed
+
+
+# (re)schedules the timer of a to-do whose duedate or completion changed; a single row and one
+# index entry change, so this stays O(log n) in the number of timers
+def schedule(todo_item, now=None):
+    upcoming = next_threshold(todo_item, now)
+    if upcoming is None:
+        ThresholdTimer.objects.filter(todo=todo_item).delete()
+        return None
+    threshold, fires_at = upcoming
+    timer, created = ThresholdTimer.objects.update_or_create(
+        todo=todo_item, defaults={'threshold': threshold, 'fires_at': fires_at})
+    return timer
+
+
+# schedules the timers of to-dos that have none yet (just inserted) with one INSERT
+def schedule_new(todo_items, now=None):
+    now = now or timezone.now()
+    timers = []
+    for todo_item in todo_items:
+        upcoming = next_threshold(todo_item, now)
+        if upcoming is not None:
+            timers.append(ThresholdTimer(todo_id=todo_item.pk, threshold=upcoming[0], fires_at=upcoming[1]))
+    ThresholdTimer.objects.bulk_create(timers, batch_size=TICK_BATCH_SIZE, ignore_conflicts=True)
+    return timers
+
+
+# what happens when to-dos cross a threshold: their stored priority is raised if the site stores it
+def on_threshold(threshold, todo_ids):
+    if not stored_escalation_enabled():
+        return 0
+    items = ToDoItem.objects.filter(pk__in=todo_ids, completed=False)
+    if (threshold == 'HI'):
+        return items.exclude(priority='HI').update(priority='HI')
+    return items.filter(priority='LO').update(priority='MD')
+
+
+# handles the timers that fired by now, oldest first, and moves each one to its to-do's next
+# threshold; only fired timers are read. A to-do that crossed several thresholds since the last
+# tick is handled for the latest one. Returns how many fired
+def tick(now=None):
+    now = now or timezone.now()
+    with transaction.atomic():
+        fired = list(ThresholdTimer.objects.select_for_update(skip_locked=True, of=('self',))
+                     .filter(fires_at__lte=now).select_related('todo')
+                     .order_by('fires_at')[:TICK_BATCH_SIZE])
+        by_threshold = {}
+        for timer in fired:
+            threshold = crossed_threshold(timer.todo, now) or timer.threshold
+            by_threshold.setdefault(threshold, []).append(timer.todo_id)
+        for threshold, todo_ids in by_threshold.items():
+            on_threshold(threshold, todo_ids)
+
+        done = []
+        moved = []
+        for timer in fired:
+            upcoming = next_threshold(timer.todo, now)
+            if upcoming is None:
+                done.append(timer.pk)
+            else:
+                timer.threshold, timer.fires_at = upcoming
+                moved.append(timer)
+        ThresholdTimer.objects.filter(pk__in=done).delete()
+        ThresholdTimer.objects.bulk_update(moved, ['threshold', 'fires_at'])
+    return len(fired)
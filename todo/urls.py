@@ -6,6 +6,9 @@ app_name = 'todo_list'
 urlpatterns = [
     path('', views.ToDoListView.as_view(), name='todo_list'),
     path('notes/', views.save_notes, name='notes'),
+    path('notes/autosave/', views.autosave_notes, name='autosave_notes'),
+    path('fragments/notes/', views.notes_fragment, name='notes_fragment'),
+    path('fragments/quote/', views.quote_fragment, name='quote_fragment'),
     path('<int:pk>/', views.EditToDo.as_view(), name='detail'),
     path('completed/', views.CompletedView.as_view(), name='completed'),
     path('<int:todo_item_id>/complete_todo/',
@@ -13,7 +16,6 @@ urlpatterns = [
     path('add_todo_item/', views.AddToDoItemView.as_view(), name='add_todo_item'),
     path('delete_todo_item/<int:todo_item_id>/',
          views.delete_todo, name='delete_todo_item'),
-    path('<int:todo_item_id>/change_all/', views.change_all, name='change_all'),
     path('add_todo_item/<int:todo_item_id>/create_recurrences/',
          views.create_recurrences, name='create_recurrences'),
 
@@ -22,8 +24,10 @@ urlpatterns = [
          views.SpecificDayView.as_view(), name='specific_day'),
     path('today/', 
           views.TodoTodayArchiveView.as_view(), name='archive_today'),
-    path('<int:todo_item_id>/edit_recurrences/',
-         views.edit_recurrences, name='edit_recurrences'),
+    path('recurrence_jobs/<int:job_id>/',
+         views.recurrence_job_status, name='recurrence_job'),
+    path('series/<int:series_id>/occurrence/<int:index>/<str:action>/',
+         views.occurrence_action, name='occurrence_action'),
     path('<int:todo_item_id>/add_subtask/',
          views.create_subtask_model_form, name='add_subtask'),
     path('<int:subtask_id>/complete_subtask/',
@@ -36,6 +40,8 @@ urlpatterns = [
     path('month/<int:year>/<str:month>/', views.month_calendar_view, name='specific_month'),
     path('next_month/<int:year>/<str:month>/', views.month_calendar_next, name='next_month'),
     path('prev_month/<int:year>/<str:month>/', views.month_calendar_prev, name='prev_month'),
+    path('year/<int:year>/', views.year_calendar_view, name='specific_year'),
+    path('calendar/days/', views.calendar_feed, name='calendar_feed'),
 
     path('job/', views.JobListView.as_view(), name='job_list'),
     path('job/today/', views.JobTodayList.as_view(), name='job_today_todo_list'),
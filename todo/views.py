@@ -1,7 +1,20 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.views import generic
 from .forms import ToDoForm, CourseForm, DayForm, ECForm, MonthForm, SubTaskModelFormSet, WeekForm
-from .models import ToDoItem, Course, Extracurricular, Note, SubTask
+from .models import ToDoItem, Course, Extracurricular, SubTask, RecurrenceSeries, RecurrenceJob
+from .priority import with_effective_priority
+from .timers import schedule
+from .rollups import calendar_changed, calendar_version, day_counts, day_window, delete_todos
+from .calendar_grid import calendar_days
+from .pagination import KeysetPaginationMixin, decode_cursor
+from .quotes import get_quote
+from .notes import save_note, request_note, patch_note, note_data, NoteConflict
+from .recurrences import (start_series, end_series, change_series, lazy_recurrences_enabled,
+                          virtual_occurrences, materialize_occurrence, lazy_occurrence_date,
+                          exclude_occurrence)
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Prefetch
 from django.views.generic.edit import CreateView, UpdateView
 from django.views.generic.dates import DayArchiveView, TodayArchiveView
 from django.utils import timezone
@@ -9,9 +22,13 @@ import datetime
 from datetime import date
 import pytz
 from dateutil.relativedelta import relativedelta
-from django.http import HttpResponseRedirect
+from django.http import HttpResponse, HttpResponseRedirect, JsonResponse
+from django.views.decorators.http import require_POST
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+import hashlib
+import json
 import calendar
-import requests
 
 
 ######################## TO DO view ################################
@@ -31,117 +48,31 @@ class AddToDoItemView(CreateView):
         form.filter_course_and_ec(user=self.request.user)
         return form
 
-    # overriding form_valid function to redirect to create_recurrences when add a todo item
+    # overriding form_valid function to create the recurrences in the same request
     def form_valid(self, form):
-        obj = form.save()
-        obj.user = self.request.user
-        obj.save()
-        if (obj.recur_freq != 'NEVER'):
-            return redirect('todo_list:create_recurrences', todo_item_id=obj.id)
-        else:
+        with transaction.atomic():
+            obj = form.save(commit=False)
             obj.user = self.request.user
             obj.save()
-            return redirect('todo_list:todo_list')
+            form.save_m2m()
+            schedule(obj)
+            if (obj.recur_freq != 'NEVER'):
+                # a lazy series is stored once and expanded when a view asks for a date window
+                start_series(obj, user=self.request.user, lazy=lazy_recurrences_enabled())
+        return redirect('todo_list:todo_list')
 
 
-# function create recurrence of newly added objects based on recur_freq and end_recur_date fields
+# function create recurrence of newly added objects based on recur_freq and end_recur_date fields;
+# only for the user's own to-dos, and only with a POST since it writes the series
+@require_POST
 def create_recurrences(request, todo_item_id):
-    todo_item = get_object_or_404(ToDoItem, pk=todo_item_id)
-    # if recur_freq is not NEVER
+    todo_item = get_object_or_404(ToDoItem, pk=todo_item_id, user=request.user)
+    # if recur_freq is not NEVER, todo_item (re)starts a series from its own fields
     if (todo_item.recur_freq != 'NEVER'):
-        end_date = todo_item.end_recur_date  # get end_recur_date from current obj
-        due_date = todo_item.duedate  # get current duedate
-        if (end_date < due_date):
-            return redirect('todo_list:todo_list')
-        if (todo_item.recur_freq == 'DAILY'):
-            # find the time differences
-            delta = end_date - (due_date + relativedelta(days=+1))
-            delta_day = delta.days + 1
-            for i in range(1, delta_day + 1):
-                ToDoItem.objects.create(
-                    course=todo_item.course,
-                    ec=todo_item.ec,
-                    title=todo_item.title,
-                    description=todo_item.description,
-                    location=todo_item.location,
-                    duedate=todo_item.duedate + relativedelta(days=+i),
-                    recur_freq=todo_item.recur_freq,
-                    end_recur_date=todo_item.end_recur_date,
-                    priority=todo_item.priority,
-                    category=todo_item.category,
-                    user=request.user,
-                    # progress default 0
-                    # completed = default False
-                )
-
-        elif (todo_item.recur_freq == 'WEEKLY'):
-            delta = end_date - due_date  # find the time differences
-            delta_day = delta.days
-            weeks = delta_day // 7  # number of weeks
-            for i in range(1, weeks + 1):
-                ToDoItem.objects.create(
-                    course=todo_item.course,
-                    ec=todo_item.ec,
-                    title=todo_item.title,
-                    description=todo_item.description,
-                    location=todo_item.location,
-                    duedate=todo_item.duedate + relativedelta(weeks=+i),
-                    recur_freq=todo_item.recur_freq,
-                    end_recur_date=todo_item.end_recur_date,
-                    priority=todo_item.priority,
-                    category=todo_item.category,
-                    user=request.user,
-                    # progress default 0
-                    # completed = default False
-                )
-
-        elif (todo_item.recur_freq == 'MONTHLY'):
-            delta = end_date - due_date  # find the time differences
-            DAYS_IN_YR = 365
-            MONTHS_IN_YR = 12
-            DAYS_IN_MONTHS = 30  # roughly
-            delta_month = (delta.days // DAYS_IN_YR) * MONTHS_IN_YR
-            # days left that's not a year
-            delta_remainders = (delta.days % DAYS_IN_YR)
-            months_leftover = delta_remainders // DAYS_IN_MONTHS
-
-            for i in range(1, delta_month + months_leftover + 1):
-                ToDoItem.objects.create(
-                    course=todo_item.course,
-                    ec=todo_item.ec,
-                    title=todo_item.title,
-                    description=todo_item.description,
-                    location=todo_item.location,
-                    duedate=todo_item.duedate + relativedelta(months=+i),
-                    recur_freq=todo_item.recur_freq,
-                    end_recur_date=todo_item.end_recur_date,
-                    priority=todo_item.priority,
-                    category=todo_item.category,
-                    user=request.user,
-                    # progress default 0
-                    # completed = default False
-                )
-
-        elif (todo_item.recur_freq == 'YEARLY'):
-            # find the time differences
-            delta_year = relativedelta(end_date, due_date).years
-            # loop thro day_dif to create and save that many obj
-            for i in range(1, delta_year + 1):
-                ToDoItem.objects.create(
-                    course=todo_item.course,
-                    ec=todo_item.ec,
-                    title=todo_item.title,
-                    description=todo_item.description,
-                    location=todo_item.location,
-                    duedate=todo_item.duedate + relativedelta(years=+i),
-                    recur_freq=todo_item.recur_freq,
-                    end_recur_date=todo_item.end_recur_date,
-                    priority=todo_item.priority,
-                    category=todo_item.category,
-                    user=request.user,
-                    # progress default 0
-                    # completed = default False
-                )
+        start_series(todo_item, user=request.user)
+    # no longer repeating: the series stops before todo_item
+    elif (todo_item.series_id is not None):
+        end_series(todo_item)
     return redirect('todo_list:todo_list')
 
 
@@ -160,10 +91,13 @@ class EditToDo(UpdateView):
         form.filter_course_and_ec(user=self.request.user)
         return form
 
-    # override form_valid to check to see if recur_freq has changed
+    # override form_valid to apply "change all" to every future event of the series
     # https://django-model-utils.readthedocs.io/en/latest/utilities.html#field-tracker
     def form_valid(self, form):
         todo = form.save(commit=False)
+        # a new duedate moves the threshold timer, a single index update
+        if (todo.tracker.has_changed('duedate')):
+            schedule(todo)
         if (self.request.POST.get("change-once")):  # only change fields for one instance
             todo.save()
             form.save_m2m()
@@ -171,131 +105,43 @@ class EditToDo(UpdateView):
         # if changed for all future events and current instance
         elif (self.request.POST.get("change-all")):
             fields_changed = self.object.tracker.changed()
-            if (len(fields_changed) == 0):
+            with transaction.atomic():
                 todo.save()
                 form.save_m2m()
-                return redirect('todo_list:todo_list')
-            else:
-                todo.has_title_changed = self.object.tracker.has_changed(
-                    'title')
-                todo.has_description_changed = self.object.tracker.has_changed(
-                    'description')
-                todo.has_location_changed = self.object.tracker.has_changed(
-                    'location')
-                todo.has_category_changed = self.object.tracker.has_changed(
-                    'category')
-                todo.has_priority_changed = self.object.tracker.has_changed(
-                    'priority')
-
-                # date changes
-                todo.has_duedate_changed = self.object.tracker.has_changed(
-                    'duedate')
-                todo.has_recur_freq_changed = self.object.tracker.has_changed(
-                    'recur_freq')  # returns true if recur_freq field has changed
-                todo.has_end_recur_date_changed = self.object.tracker.has_changed(
-                    'end_recur_date')  # returns true if end_recur_date has changed
-
-                # filter by fields that are likely to be changed together or least likely to change:
-                # title, duedate, recur_freq, end_recur_date, category
-                if (todo.has_title_changed):
-                    titles = todo.tracker.previous('title')
-                elif (not todo.has_title_changed):
-                    titles = todo.title
-                if (todo.has_duedate_changed):
-                    duedates = todo.tracker.previous('duedate')
-                else:
-                    duedates = todo.duedate
-                if (todo.has_recur_freq_changed):
-                    recur_freqs = todo.tracker.previous('recur_freq')
-                else:
-                    recur_freqs = todo.recur_freq
-                if (todo.has_end_recur_date_changed):
-                    end_recur_dates = todo.tracker.previous('end_recur_date')
-                else:
-                    end_recur_dates = todo.end_recur_date
-                if (todo.has_category_changed):
-                    categories = todo.tracker.previous('category')
-                else:
-                    categories = todo.category
-
-                future_events = ToDoItem.objects.filter(title=titles,
-                                                        duedate__gt=duedates,
-                                                        recur_freq=recur_freqs,
-                                                        end_recur_date=end_recur_dates,
-                                                        category=categories,
-                                                        user=self.request.user,
-                                                        )
-
-                # filter how many of the same event that is in the future
-                if (len(future_events) == 0):
-                    todo.save()
-                    form.save_m2m()
-                    if (todo.has_end_recur_date_changed or todo.has_recur_freq_changed or todo.has_duedate_changed):
-                        return redirect('todo_list:create_recurrences', todo_item_id=todo.id)
-                    else:
-                        return redirect('todo_list:todo_list')
-
-                for future_event in future_events:
-                    todo.future_events.append(future_event.id)
-                # print( future_events )
-
-                todo.save()
-                form.save_m2m()
-
-                return redirect('todo_list:change_all', todo_item_id=todo.id)
-
-
-def change_all(request, todo_item_id):
-    todo_item = get_object_or_404(ToDoItem, pk=todo_item_id)  # get obj
-
-    for i in todo_item.future_events:
-        future_event = ToDoItem.objects.get(pk=i)
-        if (todo_item.has_title_changed):
-            future_event.title = todo_item.title
-        if (todo_item.has_description_changed):
-            future_event.description = todo_item.description
-        if (todo_item.has_location_changed):
-            future_event.location = todo_item.location
-        if (todo_item.has_category_changed):
-            future_event.category = todo_item.category
-        if (todo_item.has_priority_changed):
-            future_event.priority = todo_item.priority
-        future_event.course = todo_item.course
-        future_event.ec = todo_item.ec
-        future_event.save()
-
-    todo_item.has_title_changed = False
-    todo_item.has_description_changed = False
-    todo_item.has_location_changed = False
-    todo_item.has_category_changed = False
-    todo_item.has_priority_changed = False
-    todo_item.save()
-
-    if (todo_item.has_end_recur_date_changed or todo_item.has_recur_freq_changed or todo_item.has_duedate_changed):
-        return redirect('todo_list:edit_recurrences', todo_item_id=todo_item_id)
+                if (len(fields_changed) != 0):
+                    change_series(todo, fields_changed, user=self.request.user)
+            return redirect('todo_list:todo_list')
 
-    else:
-        todo_item.future_events = []
-        todo_item.save()
-        return redirect('todo_list:todo_list')
 
-# function checks if user has edited recur_freq field and make according changes to all future tasks
+# status of a queued recurrence job, polled by the to-do list while the worker runs it
+def recurrence_job_status(request, job_id):
+    job = get_object_or_404(RecurrenceJob, pk=job_id, user=request.user)
+    return JsonResponse({
+        'id': job.id,
+        'status': job.status,
+        'rows_written': job.rows_written,
+        'error': job.error,
+    })
 
 
-def edit_recurrences(request, todo_item_id):
-    todo_item = get_object_or_404(ToDoItem, pk=todo_item_id)  # get obj
-    # for date changes, delete all future instances and remake others
-    # https://docs.djangoproject.com/en/2.0/ref/models/querysets/
-    for i in todo_item.future_events:
-        ToDoItem.objects.get(pk=i).delete()
+# completing, editing, adding subtasks to or deleting a single occurrence of a lazy series
+# that has no row yet; the occurrence is materialized first (deleting only records the date)
+def occurrence_action(request, series_id, index, action):
+    series = get_object_or_404(RecurrenceSeries, pk=series_id, user=request.user)
+    if (action == 'delete'):
+        occurrence_date = lazy_occurrence_date(series, index)
+        if occurrence_date is not None:
+            exclude_occurrence(series, occurrence_date)
+        return redirect(request.META.get('HTTP_REFERER', '/'))
 
-    todo_item.has_end_recur_date_changed = False
-    todo_item.has_recur_freq_changed = False
-    todo_item.has_duedate_changed = False
-    todo_item.future_events = []
-    todo_item.save()
-    # redirect to create_recurrences to make new future instances
-    return redirect('todo_list:create_recurrences', todo_item_id=todo_item_id)
+    todo_item = materialize_occurrence(series, index)
+    if todo_item is None:
+        return redirect('todo_list:todo_list')
+    if (action == 'complete'):
+        return complete_todo(request, todo_item.id)
+    elif (action == 'subtask'):
+        return redirect('todo_list:add_subtask', todo_item_id=todo_item.id)
+    return redirect('todo_list:detail', pk=todo_item.id)
 
 
 # https://medium.com/all-about-django/adding-forms-dynamically-to-a-django-formset-375f1090c2b0
@@ -356,45 +202,61 @@ def complete_subtask(request, subtask_id):
     return redirect(request.META.get('HTTP_REFERER', '/'))
 
 
-class ToDoListView(generic.ListView):
+# merges the virtual occurrences of lazy series into a list of todo items, by duedate
+def merge_virtual_occurrences(todo_items, occurrences):
+    if not occurrences:
+        return todo_items
+    return sorted(list(todo_items) + occurrences, key=lambda item: item.duedate)
+
+
+# adds the virtual occurrences of lazy series to the day or week a date archive view shows
+class VirtualOccurrenceMixin:
+    def get_dated_items(self):
+        date_list, todo_items, extra_context = super().get_dated_items()
+        if 'week' in extra_context:
+            first_day = extra_context['week']
+            last_day = first_day + datetime.timedelta(days=7)
+        else:
+            first_day = extra_context['day']
+            last_day = first_day + datetime.timedelta(days=1)
+        occurrences = virtual_occurrences(self.request.user,
+                                          self._make_date_lookup_arg(first_day),
+                                          self._make_date_lookup_arg(last_day))
+        return date_list, merge_virtual_occurrences(todo_items, occurrences), extra_context
+
+
+class ToDoListView(KeysetPaginationMixin, generic.ListView):
     template_name = 'todo/todo_list.html'
     context_object_name = 'todo_list'
 
     def get_context_data(self, **kwargs):
         context = super(ToDoListView, self).get_context_data(**kwargs)
-        resp = requests.get('https://quotes.rest/qod').json()
-        if 'error' in resp:
-            context['quote'] = "Let's get things done today"
-        else:
-            context['quote'] = resp['contents']['quotes'][0]['quote'] + \
-                ' - ' + resp['contents']['quotes'][0]['author']
-        user_note = None
-        try:
-            user_note = Note.objects.get(user=self.request.user)
-        except Note.DoesNotExist:
-            user_note = Note.objects.create(user=self.request.user, text='')
-        context['note'] = user_note.text
+        # long series still being generated in the background
+        context['recurrence_jobs'] = RecurrenceJob.objects.filter(
+            user=self.request.user,
+            status__in=[RecurrenceJob.PENDING, RecurrenceJob.RUNNING]).select_related('series')
         return context
 
     def get_queryset(self):
-        # update the priority twice a day if the due date is getting close
-        # if datetime.datetime.utcnow().replace(tzinfo=timezone.utc).hour
-        items = ToDoItem.objects.all()
-        if self.request.user.is_authenticated:
-            items = ToDoItem.objects.filter(user=self.request.user)
-
-        for item in items:
-            daydiff = (item.duedate - timezone.now()) / \
-                datetime.timedelta(days=1)
-            if daydiff <= 1:
-                item.priority = 'HI'
-            elif daydiff <= 2 and item.priority != 'HI':
-                item.priority = 'MD'
-            item.save()
-
+        # priorities are raised as the due date gets close when they are read, nothing is saved
         if not self.request.user.is_authenticated:
-            return ToDoItem.objects.filter(completed=False).order_by('duedate')
-        return ToDoItem.objects.filter(completed=False, user=self.request.user).order_by('duedate')
+            return with_effective_priority(ToDoItem.objects.filter(completed=False)).order_by('duedate')
+        return with_effective_priority(
+            ToDoItem.objects.filter(completed=False, user=self.request.user)).order_by('duedate')
+
+    # a page also shows the occurrences of lazy series due between its first and last row
+    def paginated(self, todo_items, next_cursor):
+        # occurrences of lazy series are only expanded for the next few days
+        today = timezone.localdate()
+        start, end = day_window(today, today + datetime.timedelta(days=getattr(settings, 'TODO_LAZY_LIST_DAYS', 14) - 1))
+        after = self.request.GET.get('after')
+        if after:
+            start = max(start, decode_cursor(after)[0] + datetime.timedelta(microseconds=1))
+        if next_cursor:
+            end = min(end, todo_items[-1].duedate + datetime.timedelta(microseconds=1))
+        if (start >= end):
+            return todo_items
+        return merge_virtual_occurrences(todo_items, virtual_occurrences(self.request.user, start, end))
 
     def get(self, *args, **kwargs):
         if not self.request.user.is_authenticated:
@@ -403,22 +265,65 @@ class ToDoListView(generic.ListView):
         return super(ToDoListView, self).get(*args, **kwargs)
 
 
+# a disabled textarea is not submitted, so a POST without 'notes' (sent before the notes panel
+# loaded) leaves the stored note alone instead of emptying it
 def save_notes(request):
     if request.method == 'POST':
-        user = request.user
-        text = request.POST.get('notes', '')
-        print(user, user.id, text)
-        user_note = None
-        try:
-            user_note = Note.objects.get(user=user)
-        except Note.DoesNotExist:
-            user_note = Note.objects.create(user=user, text='')
-        user_note.text = text
-        user_note.save()
+        if ('notes' in request.POST):
+            save_note(request.user, request.POST['notes'])
         return redirect('todo_list:todo_list')
 
 
-class CompletedView(generic.ListView):
+# JSON fragment with an ETag; a request whose If-None-Match still matches gets an empty 304
+# https://developer.mozilla.org/en-US/docs/Web/HTTP/Caching
+def fragment_response(request, data, **cache_control):
+    etag = quote_etag(hashlib.md5(json.dumps(data).encode()).hexdigest())
+    return conditional_fragment(request, etag, lambda: data, **cache_control)
+
+
+# JSON fragment of build() under an ETag known beforehand; build() only runs if the ETag no longer matches
+def conditional_fragment(request, etag, build, **cache_control):
+    response = get_conditional_response(request, etag=etag) or JsonResponse(build())
+    response['ETag'] = etag
+    patch_cache_control(response, **cache_control)
+    return response
+
+
+# quote of the day, fetched by the list pages after they render so a slow quote provider never
+# holds them up; the same for everyone and changes daily, so it may be cached for an hour
+def quote_fragment(request):
+    return fragment_response(request, {'quote': get_quote()}, public=True, max_age=60 * 60)
+
+
+# text and version of the notes panel, fetched after the page renders; revalidated on every visit, so an
+# unchanged note is a 304 served from the browser cache
+def notes_fragment(request):
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'login required'}, status=403)
+    return fragment_response(request, request_note(request), private=True, no_cache=True)
+
+
+# autosave of the notes panel: {"version": n, "patches": [{"start", "end", "text"}, ...]} made
+# against version n of the note. Answers 204 with the new version in X-Note-Version, so typing
+# never re-renders a page, or 409 with the current note if it changed meanwhile (another tab)
+@require_POST
+def autosave_notes(request):
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'login required'}, status=403)
+    try:
+        body = json.loads(request.body)
+        note = patch_note(request.user, body['version'], body['patches'])
+    except NoteConflict as e:
+        return JsonResponse(note_data(e.note), status=409)
+    except (ValueError, KeyError, TypeError):
+        # not JSON, not an object with version and patches, or a patch that does not fit
+        return JsonResponse({'error': 'invalid patch'}, status=400)
+    response = HttpResponse(status=204)
+    response['X-Note-Version'] = note.version
+    return response
+
+
+class CompletedView(KeysetPaginationMixin, generic.ListView):
     template_name = 'todo/completed_list.html'
     context_object_name = 'todo_list'
 
@@ -430,21 +335,13 @@ class CompletedView(generic.ListView):
             # redirect to login if user isn't logged in
             return redirect("/login/")
         return super(CompletedView, self).get(*args, **kwargs)
-    
-    def get_context_data(self, **kwargs):
-        context = super(CompletedView, self).get_context_data(**kwargs)
-        user_note = None
-        try:
-            user_note = Note.objects.get(user=self.request.user)
-        except Note.DoesNotExist:
-            user_note = Note.objects.create(user=self.request.user, text='')
-        context['note'] = user_note.text
-        print(context)
-        return context
 
 
 def delete_todo(request, todo_item_id):
     item = ToDoItem.objects.get(pk=todo_item_id, user=request.user)
+    # keep a deleted occurrence of a series from being expanded or created again
+    if (item.series_id is not None):
+        exclude_occurrence(item.series, item.occurrence_date)
     item.delete()
     return redirect('todo_list:todo_list')
 
@@ -456,17 +353,21 @@ def complete_todo(request, todo_item_id):
     completedToDo.completed = not completedToDo.completed
     completedToDo.progress = 100
     completedToDo.save()
+    schedule(completedToDo)
 
     return redirect(request.META.get('HTTP_REFERER', '/'))
 
 
 def delete_all_completed(request):
-    ToDoItem.objects.filter(completed=True, user=request.user).delete()
+    delete_todos(ToDoItem.objects.filter(completed=True, user=request.user))
     return redirect('todo_list:completed')
 
 
 def delete_all_incompleted(request):
-    ToDoItem.objects.filter(completed=False, user=request.user).delete()
+    delete_todos(ToDoItem.objects.filter(completed=False, user=request.user))
+    # lazy series would keep expanding occurrences that are not stored
+    RecurrenceSeries.objects.filter(lazy=True, user=request.user).delete()
+    calendar_changed([request.user.id])
     return redirect('todo_list:todo_list')
 
 ##################################################################
@@ -498,8 +399,8 @@ class DayView(generic.FormView):
 
 
 # https://docs.djangoproject.com/en/3.0/ref/class-based-views/generic-date-based/#dayarchiveview
-class SpecificDayView(generic.DayArchiveView):
-    template_name = 'todoitem_archive_day.html'
+class SpecificDayView(VirtualOccurrenceMixin, generic.DayArchiveView):
+    template_name = 'todo/todoitem_archive_day.html'
     #queryset = ToDoItem.objects.filter(completed=False).order_by('duedate')
     context_object_name = 'todo_list'
     date_field = "duedate"
@@ -518,16 +419,10 @@ class SpecificDayView(generic.DayArchiveView):
 
     def get_context_data(self, **kwargs):
         context = super(SpecificDayView, self).get_context_data(**kwargs)
-        user_note = None
-        try:
-            user_note = Note.objects.get(user=self.request.user)
-        except Note.DoesNotExist:
-            user_note = Note.objects.create(user=self.request.user, text='')
-        context['note'] = user_note.text
         return context
 
-class TodoTodayArchiveView(generic.TodayArchiveView):
-    template_name = 'todoitem_archive_day.html'
+class TodoTodayArchiveView(VirtualOccurrenceMixin, generic.TodayArchiveView):
+    template_name = 'todo/todoitem_archive_day.html'
     context_object_name = 'todo_list'
     date_field = "duedate"
     ordering = 'duedate'
@@ -545,12 +440,6 @@ class TodoTodayArchiveView(generic.TodayArchiveView):
     
     def get_context_data(self, **kwargs):
         context = super(TodoTodayArchiveView, self).get_context_data(**kwargs)
-        user_note = None
-        try:
-            user_note = Note.objects.get(user=self.request.user)
-        except Note.DoesNotExist:
-            user_note = Note.objects.create(user=self.request.user, text='')
-        context['note'] = user_note.text
         return context
 
 
@@ -575,8 +464,8 @@ class WeekView(generic.FormView):
         return super(WeekView, self).get(*args, **kwargs)
 
 
-class SpecificWeekView(generic.WeekArchiveView):
-    template_name = 'todoitem_archive_week.html'
+class SpecificWeekView(VirtualOccurrenceMixin, generic.WeekArchiveView):
+    template_name = 'todo/todoitem_archive_week.html'
     context_object_name = 'todo_list'
     date_field = "duedate"
     ordering = 'duedate'
@@ -594,12 +483,6 @@ class SpecificWeekView(generic.WeekArchiveView):
 
     def get_context_data(self, **kwargs):
         context = super(SpecificWeekView, self).get_context_data(**kwargs)
-        user_note = None
-        try:
-            user_note = Note.objects.get(user=self.request.user)
-        except Note.DoesNotExist:
-            user_note = Note.objects.create(user=self.request.user, text='')
-        context['note'] = user_note.text
         return context
 
 
@@ -631,6 +514,47 @@ class MonthView(generic.FormView):
 #     allow_future = True
 #     allow_empty = True
 
+# {date: (open, completed)} of user's days first_day..last_day that have to-dos: the per-day counts
+# plus the occurrences of series expanded on the fly, which are always open
+def calendar_counts(user, first_day, last_day):
+    counts = day_counts(user, first_day, last_day)
+    for occurrence in virtual_occurrences(user, *day_window(first_day, last_day)):
+        date = timezone.localtime(occurrence.duedate).date()
+        open_count, completed_count = counts.get(date, (0, 0))
+        counts[date] = (open_count + 1, completed_count)
+    return counts
+
+
+# longest range the calendar feed answers for
+CALENDAR_FEED_MAX_DAYS = 366
+
+
+# per-day summary of ?start=YYYY-MM-DD&end=YYYY-MM-DD (both included) for the calendar to switch
+# months without reloading: {"days": {"2020-04-14": [open, completed], ...}} with only the days that
+# have to-dos. Its ETag is the user's calendar version, so a revalidation while nothing changed is an
+# empty 304 that counts nothing
+def calendar_feed(request):
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'login required'}, status=403)
+    try:
+        first_day = datetime.date.fromisoformat(request.GET['start'])
+        last_day = datetime.date.fromisoformat(request.GET['end'])
+    except (KeyError, ValueError):
+        return JsonResponse({'error': 'start and end must be dates (YYYY-MM-DD)'}, status=400)
+    if not (first_day <= last_day < first_day + datetime.timedelta(days=CALENDAR_FEED_MAX_DAYS)):
+        return JsonResponse({'error': 'at most %d days' % CALENDAR_FEED_MAX_DAYS}, status=400)
+
+    def build():
+        counts = calendar_counts(request.user, first_day, last_day)
+        return {
+            'start': first_day.isoformat(),
+            'end': last_day.isoformat(),
+            'days': {date.isoformat(): list(count) for date, count in sorted(counts.items()) if count != (0, 0)},
+        }
+    etag = quote_etag(calendar_version(request.user.id))
+    return conditional_fragment(request, etag, build, private=True, no_cache=True)
+
+
 def month_calendar_view(request, year, month):
     if year == 1 and month == 'curr':
         year = datetime.datetime.now().year
@@ -640,59 +564,38 @@ def month_calendar_view(request, year, month):
         if month == abbr:
             break
         month_num += 1
-    calendar.setfirstweekday(calendar.SUNDAY)
-    month_matrix = calendar.monthcalendar(year, month_num)
-
-
-    #https://vsupalov.com/django-cbv-vs-fbv-beginner/
-    user_note = None
-    try:
-        user_note = Note.objects.get(user=request.user)
-    except Note.DoesNotExist:
-        user_note = Note.objects.create(user=request.user, text='')
-
-    class CalendarDay:
-        def __init__(self, date, date_todo_list, blank, size):
-            self.date = date
-            self.date_todo_list = date_todo_list
-            self.blank = blank
-            self.size = size
-
-        def __repr__(self):
-            return str(self)
-
-        def __str__(self):
-            return "Calendar Day: " + str(self.date) + "\tTodos: " + str(self.date_todo_list) + "\tBlank: " + str(self.blank) + "\tSize: " + str(self.size)
-    calendar_day_list = []
-    for week_index in range(len(month_matrix)):
-        calendar_day_list.append([])
-        for day_index in range(7):
-            day_date = month_matrix[week_index][day_index]
-            if day_date == 0:
-                calendar_day_list[week_index].append(
-                    CalendarDay(day_date, [], True, 0))
-            else:
-                day_datetime = datetime.date(year, month_num, day_date)
-                day_date_todos = ToDoItem.objects.filter(user=request.user, completed=False).exclude(
-                    duedate__lt=day_datetime).exclude(duedate__gt=day_datetime+datetime.timedelta(days=1))
-                day_size = int(len(day_date_todos)/4)
-                if len(day_date_todos) == 0:
-                    calendar_day_list[week_index].append(
-                        CalendarDay(day_date, day_date_todos, False, -1))
-                else:
-                    calendar_day_list[week_index].append(
-                        CalendarDay(day_date, day_date_todos, False, day_size))
+    # per-day counts of the whole month; the to-dos themselves are only read when a day is opened
+    first_day = datetime.date(year, month_num, 1)
+    counts = calendar_counts(request.user, first_day, first_day + relativedelta(months=+1, days=-1))
+    calendar_day_list = calendar_days(year, month_num, counts)
     template_name = 'todo/calendar_month.html'
     return render(request, template_name, {
         'calendar_day_list': calendar_day_list,
         'month_name': calendar.month_name[month_num],
+        'month_num': month_num,
         'curr_year': year,
         'curr_month': month,
-        'note': user_note.text,
     })
 
 
 
+# the whole year as twelve small months shaded by how many to-dos each day has; drawn from the
+# per-day counts (one query however many to-dos there are) and the series still expanded on the fly
+def year_calendar_view(request, year):
+    if not request.user.is_authenticated:
+        return redirect("/login/")
+    counts = calendar_counts(request.user, datetime.date(year, 1, 1), datetime.date(year, 12, 31))
+
+    months = [{'name': calendar.month_name[month_num], 'abbr': calendar.month_abbr[month_num],
+               'weeks': calendar_days(year, month_num, counts)} for month_num in range(1, 13)]
+    return render(request, 'todo/calendar_year.html', {
+        'months': months,
+        'curr_year': year,
+        'prev_year': year - 1,
+        'next_year': year + 1,
+    })
+
+
 def month_calendar_prev(request, year, month):
     month_names = ["Jan", "Feb", "Mar", "Apr", "May",
                    "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
@@ -740,6 +643,7 @@ class AddCourseView(CreateView):
         form = super(AddCourseView, self).get_form(form_class)
         form.fields['course_abbrev'].required = False
         form.fields['course_prof'].required = False
+        form.filter_skip_calendar(self.request.user)
         return form
 
     def form_valid(self, form):
@@ -760,6 +664,7 @@ class EditCourseView(UpdateView):
         form = super(EditCourseView, self).get_form(form_class)
         form.fields['course_abbrev'].required = False
         form.fields['course_prof'].required = False
+        form.filter_skip_calendar(self.request.user)
         return form
 
     def form_valid(self, form):
@@ -801,27 +706,16 @@ class AcademicsListView(generic.ListView):
     def get_queryset(self):
         # update the priority twice a day if the due date is getting close
         # if datetime.datetime.utcnow().replace(tzinfo=timezone.utc).hour
-        return Course.objects.filter(user=self.request.user).order_by('course_name')
+        return Course.objects.filter(user=self.request.user).order_by('course_name').prefetch_related(
+            prefetch_open())
 
         # https://docs.djangoproject.com/en/3.0/topics/class-based-views/generic-display/
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        resp = requests.get('https://quotes.rest/qod').json()
-        if 'error' in resp:
-            context['quote'] = "Let's get things done today"
-        else:
-            context['quote'] = resp['contents']['quotes'][0]['quote'] + \
-                               ' - ' + resp['contents']['quotes'][0]['author']
-        user_note = None
-        try:
-            user_note = Note.objects.get(user=self.request.user)
-        except Note.DoesNotExist:
-            user_note = Note.objects.create(user=self.request.user, text='')
-        context['note'] = user_note.text
 
         context['no_course_todo_list'] = ToDoItem.objects.filter(
-            category='AC', course=None, user=self.request.user)
+            category='AC', course=None, completed=False, user=self.request.user)
         return context
 
     def get(self, *args, **kwargs):
@@ -832,6 +726,22 @@ class AcademicsListView(generic.ListView):
 
 # filter to-do item by Category and duedate = today
 
+# to-dos of todo_items due on the user's (local) today, as a duedate range
+def due_today(todo_items):
+    start, end = day_window()
+    return todo_items.filter(duedate__gte=start, duedate__lt=end)
+
+
+# course.todoitem_set / ec.todoitem_set of the Academics and Extracurriculars pages, which only show
+# open to-dos, in one query
+def prefetch_open():
+    return Prefetch('todoitem_set', queryset=ToDoItem.objects.filter(completed=False).order_by('duedate'))
+
+
+# course.todoitem_set / ec.todoitem_set of the Today views, limited to today's open to-dos in one query
+def prefetch_open_today():
+    return Prefetch('todoitem_set', queryset=due_today(ToDoItem.objects.filter(completed=False)).order_by('duedate'))
+
 
 class AcademicsListTodayView(generic.ListView):
     template_name = 'todo/academics_today_list.html'
@@ -840,26 +750,15 @@ class AcademicsListTodayView(generic.ListView):
     def get_queryset(self):
         # update the priority twice a day if the due date is getting close
         # if datetime.datetime.utcnow().replace(tzinfo=timezone.utc).hour
-        return Course.objects.filter(user=self.request.user).order_by('course_name')
+        return Course.objects.filter(user=self.request.user).order_by('course_name').prefetch_related(
+            prefetch_open_today())
 
         # https://docs.djangoproject.com/en/3.0/topics/class-based-views/generic-display/
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        resp = requests.get('https://quotes.rest/qod').json()
-        if 'error' in resp:
-            context['quote'] = "Let's get things done today"
-        else:
-            context['quote'] = resp['contents']['quotes'][0]['quote'] + \
-                               ' - ' + resp['contents']['quotes'][0]['author']
-        user_note = None
-        try:
-            user_note = Note.objects.get(user=self.request.user)
-        except Note.DoesNotExist:
-            user_note = Note.objects.create(user=self.request.user, text='')
-        context['note'] = user_note.text
-        context['no_course_todo_list'] = ToDoItem.objects.filter(
-            category='AC', course=None, user=self.request.user)
+        context['no_course_todo_list'] = due_today(ToDoItem.objects.filter(
+            category='AC', course=None, completed=False, user=self.request.user))
         return context
 
     def get(self, *args, **kwargs):
@@ -879,27 +778,16 @@ class ECToDoList(generic.ListView):
 
     def get_queryset(self):
         # get list of ec ordered by name
-        return Extracurricular.objects.filter(user=self.request.user).order_by('name')
+        return Extracurricular.objects.filter(user=self.request.user).order_by('name').prefetch_related(
+            prefetch_open())
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        resp = requests.get('https://quotes.rest/qod').json()
-        if 'error' in resp:
-            context['quote'] = "Let's get things done today"
-        else:
-            context['quote'] = resp['contents']['quotes'][0]['quote'] + \
-                               ' - ' + resp['contents']['quotes'][0]['author']
-        user_note = None
-        try:
-            user_note = Note.objects.get(user=self.request.user)
-        except Note.DoesNotExist:
-            user_note = Note.objects.create(user=self.request.user, text='')
-        context['note'] = user_note.text
         context['no_course_todo_list'] = ToDoItem.objects.filter(
-            category='AC', course=None, user=self.request.user)
+            category='AC', course=None, completed=False, user=self.request.user)
         # add list objects without a specific ec object but is categorized as ec
         context['no_ec_todo_list'] = ToDoItem.objects.filter(
-            category='EC', ec=None, user=self.request.user)
+            category='EC', ec=None, completed=False, user=self.request.user)
         return context
 
     def get(self, *args, **kwargs):
@@ -918,28 +806,17 @@ class ECTodayList(generic.ListView):
     def get_queryset(self):
         # update the priority twice a day if the due date is getting close
         # if datetime.datetime.utcnow().replace(tzinfo=timezone.utc).hour
-        return Extracurricular.objects.filter(user=self.request.user).order_by('name')
+        return Extracurricular.objects.filter(user=self.request.user).order_by('name').prefetch_related(
+            prefetch_open_today())
 
         # https://docs.djangoproject.com/en/3.0/topics/class-based-views/generic-display/
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        resp = requests.get('https://quotes.rest/qod').json()
-        if 'error' in resp:
-            context['quote'] = "Let's get things done today"
-        else:
-            context['quote'] = resp['contents']['quotes'][0]['quote'] + \
-                               ' - ' + resp['contents']['quotes'][0]['author']
-        user_note = None
-        try:
-            user_note = Note.objects.get(user=self.request.user)
-        except Note.DoesNotExist:
-            user_note = Note.objects.create(user=self.request.user, text='')
-        context['note'] = user_note.text
-        context['no_course_todo_list'] = ToDoItem.objects.filter(
-            category='AC', course=None, user=self.request.user)
-        context['no_ec_todo_list'] = ToDoItem.objects.filter(
-            category='EC', course=None, user=self.request.user)
+        context['no_course_todo_list'] = due_today(ToDoItem.objects.filter(
+            category='AC', course=None, completed=False, user=self.request.user))
+        context['no_ec_todo_list'] = due_today(ToDoItem.objects.filter(
+            category='EC', ec=None, completed=False, user=self.request.user))
         return context
 
     def get(self, *args, **kwargs):
@@ -1015,41 +892,14 @@ def delete_ec(request, ec_id):
 
 
 ################################### Job View ##########################################
-class JobListView(generic.ListView):
+class JobListView(KeysetPaginationMixin, generic.ListView):
     template_name = 'todo/job_list.html'
     context_object_name = 'todo_list'
 
     def get_queryset(self):
-        # update the priority twice a day if the due date is getting close
-        # if datetime.datetime.utcnow().replace(tzinfo=timezone.utc).hour
-        for item in ToDoItem.objects.filter(user=self.request.user):
-            timediff = (item.duedate - timezone.now()) / \
-                datetime.timedelta(days=1)
-            if timediff <= 1:
-                item.priority = 'HI'
-            elif timediff <= 2:
-                item.priority = 'MD'
-            else:
-                item.priority = 'LO'
-            item.save()
-        return ToDoItem.objects.filter(completed=False, category='JB', user=self.request.user).order_by('duedate')
+        return with_effective_priority(ToDoItem.objects.filter(
+            completed=False, category='JB', user=self.request.user)).order_by('duedate')
 
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        resp = requests.get('https://quotes.rest/qod').json()
-        if 'error' in resp:
-            context['quote'] = "Let's get things done today"
-        else:
-            context['quote'] = resp['contents']['quotes'][0]['quote'] + \
-                               ' - ' + resp['contents']['quotes'][0]['author']
-        user_note = None
-        try:
-            user_note = Note.objects.get(user=self.request.user)
-        except Note.DoesNotExist:
-            user_note = Note.objects.create(user=self.request.user, text='')
-        context['note'] = user_note.text
-
-        return context
 
     def get(self, *args, **kwargs):
         if not self.request.user.is_authenticated:
@@ -1065,32 +915,12 @@ class JobTodayList(generic.ListView):
     context_object_name = 'todo_list'
 
     def get_queryset(self):
-        now = timezone.now()
-        return ToDoItem.objects.filter(duedate__year=now.year,
-                                       duedate__month=now.month,
-                                       duedate__day=now.day,
-                                       completed=False,
-                                       category='JB',
-                                       user=self.request.user).order_by('duedate')
+        return due_today(ToDoItem.objects.filter(completed=False,
+                                                 category='JB',
+                                                 user=self.request.user)).order_by('duedate')
 
         # https://docs.djangoproject.com/en/3.0/topics/class-based-views/generic-display/
 
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        resp = requests.get('https://quotes.rest/qod').json()
-        if 'error' in resp:
-            context['quote'] = "Let's get things done today"
-        else:
-            context['quote'] = resp['contents']['quotes'][0]['quote'] + \
-                               ' - ' + resp['contents']['quotes'][0]['author']
-        user_note = None
-        try:
-            user_note = Note.objects.get(user=self.request.user)
-        except Note.DoesNotExist:
-            user_note = Note.objects.create(user=self.request.user, text='')
-        context['note'] = user_note.text
-
-        return context
 
     def get(self, *args, **kwargs):
         if not self.request.user.is_authenticated:
@@ -1101,29 +931,13 @@ class JobTodayList(generic.ListView):
 ############### Social View ###################
 
 
-class SocialListView(generic.ListView):
+class SocialListView(KeysetPaginationMixin, generic.ListView):
     template_name = 'todo/social_list.html'
     context_object_name = 'todo_list'
 
     def get_queryset(self):
         return ToDoItem.objects.filter(completed=False, category='SC', user=self.request.user).order_by('duedate')
 
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        resp = requests.get('https://quotes.rest/qod').json()
-        if 'error' in resp:
-            context['quote'] = "Let's get things done today"
-        else:
-            context['quote'] = resp['contents']['quotes'][0]['quote'] + \
-                               ' - ' + resp['contents']['quotes'][0]['author']
-        user_note = None
-        try:
-            user_note = Note.objects.get(user=self.request.user)
-        except Note.DoesNotExist:
-            user_note = Note.objects.create(user=self.request.user, text='')
-        context['note'] = user_note.text
-
-        return context
 
 
 class SocTodayList(generic.ListView):
@@ -1131,32 +945,12 @@ class SocTodayList(generic.ListView):
     context_object_name = 'todo_list'
 
     def get_queryset(self):
-        now = timezone.now()
-        return ToDoItem.objects.filter(duedate__year=now.year,
-                                       duedate__month=now.month,
-                                       duedate__day=now.day,
-                                       completed=False,
-                                       category='SC',
-                                       user=self.request.user).order_by('duedate')
+        return due_today(ToDoItem.objects.filter(completed=False,
+                                                 category='SC',
+                                                 user=self.request.user)).order_by('duedate')
 
         # https://docs.djangoproject.com/en/3.0/topics/class-based-views/generic-display/
 
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        resp = requests.get('https://quotes.rest/qod').json()
-        if 'error' in resp:
-            context['quote'] = "Let's get things done today"
-        else:
-            context['quote'] = resp['contents']['quotes'][0]['quote'] + \
-                               ' - ' + resp['contents']['quotes'][0]['author']
-        user_note = None
-        try:
-            user_note = Note.objects.get(user=self.request.user)
-        except Note.DoesNotExist:
-            user_note = Note.objects.create(user=self.request.user, text='')
-        context['note'] = user_note.text
-
-        return context
 
     def get(self, *args, **kwargs):
         if not self.request.user.is_authenticated:
@@ -1167,7 +961,7 @@ class SocTodayList(generic.ListView):
 ###############################################################################
 
 
-class PersonalListView(generic.ListView):
+class PersonalListView(KeysetPaginationMixin, generic.ListView):
     template_name = 'todo/personal_list.html'
     context_object_name = 'todo_list'
 
@@ -1180,22 +974,6 @@ class PersonalListView(generic.ListView):
             return redirect("/login/")
         return super(PersonalListView, self).get(*args, **kwargs)
 
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        resp = requests.get('https://quotes.rest/qod').json()
-        if 'error' in resp:
-            context['quote'] = "Let's get things done today"
-        else:
-            context['quote'] = resp['contents']['quotes'][0]['quote'] + \
-                               ' - ' + resp['contents']['quotes'][0]['author']
-        user_note = None
-        try:
-            user_note = Note.objects.get(user=self.request.user)
-        except Note.DoesNotExist:
-            user_note = Note.objects.create(user=self.request.user, text='')
-        context['note'] = user_note.text
-
-        return context
 
 
 class PersonalTodayList(generic.ListView):
@@ -1203,13 +981,9 @@ class PersonalTodayList(generic.ListView):
     context_object_name = 'todo_list'
 
     def get_queryset(self):
-        now = timezone.now()
-        return ToDoItem.objects.filter(duedate__year=now.year,
-                                       duedate__month=now.month,
-                                       duedate__day=now.day,
-                                       completed=False,
-                                       category='PS',
-                                       user=self.request.user).order_by('duedate')
+        return due_today(ToDoItem.objects.filter(completed=False,
+                                                 category='PS',
+                                                 user=self.request.user)).order_by('duedate')
 
         # https://docs.djangoproject.com/en/3.0/topics/class-based-views/generic-display/
 
@@ -1219,28 +993,12 @@ class PersonalTodayList(generic.ListView):
             return redirect("/login/")
         return super(PersonalTodayList, self).get(*args, **kwargs)
 
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        resp = requests.get('https://quotes.rest/qod').json()
-        if 'error' in resp:
-            context['quote'] = "Let's get things done today"
-        else:
-            context['quote'] = resp['contents']['quotes'][0]['quote'] + \
-                               ' - ' + resp['contents']['quotes'][0]['author']
-        user_note = None
-        try:
-            user_note = Note.objects.get(user=self.request.user)
-        except Note.DoesNotExist:
-            user_note = Note.objects.create(user=self.request.user, text='')
-        context['note'] = user_note.text
-
-        return context
 
 
 ###########################################################################
 
 
-class OtherListView(generic.ListView):
+class OtherListView(KeysetPaginationMixin, generic.ListView):
     template_name = 'todo/other_list.html'
     context_object_name = 'todo_list'
 
@@ -1253,22 +1011,6 @@ class OtherListView(generic.ListView):
             return redirect("/login/")
         return super(OtherListView, self).get(*args, **kwargs)
 
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        resp = requests.get('https://quotes.rest/qod').json()
-        if 'error' in resp:
-            context['quote'] = "Let's get things done today"
-        else:
-            context['quote'] = resp['contents']['quotes'][0]['quote'] + \
-                               ' - ' + resp['contents']['quotes'][0]['author']
-        user_note = None
-        try:
-            user_note = Note.objects.get(user=self.request.user)
-        except Note.DoesNotExist:
-            user_note = Note.objects.create(user=self.request.user, text='')
-        context['note'] = user_note.text
-
-        return context
 
 
 class OtherTodayList(generic.ListView):
@@ -1276,13 +1018,9 @@ class OtherTodayList(generic.ListView):
     context_object_name = 'todo_list'
 
     def get_queryset(self):
-        now = timezone.now()
-        return ToDoItem.objects.filter(duedate__year=now.year,
-                                       duedate__month=now.month,
-                                       duedate__day=now.day,
-                                       completed=False,
-                                       category='OT',
-                                       user=self.request.user).order_by('duedate')
+        return due_today(ToDoItem.objects.filter(completed=False,
+                                                 category='OT',
+                                                 user=self.request.user)).order_by('duedate')
 
         # https://docs.djangoproject.com/en/3.0/topics/class-based-views/generic-display/
 
@@ -1292,21 +1030,5 @@ class OtherTodayList(generic.ListView):
             return redirect("/login/")
         return super(OtherTodayList, self).get(*args, **kwargs)
 
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        resp = requests.get('https://quotes.rest/qod').json()
-        if 'error' in resp:
-            context['quote'] = "Let's get things done today"
-        else:
-            context['quote'] = resp['contents']['quotes'][0]['quote'] + \
-                               ' - ' + resp['contents']['quotes'][0]['author']
-        user_note = None
-        try:
-            user_note = Note.objects.get(user=self.request.user)
-        except Note.DoesNotExist:
-            user_note = Note.objects.create(user=self.request.user, text='')
-        context['note'] = user_note.text
-
-        return context
 
 # https://stackoverflow.com/questions/15566999/how-to-show-form-input-fields-based-on-select-value